@@ -10,6 +10,7 @@ from pydantic import BaseModel
 import models
 from database import get_db
 import auth
+import redis_cache
 import argentina_data
 
 # Router for FastAPI
@@ -164,6 +165,7 @@ def api_add_position(pos: ArgentinaPositionCreate, current_user: models.User = D
     
     db.add(new_pos)
     db.commit()
+    redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
     db.refresh(new_pos)
     return {"id": new_pos.id, "status": "created", "detected_country": underlying_country}
 
@@ -182,6 +184,7 @@ def api_update_manual_price(position_id: int, update: ManualPriceUpdate, current
     pos.manual_price_updated_at = datetime.now()
     
     db.commit()
+    redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
     return {"id": position_id, "manual_price": update.price, "status": "updated"}
 
 @router.post("/positions/{position_id}/close")
@@ -207,6 +210,7 @@ def api_close_position(position_id: int, exit_price: float, shares: float = None
         pos.exit_date = datetime.now().strftime("%Y-%m-%d")
         pos.exit_price = exit_price
         db.commit()
+        redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
         return {"id": position_id, "status": "closed", "type": "full"}
         
     # PARTIAL EXIT
@@ -234,6 +238,7 @@ def api_close_position(position_id: int, exit_price: float, shares: float = None
             pos.notes = f"Sold {shares_to_sell} @ {exit_price}"
             
         db.commit()
+        redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
         return {"original_id": pos.id, "new_closed_id": closed_part.id, "status": "partial_close"}
 
 @router.delete("/positions/{position_id}")
@@ -249,6 +254,7 @@ def api_delete_position(position_id: int, current_user: models.User = Depends(au
         
     db.delete(pos)
     db.commit()
+    redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
     return {"id": position_id, "status": "deleted"}
 
 # ============================================
@@ -342,15 +348,21 @@ def api_get_prices(current_user: models.User = Depends(auth.get_current_user), d
     """Get live prices for all open Argentine positions - Uses price_service cache for speed."""
     import price_service
     
-    positions = db.query(models.ArgentinaPosition).filter(
+    # Only ticker and entry price are needed: project the two columns instead of loading positions
+    rows = db.query(models.ArgentinaPosition.ticker, models.ArgentinaPosition.entry_price).filter(
         models.ArgentinaPosition.user_id == current_user.id,
-        models.ArgentinaPosition.status.in_(["OPEN", "Open"])
+        models.ArgentinaPosition.status.in_(["OPEN", "Open"]),
+        models.ArgentinaPosition.ticker.isnot(None)
     ).all()
     
-    prices = {}
-    tickers = list(set([p.ticker for p in positions if p.ticker]))
+    # One entry per ticker (first position wins), doubles as the fallback price lookup
+    entry_prices = {}
+    for ticker, entry_price in rows:
+        if ticker:
+            entry_prices.setdefault(ticker, entry_price)
     
-    for ticker in tickers:
+    prices = {}
+    for ticker in entry_prices:
         # Use price_service cache (fast) with fallback to entry price
         price_data = price_service.get_argentina_price(ticker.upper())
         
@@ -362,13 +374,11 @@ def api_get_prices(current_user: models.User = Depends(auth.get_current_user), d
             }
         else:
             # Fallback to entry price if no live data
-            pos = next((p for p in positions if p.ticker == ticker), None)
-            if pos:
-                prices[ticker] = {
-                    "price": pos.entry_price,
-                    "change_pct": 0,
-                    "source": "entry_fallback"
-                }
+            prices[ticker] = {
+                "price": entry_prices[ticker],
+                "change_pct": 0,
+                "source": "entry_fallback"
+            }
     
     return prices
 
@@ -655,6 +665,7 @@ async def upload_csv(file: UploadFile = File(...), current_user: models.User = D
                 continue
                 
         db.commit()
+        redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
         
         # Trigger Rebuild
         try:
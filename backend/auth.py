@@ -82,6 +82,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
     return user
 
+async def get_tenant_db(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Request session scoped to the current user: Trade queries get `user_id = :id` appended automatically."""
+    db.info["tenant_user_id"] = current_user.id
+    return db
+
 # --- Endpoints ---
 
 @router.post("/register", response_model=Token)
@@ -3,6 +3,98 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+try:
+    from numba import njit
+except ImportError:  # Optional: without numba the kernel runs as plain Python over NumPy arrays
+    njit = None
+
+WARMUP_BARS = 21  # EMA21 needs this many bars before the first signal
+EMA_SPAN = 21
+RSI_PERIOD = 14
+
+
+def _simulate(close, ema_span, initial_capital, start, rsi_period):
+    """
+    Momentum-trend state machine over raw float arrays.
+    The EMA (seeded with the first close, like pandas ewm(adjust=False)) and Wilder's
+    RSI (seeded with the simple average of the first `rsi_period` moves, then smoothed
+    recursively) are computed in the same pass.
+    Returns (equity_curve, entry_idx, exit_idx, trade_shares) for bars start..n-1.
+    """
+    n = len(close)
+    curve = np.empty(n - start)
+    entry_idx = np.empty(n, np.int64)
+    exit_idx = np.empty(n, np.int64)
+    trade_shares = np.empty(n, np.int64)
+    n_trades = 0
+    
+    equity = initial_capital
+    holding = False
+    entry_i = 0
+    entry_px = 0.0
+    shares = 0
+    
+    alpha = 2.0 / (ema_span + 1)
+    ema = close[0]
+    
+    avg_gain = 0.0
+    avg_loss = 0.0
+    rsi = np.nan
+    
+    for i in range(1, n):
+        price = close[i]
+        ema = (1.0 - alpha) * ema + alpha * price
+        
+        # Wilder RSI
+        d = price - close[i - 1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        if i < rsi_period:
+            avg_gain += gain
+            avg_loss += loss
+            continue
+        if i == rsi_period:
+            avg_gain = (avg_gain + gain) / rsi_period
+            avg_loss = (avg_loss + loss) / rsi_period
+        else:
+            avg_gain = (avg_gain * (rsi_period - 1) + gain) / rsi_period
+            avg_loss = (avg_loss * (rsi_period - 1) + loss) / rsi_period
+        rsi = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        
+        if i < start:
+            continue
+        
+        # Record daily equity (mark-to-market if holding)
+        current_equity = equity
+        if holding:
+            current_equity = equity + (price - entry_px) * shares
+        curve[i - start] = current_equity
+        
+        if holding:
+            # Stop Loss: Close below EMA21
+            if price < ema:
+                equity += (price - entry_px) * shares
+                entry_idx[n_trades] = entry_i
+                exit_idx[n_trades] = i
+                trade_shares[n_trades] = shares
+                n_trades += 1
+                holding = False
+        # Buy Condition: Price > EMA21 AND RSI > 50 (Momentum)
+        elif price > ema and rsi > 50:
+            # Risk Management: risk 2% of equity, assumed 5% stop distance for sizing
+            shares = int((equity * 0.02) / (price * 0.05))
+            if shares > 0:
+                holding = True
+                entry_i = i
+                entry_px = price
+    
+    return curve, entry_idx[:n_trades], exit_idx[:n_trades], trade_shares[:n_trades]
+
+
+if njit is not None:
+    _simulate = njit(cache=True)(_simulate)
+
+
 def run_backtest(ticker: str, strategy: str = "momentum_trend"):
     """
     Simulates a trading strategy on historical data.
@@ -25,91 +117,47 @@ def run_backtest(ticker: str, strategy: str = "momentum_trend"):
         # Cleanup column names if MultiIndex
         if isinstance(df.columns, pd.MultiIndex):
             df.columns = df.columns.get_level_values(0)
-            
-        df['Close'] = df['Close'].astype(float)
         
-        # 2. Calculate Indicators
-        # EMA 21
-        df['EMA21'] = df['Close'].ewm(span=21, adjust=False).mean()
+        # Only closes and dates are used; drop the OHLCV frame instead of holding it for the whole run
+        close = df['Close'].to_numpy(dtype=np.float64)
+        index = df.index.values
+        del df
         
-        # RSI 14
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        # 2. Indicators: EMA 21 and RSI 14 (Wilder) are computed inside the simulation pass
         
-        # 3. Simulation Loop
+        # 3. Simulation (array kernel instead of per-bar .iloc lookups)
         initial_capital = 10000.0
-        details = {
-            "initial_capital": initial_capital,
-            "equity": initial_capital,
-            "trades": [],
-            "equity_curve": []
-        }
+        curve, entry_idx, exit_idx, trade_shares = _simulate(
+            close,
+            EMA_SPAN,
+            initial_capital,
+            WARMUP_BARS,
+            RSI_PERIOD
+        )
         
-        position = None # { 'entry_price': float, 'shares': int, 'date': date }
-        equity = initial_capital
-        
-        for i in range(21, len(df)):
-            date = df.index[i]
-            price = df['Close'].iloc[i]
-            prev_price = df['Close'].iloc[i-1]
-            ema = df['EMA21'].iloc[i]
-            rsi = df['RSI'].iloc[i]
-            
-            # Record daily equity (mark-to-market if holding)
-            current_equity = equity
-            if position:
-                current_equity = equity + (price - position['entry_price']) * position['shares']
-            
-            # Add data point for chart (limit to last 100 points for frontend perf if needed, or send all)
-            details['equity_curve'].append({
-                "date": date.strftime("%Y-%m-%d"),
-                "equity": round(current_equity, 2)
+        # 4. Build the response once from the result arrays
+        dates = np.datetime_as_string(index, unit='D').tolist()  # formatted once, shared below
+        trades = []
+        for e, x, shares in zip(entry_idx.tolist(), exit_idx.tolist(), trade_shares.tolist()):
+            entry_price, exit_price = float(close[e]), float(close[x])
+            trades.append({
+                "entry_date": dates[e],
+                "exit_date": dates[x],
+                "entry_price": entry_price,
+                "exit_price": exit_price,
+                "pnl": round((exit_price - entry_price) * shares, 2),
+                "pnl_pct": round((exit_price - entry_price) / entry_price * 100, 2)
             })
-            
-            # --- Strategy Logic ---
-            
-            # CHECK EXIT
-            if position:
-                # Stop Loss: Close below EMA21
-                if price < ema:
-                    # SELL
-                    pnl = (price - position['entry_price']) * position['shares']
-                    equity += pnl
-                    
-                    trade = {
-                        "entry_date": position['date'].strftime("%Y-%m-%d"),
-                        "exit_date": date.strftime("%Y-%m-%d"),
-                        "entry_price": position['entry_price'],
-                        "exit_price": price,
-                        "pnl": round(pnl, 2),
-                        "pnl_pct": round((price - position['entry_price']) / position['entry_price'] * 100, 2)
-                    }
-                    details['trades'].append(trade)
-                    position = None
-                    
-            # CHECK ENTRY
-            elif not position:
-                # Buy Condition: Price > EMA21 AND RSI > 50 (Momentum)
-                if price > ema and rsi > 50:
-                    # Risk Management: risk 2% of equity
-                    risk_per_share = price * 0.05 # Assumed 5% stop distance for sizing
-                    risk_amount = equity * 0.02
-                    shares = int(risk_amount / risk_per_share)
-                    
-                    if shares > 0:
-                         position = {
-                            'entry_price': price,
-                            'shares': shares,
-                            'date': date
-                        }
+        # Equity curve as parallel columns rather than one dict per bar
+        equity_curve = {
+            "dates": dates[WARMUP_BARS:],
+            "equity": np.round(curve, 2).tolist()
+        }
 
         # Final Cleanup
-        final_equity = details['equity_curve'][-1]['equity']
-        total_trades = len(details['trades'])
-        wins = len([t for t in details['trades'] if t['pnl'] > 0])
+        final_equity = equity_curve['equity'][-1]
+        total_trades = len(trades)
+        wins = sum(1 for t in trades if t['pnl'] > 0)
         win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
         
         return {
@@ -119,8 +167,8 @@ def run_backtest(ticker: str, strategy: str = "momentum_trend"):
             "final_equity": round(final_equity, 2),
             "total_trades": total_trades,
             "win_rate": round(win_rate, 1),
-            "trades": details['trades'], # Send last 50 trades
-            "equity_curve": details['equity_curve'] # For charting
+            "trades": trades,
+            "equity_curve": equity_curve # For charting: {dates: [...], equity: [...]}
         }
         
     except Exception as e:
@@ -1,29 +1,47 @@
 import os
 import shutil
+import tarfile
 import zipfile
-import glob
 from datetime import datetime
 import logging
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 BACKUP_DIR = "backups"
 DB_FILE = "backend/trades.db"
 ENV_FILE = "backend/.env"
+BACKUP_EXTENSIONS = (".tar.zst", ".zip")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
 
 if not os.path.exists(BACKUP_DIR):
     os.makedirs(BACKUP_DIR)
 
 def create_backup():
-    """Creates a zip backup of trades.db and .env"""
+    """Creates a backup of trades.db and .env (.tar.zst when zstandard is installed, else .zip)"""
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"backup_{timestamp}.zip"
-        backup_path = os.path.join(BACKUP_DIR, backup_filename)
-        
-        with zipfile.ZipFile(backup_path, 'w') as zipf:
-            if os.path.exists(DB_FILE):
-                zipf.write(DB_FILE, arcname="trades.db")
-            if os.path.exists(ENV_FILE):
-                zipf.write(ENV_FILE, arcname=".env")
+        members = [(DB_FILE, "trades.db"), (ENV_FILE, ".env")]
+        members = [(path, arcname) for path, arcname in members if os.path.exists(path)]
+
+        if zstandard is not None:
+            backup_filename = f"backup_{timestamp}.tar.zst"
+            backup_path = os.path.join(BACKUP_DIR, backup_filename)
+            # Multi-threaded zstd over a tar stream; level 3 beats DEFLATE on both speed and ratio
+            cctx = zstandard.ZstdCompressor(level=3, threads=-1)
+            with open(backup_path, 'wb') as f, cctx.stream_writer(f) as compressor, \
+                    tarfile.open(fileobj=compressor, mode='w|') as tar:
+                for path, arcname in members:
+                    tar.add(path, arcname=arcname)
+        else:
+            backup_filename = f"backup_{timestamp}.zip"
+            backup_path = os.path.join(BACKUP_DIR, backup_filename)
+            # Level-1 DEFLATE: nearly the same ratio on the DB as higher levels for a fraction of the CPU
+            with zipfile.ZipFile(backup_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+                for path, arcname in members:
+                    zipf.write(path, arcname=arcname)
                 
         # Clean up old backups (keep last 10)
         cleanup_backups()
@@ -40,13 +58,12 @@ def create_backup():
 
 def list_backups():
     """Lists available backups"""
-    files = glob.glob(os.path.join(BACKUP_DIR, "*.zip"))
     backups = []
     
-    for f in files:
-        stats = os.stat(f)
+    for entry in _backup_entries():
+        stats = entry.stat()
         backups.append({
-            "filename": os.path.basename(f),
+            "filename": entry.name,
             "size": stats.st_size,
             "created": datetime.fromtimestamp(stats.st_ctime).strftime("%Y-%m-%d %H:%M:%S")
         })
@@ -55,8 +72,32 @@ def list_backups():
     backups.sort(key=lambda x: x['filename'], reverse=True)
     return backups
 
+def _backup_entries():
+    """Backup archives in BACKUP_DIR as DirEntry objects (stat cached by scandir)"""
+    with os.scandir(BACKUP_DIR) as it:
+        return [e for e in it if e.is_file() and e.name.endswith(BACKUP_EXTENSIONS)]
+
+def _extract_db(backup_path):
+    """Extracts trades.db into backend/, detecting zstd vs zip by magic bytes"""
+    with open(backup_path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to restore .tar.zst backups")
+        with open(backup_path, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader, \
+                tarfile.open(fileobj=reader, mode='r|') as tar:
+            for member in tar:
+                if member.name == "trades.db":
+                    tar.extract(member, path="backend")
+                    return
+        raise KeyError("trades.db not found in backup")
+
+    with zipfile.ZipFile(backup_path, 'r') as zipf:
+        zipf.extract("trades.db", path="backend")
+
 def restore_backup(filename):
-    """Restores trades.db from a specific backup zip"""
+    """Restores trades.db from a specific backup archive"""
     backup_path = os.path.join(BACKUP_DIR, filename)
     if not os.path.exists(backup_path):
         return {"status": "error", "message": "Backup file not found"}
@@ -67,9 +108,8 @@ def restore_backup(filename):
         if os.path.exists(DB_FILE):
              shutil.copy2(DB_FILE, f"{DB_FILE}.pre_restore_{timestamp}.bak")
              
-        with zipfile.ZipFile(backup_path, 'r') as zipf:
-            zipf.extract("trades.db", path="backend")
-            # We typically don't restore .env automatically to avoid breaking config
+        # We typically don't restore .env automatically to avoid breaking config
+        _extract_db(backup_path)
             
         return {"status": "success", "message": f"Restored from {filename}"}
     except Exception as e:
@@ -77,9 +117,9 @@ def restore_backup(filename):
 
 def cleanup_backups(keep=10):
     """Deletes old backups, keeping only the last N"""
-    files = sorted(glob.glob(os.path.join(BACKUP_DIR, "*.zip")), reverse=True)
-    if len(files) > keep:
-        for f in files[keep:]:
+    entries = sorted(_backup_entries(), key=lambda e: e.name, reverse=True)
+    if len(entries) > keep:
+        for f in [entry.path for entry in entries[keep:]]:
             try:
                 os.remove(f)
                 logging.info(f"Deleted old backup: {f}")
@@ -1,10 +1,21 @@
 import sqlite3
 import pickle
+import json
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 import yfinance as yf
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Union
+
+GET_MANY_CHUNK = 500  # Tickers per IN (...) query, well under SQLite's bound-parameter limit
+
+
+def _flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Collapse yfinance (Price, Ticker) MultiIndex columns to their first level, in place"""
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df
+
 
 class DataCache:
     """Cache for yfinance data to speed up repeated scans"""
@@ -31,9 +42,21 @@ class DataCache:
             )
         """)
         
+        # (date_cached, ticker) covers the "fresh tickers" listing as an index-only scan
+        # and still serves date_cached range filters; it supersedes the old single-column index
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_pc_datecached_ticker 
+            ON price_cache(date_cached, ticker)
+        """)
+        cursor.execute("DROP INDEX IF EXISTS idx_date_cached")
+        
+        # yfinance .info fundamentals (P/E, market cap, ...), shared across processes and restarts
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_date_cached 
-            ON price_cache(date_cached)
+            CREATE TABLE IF NOT EXISTS fundamentals_cache (
+                ticker TEXT PRIMARY KEY,
+                date_cached TIMESTAMP NOT NULL,
+                data TEXT NOT NULL
+            )
         """)
         
         conn.commit()
@@ -65,6 +88,57 @@ class DataCache:
         
         return None
     
+    def get_many(self, tickers: List[str], periods: Union[str, List[str]], interval: str,
+                 max_age_hours: int = 24) -> dict:
+        """
+        Get fresh cached data for many tickers over one connection
+        
+        periods may be a list in order of preference (e.g. ["6mo", "1y"]): every period
+        is fetched in the same query and each ticker gets its most preferred fresh one.
+        Frames come back with flat columns (MultiIndex collapsed once, here), so callers
+        can read df['Close'] without re-checking the column layout per ticker.
+        
+        Returns:
+            dict of {ticker: DataFrame} for the tickers that are cached and fresh
+        """
+        cached = {}
+        if not tickers:
+            return cached
+        
+        if isinstance(periods, str):
+            periods = [periods]
+        rank = {p: i for i, p in enumerate(periods)}
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        period_placeholders = ",".join("?" * len(periods))
+        
+        best = {}  # ticker -> (rank, blob); only the winning blob is unpickled
+        for start in range(0, len(tickers), GET_MANY_CHUNK):
+            chunk = tickers[start:start + GET_MANY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT ticker, period, data FROM price_cache
+                WHERE ticker IN ({placeholders}) AND period IN ({period_placeholders})
+                AND interval = ? AND date_cached > ?
+            """, (*chunk, *periods, interval, cutoff))
+            
+            for ticker, period, blob in cursor:
+                if ticker not in best or rank[period] < best[ticker][0]:
+                    best[ticker] = (rank[period], blob)
+        
+        conn.close()
+        
+        for ticker, (_, blob) in best.items():
+            try:
+                cached[ticker] = _flatten_columns(pickle.loads(blob))
+            except Exception as e:
+                print(f"Cache error for {ticker}: {e}")
+        
+        return cached
+    
     def set(self, ticker: str, period: str, interval: str, df: pd.DataFrame):
         """Cache data"""
         if df is None or df.empty:
@@ -85,6 +159,45 @@ class DataCache:
         conn.commit()
         conn.close()
     
+    def get_fundamentals(self, ticker: str, max_age_hours: int = 24) -> Optional[dict]:
+        """Get cached fundamentals if available and fresh"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        
+        cursor.execute("""
+            SELECT data FROM fundamentals_cache
+            WHERE ticker = ? AND date_cached > ?
+        """, (ticker, cutoff))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            try:
+                return json.loads(row[0])
+            except Exception as e:
+                print(f"Fundamentals cache error for {ticker}: {e}")
+        return None
+    
+    def set_fundamentals(self, ticker: str, data: dict):
+        """Cache fundamentals"""
+        if not data:
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO fundamentals_cache
+            (ticker, date_cached, data)
+            VALUES (?, ?, ?)
+        """, (ticker, datetime.now(), json.dumps(data)))
+        
+        conn.commit()
+        conn.close()
+
     def batch_check(self, tickers: List[str], period: str, interval: str, 
                     max_age_hours: int = 24) -> Tuple[dict, List[str]]:
         """
@@ -95,15 +208,8 @@ class DataCache:
             cached_data: dict of {ticker: DataFrame}
             to_download: list of tickers that need downloading
         """
-        cached = {}
-        to_download = []
-        
-        for ticker in tickers:
-            df = self.get(ticker, period, interval, max_age_hours)
-            if df is not None:
-                cached[ticker] = df
-            else:
-                to_download.append(ticker)
+        cached = self.get_many(tickers, period, interval, max_age_hours)
+        to_download = [ticker for ticker in tickers if ticker not in cached]
         
         return cached, to_download
     
@@ -1,61 +1,141 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Optional: without numba the scan runs as a plain loop over the bytes
+    njit = None
+
+# Byte actions for the scanner state machine
+NONE, OPEN, CLOSE, QUOTE, SLASH, STAR, NEWLINE = range(7)
+
+ACTIONS = np.zeros(256, dtype=np.uint8)
+for _b in b'({[':
+    ACTIONS[_b] = OPEN
+for _b in b')}]':
+    ACTIONS[_b] = CLOSE
+for _b in b'"\'`':
+    ACTIONS[_b] = QUOTE
+ACTIONS[ord('/')] = SLASH
+ACTIONS[ord('*')] = STAR
+ACTIONS[ord('\n')] = NEWLINE
+
+# Opening byte expected for each closing byte
+MATCHES = np.zeros(256, dtype=np.uint8)
+MATCHES[ord(')')] = ord('(')
+MATCHES[ord('}')] = ord('{')
+MATCHES[ord(']')] = ord('[')
+
+# Scan results
+BALANCED, EXTRA_CLOSING, MISMATCHED = range(3)
+
+
+def _scan(buf, actions, matches, stack):
+    """
+    Single pass over the UTF-8 bytes, skipping strings and comments.
+    Open-bracket offsets are pushed on `stack`. Returns (status, offset of the
+    offending byte, offset of its unmatched opener, stack depth).
+    Multi-byte characters never contain ASCII bytes, so they can't trigger an action.
+    """
+    n = len(buf)
+    sp = 0
+    line_start = 0
+    in_string = False
+    string_char = 0
+    in_multiline_comment = False
+    i = 0
+    while i < n:
+        b = buf[i]
+        action = actions[b]
+        
+        if action == NEWLINE:
+            # A // comment ends with its line; strings and /* */ carry over
+            line_start = i + 1
+        elif in_multiline_comment:
+            if action == STAR and i + 1 < n and buf[i + 1] == 47:  # '*/'
+                in_multiline_comment = False
+                i += 2
+                continue
+        elif in_string:
+            if b == string_char:
+                if i > line_start:
+                    prev = buf[i - 1]
+                else:
+                    # Quote at the start of a line is checked against the line's last byte
+                    j = i
+                    while j < n and buf[j] != 10:
+                        j += 1
+                    prev = buf[j - 1]
+                if prev != 92:  # '\\'
+                    in_string = False
+        elif action == SLASH and i + 1 < n and buf[i + 1] == 42:  # '/*'
+            in_multiline_comment = True
+            i += 2
+            continue
+        elif action == SLASH and i + 1 < n and buf[i + 1] == 47:  # '//'
+            while i < n and buf[i] != 10:
+                i += 1
+            continue
+        elif action == QUOTE:
+            in_string = True
+            string_char = b
+        elif action == OPEN:
+            stack[sp] = i
+            sp += 1
+        elif action == CLOSE:
+            if sp == 0:
+                return EXTRA_CLOSING, i, -1, sp
+            sp -= 1
+            if buf[stack[sp]] != matches[b]:
+                return MISMATCHED, i, stack[sp], sp
+        i += 1
+    return BALANCED, -1, -1, sp
+
+
+if njit is not None:
+    _scan = njit(cache=True)(_scan)
+
+
+def _position(content_bytes, offset):
+    """1-based (line, col) of a byte offset, counting columns in characters."""
+    line_start = content_bytes.rfind(b'\n', 0, offset) + 1
+    line = content_bytes.count(b'\n', 0, offset) + 1
+    col = len(content_bytes[line_start:offset].decode('utf-8')) + 1
+    return line, col
+
+
 def check_balance(filename):
     with open(filename, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    stack = []
-    pairs = {')': '(', '}': '{', ']': '['}
-    lines = content.split('\n')
+    content_bytes = content.encode('utf-8')
+    buf = np.frombuffer(content_bytes, dtype=np.uint8)
+    max_depth = int(np.count_nonzero(ACTIONS[buf] == OPEN))
     
-    # Simple state machine to ignore strings and comments
-    in_string = False
-    string_char = None
-    in_multiline_comment = False
-    in_single_line_comment = False
+    if njit is not None:
+        stack = np.empty(max_depth, dtype=np.int64)
+        status, offset, open_offset, sp = _scan(buf, ACTIONS, MATCHES, stack)
+    else:
+        # Indexing bytes/lists yields plain ints, much faster than NumPy scalars in a Python loop
+        stack = [0] * max_depth
+        status, offset, open_offset, sp = _scan(content_bytes, ACTIONS.tobytes(), MATCHES.tobytes(), stack)
     
-    for line_idx, line in enumerate(lines):
-        i = 0
-        in_single_line_comment = False
-        while i < len(line):
-            char = line[i]
-            
-            if in_multiline_comment:
-                if i + 1 < len(line) and line[i:i+2] == '*/':
-                    in_multiline_comment = False
-                    i += 2
-                    continue
-            elif in_single_line_comment:
-                break
-            elif in_string:
-                if char == string_char and line[i-1] != '\\':
-                    in_string = False
-            else:
-                if i + 1 < len(line) and line[i:i+2] == '/*':
-                    in_multiline_comment = True
-                    i += 2
-                    continue
-                if i + 1 < len(line) and line[i:i+2] == '//':
-                    in_single_line_comment = True
-                    break
-                if char in ['"', "'", '`']:
-                    in_string = True
-                    string_char = char
-                elif char in '({[':
-                    stack.append((char, line_idx + 1, i + 1))
-                elif char in ')}]':
-                    if not stack:
-                        print(f"Extra closing {char} at line {line_idx + 1}, col {i + 1}")
-                        return False
-                    last_char, last_line, last_col = stack.pop()
-                    if last_char != pairs[char]:
-                        print(f"Mismatched {char} at line {line_idx + 1}, col {i + 1}. Expected match for {last_char} from line {last_line}, col {last_col}")
-                        return False
-            i += 1
-            
-    if stack:
-        for char, line, col in stack:
-            print(f"Unclosed {char} from line {line}, col {col}")
+    if status != BALANCED:
+        char = chr(content_bytes[offset])
+        line, col = _position(content_bytes, offset)
+        if status == EXTRA_CLOSING:
+            print(f"Extra closing {char} at line {line}, col {col}")
+        else:
+            last_char = chr(content_bytes[open_offset])
+            last_line, last_col = _position(content_bytes, open_offset)
+            print(f"Mismatched {char} at line {line}, col {col}. Expected match for {last_char} from line {last_line}, col {last_col}")
         return False
-        
+    
+    if sp:
+        for open_offset in stack[:sp]:
+            line, col = _position(content_bytes, open_offset)
+            print(f"Unclosed {chr(content_bytes[open_offset])} from line {line}, col {col}")
+        return False
+    
     print("All brackets are balanced!")
     return True
 
@@ -2,6 +2,7 @@
 Crypto Journal Module (ORM Version)
 Refactored to support Multi-Tenancy and PostgreSQL via SQLAlchemy.
 """
+import asyncio
 from typing import List, Optional
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
@@ -10,6 +11,7 @@ from pydantic import BaseModel
 import models
 from database import get_db
 import auth
+import redis_cache
 
 router = APIRouter()
 
@@ -35,34 +37,42 @@ class CryptoClose(BaseModel):
 
 
 
-# --- Endpoints ---
+STABLECOINS = ('USDT', 'USDC', 'DAI', 'FDUSD')
 
-@router.get("/api/crypto/positions")
-def get_positions(status: str = "OPEN", current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    # 1. Get positions from DB
-    positions = db.query(models.CryptoPosition).filter(
-        models.CryptoPosition.user_id == current_user.id,
+
+def _load_positions(db: Session, user_id: int, status: str) -> list:
+    return db.query(models.CryptoPosition).filter(
+        models.CryptoPosition.user_id == user_id,
         models.CryptoPosition.status == status
     ).all()
+
+
+# --- Endpoints ---
+
+@router.get("/api/crypto/positions")
+async def get_positions(status: str = "OPEN", current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    # 1. Get positions from DB (off the event loop)
+    pos_list = await asyncio.to_thread(_load_positions, db, current_user.id, status)
     
-    # 2. Map to list and collect tickers
-    pos_list = []
-    tickers_to_fetch = set()
-    for p in positions:
-        pos_list.append(p)
-        tickers_to_fetch.add(p.ticker)
+    # 2. Collect tickers; stablecoins are pinned to 1.0 below, so never fetched
+    tickers_to_fetch = {p.ticker for p in pos_list if p.ticker not in STABLECOINS}
     
-    # 3. Live Prices from price_service cache (fast)
+    # 3. Live Prices from price_service cache (fast); misses go out concurrently
+    #    so total latency is the slowest quote, not the sum of all of them
     import price_service
     live_prices = {}
     
-    for ticker in tickers_to_fetch:
-        price_data = price_service.get_crypto_price(ticker.upper())
-        if price_data and price_data.get('price'):
+    tickers = list(tickers_to_fetch)
+    quotes = await asyncio.gather(
+        *(asyncio.to_thread(price_service.get_crypto_price, t.upper()) for t in tickers),
+        return_exceptions=True
+    )
+    for ticker, price_data in zip(tickers, quotes):
+        if isinstance(price_data, dict) and price_data.get('price'):
             live_prices[ticker] = price_data['price']
     
     # Stablecoins always = 1.0
-    for stable in ['USDT', 'USDC', 'DAI', 'FDUSD']: 
+    for stable in STABLECOINS: 
         live_prices[stable] = 1.0
     
     # 4. Enrich
@@ -125,6 +135,7 @@ def add_position(pos: CryptoPositionCreate, current_user: models.User = Depends(
     )
     db.add(new_pos)
     db.commit()
+    redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
     return {"status": "success", "message": "Position added"}
 
 @router.post("/api/crypto/positions/{position_id}/close")
@@ -152,6 +163,7 @@ def close_position(position_id: int, close_data: CryptoClose, current_user: mode
         if close_data.notes:
             pos.notes = (pos.notes or "") + f" | Closed: {close_data.notes}"
         db.commit()
+        redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
         return {"status": "success", "message": "Position closed fully"}
 
     # PARTIAL CLOSE
@@ -181,6 +193,7 @@ def close_position(position_id: int, close_data: CryptoClose, current_user: mode
         # pos.notes = (pos.notes or "") + f" | Sold {sell_amount}"
         
         db.commit()
+        redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
         return {"status": "success", "message": f"Partial sell of {sell_amount} executed"}
 
 @router.delete("/api/crypto/positions/{position_id}")
@@ -195,6 +208,7 @@ def delete_position(position_id: int, current_user: models.User = Depends(auth.g
         
     db.delete(pos)
     db.commit()
+    redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
     return {"status": "success"}
 
 
@@ -255,14 +269,14 @@ def get_trade_history(current_user: models.User = Depends(auth.get_current_user)
     return formatted
 
 @router.get("/api/crypto/ai/portfolio-insight")
-def api_ai_crypto_insight(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+async def api_ai_crypto_insight(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     import market_brain
     try:
         # Reuse get_positions logic to get enriched data
         # We can extract the logic to a helper function
         # But for now, calling the endpoint handler logic is messy.
         # Let's verify get_positions returns a dict (it does).
-        data = get_positions(current_user, db)
+        data = await get_positions(status="OPEN", current_user=current_user, db=db)
         positions = data.get("positions", [])
         metrics = data.get("metrics", {})
         
@@ -281,7 +295,7 @@ def api_ai_crypto_insight(current_user: models.User = Depends(auth.get_current_u
             "sectors": "Cryptocurrency Market"
         }
         
-        insight = market_brain.get_portfolio_insight(portfolio_data)
+        insight = await asyncio.to_thread(market_brain.get_portfolio_insight, portfolio_data)
         return {"insight": insight}
         
     except Exception as e:
@@ -330,6 +344,7 @@ async def upload_csv(file: UploadFile = File(...), current_user: models.User = D
                 continue
                 
         db.commit()
+        redis_cache.invalidate_user(current_user.id, views=redis_cache.PORTFOLIO_VIEWS)
         
         # Trigger Rebuild
         try:
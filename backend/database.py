@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, with_loader_criteria
 import os
 import sys
 
@@ -24,8 +24,20 @@ if not DATABASE_URL:
     print("[CRITICAL] DATABASE_URL is empty!")
     sys.exit(1)
 
+# Sync endpoints run on AnyIO's worker threadpool (sized in main.configure_threadpool).
+# Each busy thread may hold a connection, so pool_size + max_overflow defaults to the
+# threadpool size; otherwise the extra threads just queue on the pool (and time out after 30s).
+# Lower THREADPOOL_SIZE if it exceeds the server's max_connections.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(THREADPOOL_SIZE - DB_POOL_SIZE, 0))))
+
 try:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    if DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    else:
+        engine = create_engine(DATABASE_URL, pool_pre_ping=True,
+                               pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base = declarative_base()
 except Exception as e:
@@ -33,6 +45,22 @@ except Exception as e:
     # Force exit to show log
     sys.exit(1)
 
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _apply_tenant_criteria(state):
+    """
+    Sessions tagged by auth.get_tenant_db only ever see their own trades.
+    The predicate is added as one cached loader criteria (user id bound as a parameter),
+    so endpoints don't need to repeat the user_id filter.
+    """
+    user_id = state.session.info.get("tenant_user_id")
+    if user_id is None or state.is_column_load or state.is_relationship_load:
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        import models
+        state.statement = state.statement.options(
+            with_loader_criteria(models.Trade, lambda cls: cls.user_id == user_id, include_aliases=True)
+        )
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,28 +1,20 @@
-import requests
 import pandas as pd
+import screener
 
 def get_sec_tickers():
     print("Attempting to fetch SEC tickers...")
-    url = "https://www.sec.gov/files/company_tickers.json"
-
     # User's suggested header
     headers = {
         "User-Agent": "Javier Screener 3M Rally (contacto: test@example.com)"
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        print(f"Status Code: {resp.status_code}")
-        resp.raise_for_status()
-
-        data = resp.json()
+        # Shares the screener's on-disk copy; only re-downloads when SEC has a newer file
+        data = screener.fetch_sec_company_tickers(headers)
         print(f"Successfully fetched {len(data)} items from SEC.")
         
-        tickers = []
-        for _, v in data.items():
-            t = v.get("ticker")
-            if t:
-                tickers.append(t)
+        tickers = [v["ticker"] for v in data.values() if v.get("ticker")]
+        del data
         
         print(f"Parsed {len(tickers)} unique tickers.")
         return tickers
@@ -1,17 +1,93 @@
 
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 
+try:
+    from numba import njit
+except ImportError:  # Optional: without numba pivots always use the NumPy window view
+    njit = None
+
+JIT_PIVOT_MIN_BARS = 2000  # Below this the NumPy path is already fast enough
+JIT_PIVOT_MAX_WINDOW = 5   # Above this the O(N) NumPy path beats the early-exit scan
+
+MAX_B_CANDIDATES = 5  # Only the most recent troughs are considered as wave B
+
+# Wave C projections as multiples of wave A's height, added to B
+_FIB_LABELS = ("0.618", "1.0", "1.618", "2.0", "2.618")
+_FIB_RATIOS = np.array([0.618, 1.0, 1.618, 2.0, 2.618])
+
+WAVE_CACHE_SIZE = 256  # Most recently analysed (ticker, bars) results kept in memory
+_wave_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+_wave_cache_lock = threading.Lock()
+
+
+def _pivot_flags(prices, window):
+    """
+    Scalar pivot scan that stops comparing as soon as a neighbour disqualifies the bar.
+    Same semantics as the NumPy path: ties are pivots, NaN never is.
+    """
+    n = len(prices)
+    is_peak = np.zeros(n, np.bool_)
+    is_trough = np.zeros(n, np.bool_)
+    for i in range(window, n - window):
+        c = prices[i]
+        peak = True
+        trough = True
+        for j in range(i - window, i + window + 1):
+            p = prices[j]
+            if peak and not (c >= p):
+                peak = False
+            if trough and not (c <= p):
+                trough = False
+            if not peak and not trough:
+                break
+        is_peak[i] = peak
+        is_trough[i] = trough
+    return is_peak, is_trough
+
+
+if njit is not None:
+    _pivot_flags = njit(cache=True)(_pivot_flags)
+
+
+def _rolling_extreme(prices: np.ndarray, w: int, op: np.ufunc, pad: float) -> np.ndarray:
+    """
+    op (np.maximum / np.minimum) over every length-w window, O(N) for any w.
+    Van Herk / Gil-Werman: split into w-sized blocks, take prefix and suffix running
+    extremes per block; each window spans at most two blocks, so it is the op of one
+    suffix and one prefix value. Only a few linear arrays, no N x w window view.
+    A NaN inside a window makes its result NaN, like ndarray.max().
+    """
+    n = len(prices)
+    blocks = -(-n // w)
+    padded = np.full(blocks * w, pad)
+    padded[:n] = prices
+    padded = padded.reshape(blocks, w)
+    prefix = op.accumulate(padded, axis=1).ravel()
+    suffix = op.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return op(suffix[:n - w + 1], prefix[w - 1:n])
+
+
 def find_pivot_points(prices: np.ndarray, window: int = 5) -> Tuple[List[int], List[int]]:
-    """Find local peaks and troughs"""
-    peaks, troughs = [], []
-    for i in range(window, len(prices) - window):
-        if all(prices[i] >= prices[i-window:i]) and all(prices[i] >= prices[i+1:i+window+1]):
-            peaks.append(i)
-        if all(prices[i] <= prices[i-window:i]) and all(prices[i] <= prices[i+1:i+window+1]):
-            troughs.append(i)
-    return peaks, troughs
+    """Find local peaks and troughs (bars that are the max/min of the `window` bars on each side)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    w = 2 * window + 1
+    if len(prices) < w:
+        return [], []
+    
+    if njit is not None and len(prices) >= JIT_PIVOT_MIN_BARS and window <= JIT_PIVOT_MAX_WINDOW:
+        is_peak, is_trough = _pivot_flags(prices, window)
+        return np.flatnonzero(is_peak).tolist(), np.flatnonzero(is_trough).tolist()
+    
+    # Centred window extremes; ties count as pivots (>= / <=)
+    centers = prices[window:len(prices) - window]
+    peaks = np.flatnonzero(_rolling_extreme(prices, w, np.maximum, -np.inf) == centers) + window
+    troughs = np.flatnonzero(_rolling_extreme(prices, w, np.minimum, np.inf) == centers) + window
+    return peaks.tolist(), troughs.tolist()
 
 def find_abc_breakout(df: pd.DataFrame) -> Dict:
     """
@@ -20,8 +96,8 @@ def find_abc_breakout(df: pd.DataFrame) -> Dict:
     2. Find subsequent High that 'supera el ultimo maximo' (Wave A).
     3. Find retracement Low (Wave B).
     """
-    closes = df['Close'].values
-    dates = df.index
+    closes = np.ascontiguousarray(df['Close'].to_numpy(dtype=np.float64))  # one typed buffer for pivots and lookups
+    dates = df.index.values  # raw datetime64, no per-access Timestamp boxing
     
     # 1. Find Pivots
     peaks, troughs = find_pivot_points(closes, window=3)
@@ -41,18 +117,19 @@ def find_abc_breakout(df: pd.DataFrame) -> Dict:
     
     best_pattern = None
     
-    # Iterate through potential Trough B's (starting from recent)
-    recent_troughs = [p for p in pivots if p[1] == 'trough'][-5:] 
+    # Iterate through potential Trough B's (the 5 most recent), by position in the full pivot list
+    # Newest first: the first valid match is the latest pattern, so stop there
+    troughs_checked = 0
     
-    for b_idx_in_pivots, (b_idx, _, b_price) in enumerate(recent_troughs):
-        # Find preceding Peak A
-        # We need to find the peak immediately preceding this trough in the FULL pivot list
-        # Let's find index in full list
-        try:
-            full_idx = pivots.index((b_idx, 'trough', b_price))
-        except ValueError:
+    for full_idx in range(len(pivots) - 1, -1, -1):
+        if pivots[full_idx][1] != 'trough':
             continue
-            
+        if troughs_checked == MAX_B_CANDIDATES:
+            break
+        troughs_checked += 1
+        
+        b_idx, _, b_price = pivots[full_idx]
+        
         if full_idx < 1: continue
         
         a_pivot = pivots[full_idx - 1]
@@ -87,47 +164,39 @@ def find_abc_breakout(df: pd.DataFrame) -> Dict:
                     # User: "si el precio supera el ultimo maximo"
                     pass # We will check this but maybe allow it if it triggers projections
         
-        # Calculate Amplitudes
-        wave_a_height = a_price - l0_price
-        wave_b_retracement = a_price - b_price
-        
-        # Projections for C (Extensions of A)
-        # C = B + A_height * ratios
-        fib_targets = {
-            "0.618": b_price + (wave_a_height * 0.618),
-            "1.0":   b_price + (wave_a_height * 1.0),
-            "1.618": b_price + (wave_a_height * 1.618),
-            "2.0":   b_price + (wave_a_height * 2.0),
-            "2.618": b_price + (wave_a_height * 2.618)
-        }
-        
-        # Check if we are currently IN Wave C (after B)
-        # Current price > B?
-        current_price = closes[-1]
-        
-        pattern = {
-            "points": {
-                "start": (str(dates[l0_idx].date()), l0_price),
-                "A": (str(dates[a_idx].date()), a_price),
-                "B": (str(dates[b_idx].date()), b_price)
-            },
-            "wave_labels": [
-                {"date": str(dates[l0_idx].date()), "price": l0_price, "label": "Start", "type": "trough"},
-                {"date": str(dates[a_idx].date()), "price": a_price, "label": "A", "type": "peak"},
-                {"date": str(dates[b_idx].date()), "price": b_price, "label": "B", "type": "trough"},
-            ],
-            "projections": fib_targets,
-            "quality": "High" if wave_b_retracement < wave_a_height * 0.7 else "Medium"
-        }
-        
-        # Prefer the most recent confirmed B
-        best_pattern = pattern
-        # Continue searching?
-        # If we want the *latest* pattern, we iterate from end?
-        # We are iterating troughs. We want the one closest to current date?
-        # Yes, let's take the latest valid one.
+        # Prefer the most recent confirmed B; only the pivots are kept, formatting happens once below
+        best_pattern = (l0_pivot, a_pivot, pivots[full_idx])
+        break
+    
+    if best_pattern is None:
+        return None
     
-    return best_pattern
+    (l0_idx, _, l0_price), (a_idx, _, a_price), (b_idx, _, b_price) = best_pattern
+    
+    # Calculate Amplitudes
+    wave_a_height = a_price - l0_price
+    wave_b_retracement = a_price - b_price
+    
+    # Projections for C (Extensions of A)
+    # C = B + A_height * ratios
+    fib_targets = dict(zip(_FIB_LABELS, (b_price + wave_a_height * _FIB_RATIOS).tolist()))
+    
+    l0_date, a_date, b_date = np.datetime_as_string(dates[[l0_idx, a_idx, b_idx]], unit='D').tolist()
+    
+    return {
+        "points": {
+            "start": (l0_date, l0_price),
+            "A": (a_date, a_price),
+            "B": (b_date, b_price)
+        },
+        "wave_labels": [
+            {"date": l0_date, "price": l0_price, "label": "Start", "type": "trough"},
+            {"date": a_date, "price": a_price, "label": "A", "type": "peak"},
+            {"date": b_date, "price": b_price, "label": "B", "type": "trough"},
+        ],
+        "projections": fib_targets,
+        "quality": "High" if wave_b_retracement < wave_a_height * 0.7 else "Medium"
+    }
 
 def analyze_elliott_waves(df: pd.DataFrame) -> Dict:
     """
@@ -179,3 +248,26 @@ def analyze_elliott_waves(df: pd.DataFrame) -> Dict:
     except Exception as e:
         print(f"Error in simplified ABC: {e}")
         return {"elliott_wave": {"error": str(e)}, "wave_labels": []}
+
+
+def analyze_elliott_waves_cached(df: pd.DataFrame, ticker: str) -> Dict:
+    """
+    analyze_elliott_waves memoized per ticker. Bars are append-only, so the last bar's
+    timestamp, the bar count and the last close (which still moves intraday) identify the input.
+    """
+    if df.empty:
+        return analyze_elliott_waves(df)
+    
+    key = (ticker, df.index[-1].value, len(df), float(df['Close'].iloc[-1]))
+    with _wave_cache_lock:
+        hit = _wave_cache.get(key)
+        if hit is not None:
+            _wave_cache.move_to_end(key)
+            return hit
+    
+    out = analyze_elliott_waves(df)
+    with _wave_cache_lock:
+        _wave_cache[key] = out
+        if len(_wave_cache) > WAVE_CACHE_SIZE:
+            _wave_cache.popitem(last=False)
+    return out
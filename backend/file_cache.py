@@ -0,0 +1,78 @@
+"""
+File Cache
+Small JSON-on-disk key/value cache with per-entry expiry.
+Survives process restarts and is shared between the API and scheduler workers.
+"""
+
+import os
+import json
+import logging
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileCache:
+    """One JSON file per key under `cache_dir`, written atomically."""
+
+    def __init__(self, cache_dir: str = "data/file_cache", default_ttl: int = 60):
+        self.cache_dir = Path(cache_dir)
+        self.default_ttl = default_ttl
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{hashlib.md5(key.encode('utf-8')).hexdigest()}.json"
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires_at epoch) if present and fresh, else None."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        expires_at = entry.get("expires_at", 0)
+        if time.time() >= expires_at:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return entry.get("value"), expires_at
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return cached value if present and fresh."""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Write value with expiry; temp file + os.replace so readers never see partial JSON."""
+        entry = {
+            "key": key,
+            "value": value,
+            "expires_at": time.time() + (self.default_ttl if ttl is None else ttl),
+        }
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Write error for %s: %s", key, e)
+            try:
+                os.unlink(tmp_path)
+            except (OSError, NameError):
+                pass
+
+    def clear(self):
+        """Remove all cached files."""
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
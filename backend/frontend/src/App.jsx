@@ -1306,6 +1306,8 @@ function TradeJournal() {
             let totalExitValue = 0;
             let minEntryDate = null;
             let maxExitDate = null;
+            let minEntryMs = 0;   // Parsed once per trade; compared as numbers
+            let maxExitMs = 0;
             let totalPnl = 0;
 
             groupTrades.forEach(t => {
@@ -1313,8 +1315,10 @@ function TradeJournal() {
                 totalHistoryShares += t.shares;
                 totalHistoryCost += (t.entry_price || 0) * t.shares;
 
-                if (!minEntryDate || new Date(t.entry_date) < new Date(minEntryDate)) {
+                const entryMs = Date.parse(t.entry_date);
+                if (!minEntryDate || entryMs < minEntryMs) {
                     minEntryDate = t.entry_date;
+                    minEntryMs = entryMs;
                 }
 
                 if (t.status === 'OPEN') {
@@ -1328,8 +1332,10 @@ function TradeJournal() {
                     if (t.pnl) totalPnl += t.pnl;
                     if (t.exit_price) totalExitValue += (t.exit_price * t.shares);
                     if (t.exit_date) {
-                        if (!maxExitDate || new Date(t.exit_date) > new Date(maxExitDate)) {
+                        const exitMs = Date.parse(t.exit_date);
+                        if (!maxExitDate || exitMs > maxExitMs) {
                             maxExitDate = t.exit_date;
+                            maxExitMs = exitMs;
                         }
                     }
                 }
@@ -5411,6 +5417,8 @@ function ArgentinaPanel() {
             let totalExitValue = 0;
             let minEntryDate = null;
             let maxExitDate = null;
+            let minEntryMs = 0;   // Parsed once per trade; compared as numbers
+            let maxExitMs = 0;
             let totalPnl = 0;
 
             groupTrades.forEach(t => {
@@ -5418,8 +5426,10 @@ function ArgentinaPanel() {
                 totalHistoryShares += t.shares;
                 totalHistoryCost += entryPrice * t.shares;
 
-                if (!minEntryDate || new Date(t.entry_date) < new Date(minEntryDate)) {
+                const entryMs = Date.parse(t.entry_date);
+                if (!minEntryDate || entryMs < minEntryMs) {
                     minEntryDate = t.entry_date;
+                    minEntryMs = entryMs;
                 }
 
                 if (t.status === 'OPEN') {
@@ -5436,8 +5446,10 @@ function ArgentinaPanel() {
                     totalExitValue += exitPrice * t.shares;
 
                     if (t.exit_date) {
-                        if (!maxExitDate || new Date(t.exit_date) > new Date(maxExitDate)) {
+                        const exitMs = Date.parse(t.exit_date);
+                        if (!maxExitDate || exitMs > maxExitMs) {
                             maxExitDate = t.exit_date;
+                            maxExitMs = exitMs;
                         }
                     }
                 }
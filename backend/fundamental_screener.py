@@ -4,17 +4,78 @@ Builds monthly portfolios based on Sharpe Ratio > 2 and P/E filters.
 Reuses cached data from Weekly RSI Scanner to avoid redundant API calls.
 """
 
+import asyncio
+import heapq
+import threading
 import pandas as pd
 import numpy as np
 import yfinance as yf
+import httpx
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
 import cache
 import market_data
 
+try:
+    from numba import njit
+except ImportError:  # Optional: without numba Sharpe stats use NumPy array ops
+    njit = None
+
 # Sharpe calculation constants
 TRADING_DAYS_PER_YEAR = 252
 RISK_FREE_RATE = 0.04  # 4% annual risk-free rate (adjustable)
+FUNDAMENTALS_WORKERS = 16  # Parallel yfinance .info lookups in the P/E phase
+
+# Async fundamentals: Yahoo quoteSummary (the endpoint behind yfinance .info) over one pooled client
+YAHOO_COOKIE_URL = "https://fc.yahoo.com"
+YAHOO_CRUMB_URL = "https://query2.finance.yahoo.com/v1/test/getcrumb"
+YAHOO_QUOTE_SUMMARY_URL = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}"
+YAHOO_SUMMARY_MODULES = "summaryDetail,price,defaultKeyStatistics,assetProfile"
+YAHOO_HEADERS = {"User-Agent": "Mozilla/5.0"}  # Yahoo rejects the default client user agent
+FUNDAMENTALS_ASYNC_CONNECTIONS = 32
+FUNDAMENTALS_TIMEOUT_SECONDS = 10.0
+
+
+def _daily_return_stats(close):
+    """
+    Closes seen, mean and sample std (ddof=1) of simple returns between consecutive
+    non-NaN closes, in two passes with no temporary arrays.
+    """
+    n_closes = 0
+    n = 0
+    prev = 0.0
+    total = 0.0
+    for i in range(close.shape[0]):
+        c = close[i]
+        if np.isnan(c):
+            continue
+        if n_closes > 0:
+            total += (c - prev) / prev
+            n += 1
+        n_closes += 1
+        prev = c
+    if n < 2:
+        return n_closes, np.nan, np.nan
+    
+    mean = total / n
+    sq = 0.0
+    seen = 0
+    for i in range(close.shape[0]):
+        c = close[i]
+        if np.isnan(c):
+            continue
+        if seen > 0:
+            d = (c - prev) / prev - mean
+            sq += d * d
+        seen += 1
+        prev = c
+    return n_closes, mean, np.sqrt(sq / (n - 1))
+
+
+if njit is not None:
+    # NumPy error model: a zero close yields inf/NaN returns (-> None below) instead of raising
+    _daily_return_stats = njit(cache=True, error_model="numpy")(_daily_return_stats)
 
 
 def calculate_sharpe(df: pd.DataFrame, risk_free_annual: float = RISK_FREE_RATE) -> Optional[float]:
@@ -25,11 +86,7 @@ def calculate_sharpe(df: pd.DataFrame, risk_free_annual: float = RISK_FREE_RATE)
     if df is None or df.empty:
         return None
     
-    # Normalize if MultiIndex
-    if isinstance(df.columns, pd.MultiIndex):
-        df = df.copy()
-        df.columns = df.columns.get_level_values(0)
-    
+    # 'Close' selects the top level of a MultiIndex directly, no flattened copy needed
     if 'Close' not in df.columns:
         return None
     
@@ -37,21 +94,26 @@ def calculate_sharpe(df: pd.DataFrame, risk_free_annual: float = RISK_FREE_RATE)
     if isinstance(close, pd.DataFrame):
         close = close.iloc[:, 0]
     
-    close = close.dropna()
-    if len(close) < 60:  # Need at least ~3 months of data
-        return None
-    
-    # Calculate daily returns
-    daily_returns = close.pct_change().dropna()
-    
-    if len(daily_returns) < 50:
-        return None
-    
-    # Annualized metrics
-    mean_daily_return = daily_returns.mean()
-    std_daily_return = daily_returns.std()
+    close = close.to_numpy(dtype=np.float64)
+    if njit is not None:
+        # One compiled pass over the closes, NaNs skipped in place
+        n_closes, mean_daily_return, std_daily_return = _daily_return_stats(close)
+        if n_closes < 60:  # Need at least ~3 months of data
+            return None
+    else:
+        # Plain float64 array math instead of pct_change/mean/std Series intermediates
+        close = close[~np.isnan(close)]
+        if len(close) < 60:  # Need at least ~3 months of data
+            return None
+        
+        # Calculate daily returns
+        daily_returns = np.diff(close) / close[:-1]
+        
+        # Annualized metrics
+        mean_daily_return = daily_returns.mean()
+        std_daily_return = daily_returns.std(ddof=1)
     
-    if std_daily_return == 0 or pd.isna(std_daily_return):
+    if std_daily_return == 0 or np.isnan(std_daily_return):
         return None
     
     # Annualized Sharpe (without risk-free for simplicity, or subtract daily risk-free)
@@ -64,35 +126,145 @@ def calculate_sharpe(df: pd.DataFrame, risk_free_annual: float = RISK_FREE_RATE)
 
 
 # In-memory simple cache for fundamentals to speed up repeated scans
+# Filled from the scan's worker threads, so writes go through the lock
 FUNDAMENTALS_CACHE = {}
+_fundamentals_lock = threading.Lock()
+FUNDAMENTALS_MAX_AGE_HOURS = 24  # Persisted .info snapshots older than this are refetched
+
+def _fundamentals_from_info(ticker: str, info: Dict) -> Dict:
+    """Pick the screener fields out of a yfinance-style .info dict."""
+    return {
+        "pe_ratio": info.get("trailingPE") or info.get("forwardPE"),
+        "market_cap": info.get("marketCap", 0),
+        "sector": info.get("sector", "Unknown"),
+        "industry": info.get("industry", "Unknown"),
+        "dividend_yield": info.get("dividendYield", 0),
+        "beta": info.get("beta", 1.0),
+        "name": info.get("shortName", ticker)
+    }
+
+
+def _remember_fundamentals(ticker: str, data: Dict) -> Dict:
+    """Store in the in-process cache and return the entry that ends up there."""
+    with _fundamentals_lock:
+        # Concurrent scans may race on the same ticker: keep the first stored entry
+        return FUNDAMENTALS_CACHE.setdefault(ticker, data)
+
 
 def get_fundamentals(ticker: str) -> Dict:
     """
     Get fundamental data (P/E, Market Cap, etc.) from yfinance.
-    Uses in-memory cache to prevent redundant network calls.
+    Checks the in-memory cache, then the persisted cache DB, before any network call.
     """
     if ticker in FUNDAMENTALS_CACHE:
         return FUNDAMENTALS_CACHE[ticker]
-        
+    
     try:
-        t = yf.Ticker(ticker)
-        info = t.info
-        data = {
-            "pe_ratio": info.get("trailingPE") or info.get("forwardPE"),
-            "market_cap": info.get("marketCap", 0),
-            "sector": info.get("sector", "Unknown"),
-            "industry": info.get("industry", "Unknown"),
-            "dividend_yield": info.get("dividendYield", 0),
-            "beta": info.get("beta", 1.0),
-            "name": info.get("shortName", ticker)
-        }
-        FUNDAMENTALS_CACHE[ticker] = data
-        return data
+        c = cache.get_cache()
+        data = c.get_fundamentals(ticker, max_age_hours=FUNDAMENTALS_MAX_AGE_HOURS)
+        if data is None:
+            t = yf.Ticker(ticker)
+            data = _fundamentals_from_info(ticker, t.info)
+            c.set_fundamentals(ticker, data)
+        return _remember_fundamentals(ticker, data)
     except Exception as e:
         print(f"Error getting fundamentals for {ticker}: {e}")
         return {}
 
 
+async def get_fundamentals_async(client: httpx.AsyncClient, crumb: str, ticker: str) -> Optional[Dict]:
+    """
+    Fundamentals for one ticker from Yahoo quoteSummary over a shared client.
+    The modules are flattened into .info-style keys ({"raw": x} -> x), so the same
+    field mapping as get_fundamentals applies. Returns None if Yahoo has no data.
+    """
+    resp = await client.get(
+        YAHOO_QUOTE_SUMMARY_URL.format(ticker=ticker),
+        params={"modules": YAHOO_SUMMARY_MODULES, "crumb": crumb}
+    )
+    resp.raise_for_status()
+    result = (resp.json().get("quoteSummary") or {}).get("result")
+    if not result:
+        return None
+    
+    info = {}
+    for module in result[0].values():
+        if isinstance(module, dict):
+            for key, value in module.items():
+                if isinstance(value, dict):
+                    if "raw" not in value:  # {} = no value; .info omits such keys too
+                        continue
+                    value = value["raw"]
+                info.setdefault(key, value)
+    return _fundamentals_from_info(ticker, info)
+
+
+async def _afetch_fundamentals_many(tickers: List[str]) -> Dict[str, Dict]:
+    """All tickers concurrently on one pooled client; failed tickers are left out."""
+    limits = httpx.Limits(max_connections=FUNDAMENTALS_ASYNC_CONNECTIONS,
+                          max_keepalive_connections=FUNDAMENTALS_ASYNC_CONNECTIONS)
+    async with httpx.AsyncClient(timeout=FUNDAMENTALS_TIMEOUT_SECONDS, limits=limits,
+                                 headers=YAHOO_HEADERS, follow_redirects=True) as client:
+        # Yahoo only serves quoteSummary with a session cookie plus its matching crumb
+        await client.get(YAHOO_COOKIE_URL)
+        crumb_resp = await client.get(YAHOO_CRUMB_URL)
+        crumb_resp.raise_for_status()
+        crumb = crumb_resp.text.strip()
+        
+        results = await asyncio.gather(
+            *[get_fundamentals_async(client, crumb, t) for t in tickers], return_exceptions=True
+        )
+    return {t: data for t, data in zip(tickers, results) if isinstance(data, dict)}
+
+
+def fetch_fundamentals_many(tickers: List[str]) -> Dict[str, Dict]:
+    """
+    Fundamentals for many tickers: cached entries first, then every miss concurrently
+    over async HTTP, then the per-ticker yfinance thread pool for whatever that missed.
+    """
+    fundamentals = {}
+    misses = []
+    c = cache.get_cache()
+    for ticker in tickers:
+        data = FUNDAMENTALS_CACHE.get(ticker)
+        if data is None:
+            data = c.get_fundamentals(ticker, max_age_hours=FUNDAMENTALS_MAX_AGE_HOURS)
+            if data is not None:
+                data = _remember_fundamentals(ticker, data)
+        if data is None:
+            misses.append(ticker)
+        else:
+            fundamentals[ticker] = data
+    
+    if misses:
+        try:
+            asyncio.get_running_loop()
+            in_event_loop = True
+        except RuntimeError:
+            in_event_loop = False
+        
+        try:
+            if in_event_loop:
+                # Called from async code: asyncio.run can't nest, so give the batch its own loop on a worker thread
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    fetched = executor.submit(lambda: asyncio.run(_afetch_fundamentals_many(misses))).result()
+            else:
+                fetched = asyncio.run(_afetch_fundamentals_many(misses))
+        except Exception as e:  # No crumb / network down: Yahoo's cookie+crumb endpoints are undocumented
+            print(f"Async fundamentals fetch failed, using yfinance: {e}")
+            fetched = {}
+        for ticker, data in fetched.items():
+            c.set_fundamentals(ticker, data)
+            fundamentals[ticker] = _remember_fundamentals(ticker, data)
+        
+        leftover = [t for t in misses if t not in fetched]
+        if leftover:
+            with ThreadPoolExecutor(max_workers=FUNDAMENTALS_WORKERS) as executor:
+                fundamentals.update(zip(leftover, executor.map(get_fundamentals, leftover)))
+    
+    return fundamentals
+
+
 def scan_sharpe_portfolio(
     min_sharpe: float = 1.5,
     max_pe: float = 50.0,
@@ -128,10 +300,13 @@ def scan_sharpe_portfolio(
     cursor = conn.cursor()
     
     # Get tickers cached in last 24 hours
+    # Pinned to the covering (date_cached, ticker) index: left alone, SQLite walks the primary
+    # key for ticker order and reads every row (blob pages included) to check date_cached
     cutoff = datetime.now() - timedelta(hours=24)
     cursor.execute("""
-        SELECT DISTINCT ticker FROM price_cache 
+        SELECT ticker FROM price_cache INDEXED BY idx_pc_datecached_ticker
         WHERE date_cached > ?
+        GROUP BY ticker
     """, (cutoff,))
     
     cached_tickers = [row[0] for row in cursor.fetchall()]
@@ -146,13 +321,13 @@ def scan_sharpe_portfolio(
     # PHASE 1: Fast Filter (Sharpe Only) - No Network Calls
     candidates = []
     
+    # Bulk-load cached price data in one pass: 6mo preferred, 1y when that is all there is
+    prices_map = c.get_many(cached_tickers, ["6mo", "1y"], "1d", max_age_hours=24)
+    
     for ticker in cached_tickers:
         scanned += 1
         
-        # Get cached price data
-        df = c.get(ticker, "6mo", "1d", max_age_hours=24)
-        if df is None:
-            df = c.get(ticker, "1y", "1d", max_age_hours=24)
+        df = prices_map.get(ticker)
         
         if df is None or df.empty:
             continue
@@ -162,15 +337,17 @@ def scan_sharpe_portfolio(
         if sharpe is None or sharpe < min_sharpe:
             continue
             
-        # Get current price
-        if isinstance(df.columns, pd.MultiIndex):
-            close_col = df['Close']
-            if isinstance(close_col, pd.DataFrame):
-                close_col = close_col.iloc[:, 0]
-        else:
-            close_col = df['Close']
+        # Get current price (get_many already flattened the columns)
+        close_col = df['Close']
+        if isinstance(close_col, pd.DataFrame):
+            close_col = close_col.iloc[:, 0]
         
-        current_price = float(close_col.dropna().iloc[-1]) if not close_col.empty else 0
+        # Last non-NaN close: walk back from the end (usually one step) instead of dropna()
+        closes = close_col.to_numpy(dtype=np.float64)
+        i = len(closes) - 1
+        while i >= 0 and np.isnan(closes[i]):
+            i -= 1
+        current_price = float(closes[i]) if i >= 0 else 0
         
         candidates.append({
             "ticker": ticker,
@@ -186,51 +363,43 @@ def scan_sharpe_portfolio(
     # PHASE 2: Heavy Filter (Fundamentals) - Network Calls
     # Only process top N candidates to save time
     
-    results = []
-    
     # If we have too many candidates, we only process the top ones + buffer
     # Buffer allows for some to be filtered out by P/E
     candidates_to_process = candidates[:max_results * 3] 
     
-    for cand in candidates_to_process:
-        if len(results) >= max_results:
-            break
-            
-        ticker = cand["ticker"]
-        
-        # Get fundamentals (P/E filter)
-        fundamentals = get_fundamentals(ticker)
-        pe = fundamentals.get("pe_ratio")
-        market_cap = fundamentals.get("market_cap", 0)
+    results = []
+    
+    # Fundamentals in ranking-order waves, stopping once max_results pass: each wave is as large
+    # as the results still needed (at least FUNDAMENTALS_WORKERS), so usually one concurrent batch
+    # covers the scan and candidates past the cut-off are never fetched
+    start = 0
+    while start < len(candidates_to_process) and len(results) < max_results:
+        wave = candidates_to_process[start:start + max(max_results - len(results), FUNDAMENTALS_WORKERS)]
+        start += len(wave)
         
-        # Apply filters
-        # Safely convert P/E to float if needed
-        pe_filtered = False
-        if pe is not None:
-            try:
-                pe_float = float(pe)
-                if pe_float < min_pe or pe_float > max_pe:
-                    pe_filtered = True
-            except (ValueError, TypeError):
-                # If PE is not a valid number, ignore it
-                pass 
+        fundamentals_map = fetch_fundamentals_many([c["ticker"] for c in wave])
+        fundamentals_list = [fundamentals_map.get(cand["ticker"], {}) for cand in wave]
         
-        if pe_filtered:
-            continue
+        # Apply filters as vectorized masks, in Sharpe order
+        # P/E coerced to float: missing or invalid P/E becomes NaN and is ignored, as is a missing market cap
+        pe = pd.to_numeric(pd.Series([f.get("pe_ratio") for f in fundamentals_list], dtype=object), errors='coerce')
+        market_cap = pd.to_numeric(pd.Series([f.get("market_cap", 0) for f in fundamentals_list], dtype=object), errors='coerce')
+        keep = (pe.isna() | pe.between(min_pe, max_pe)) & ~(market_cap < min_market_cap)
         
-        if market_cap is not None and market_cap < min_market_cap:
-            continue
-            
-        results.append({
-            "ticker": ticker,
-            "sharpe": cand["sharpe"],
-            "pe_ratio": pe,
-            "market_cap": market_cap,
-            "sector": fundamentals.get("sector", "Unknown"),
-            "name": fundamentals.get("name", ticker),
-            "price": cand["price"],
-            "beta": fundamentals.get("beta", 1.0)
-        })
+        for i in np.flatnonzero(keep.to_numpy())[:max_results - len(results)]:
+            cand = wave[i]
+            fundamentals = fundamentals_list[i]
+            ticker = cand["ticker"]
+            results.append({
+                "ticker": ticker,
+                "sharpe": cand["sharpe"],
+                "pe_ratio": fundamentals.get("pe_ratio"),
+                "market_cap": fundamentals.get("market_cap", 0),
+                "sector": fundamentals.get("sector", "Unknown"),
+                "name": fundamentals.get("name", ticker),
+                "price": cand["price"],
+                "beta": fundamentals.get("beta", 1.0)
+            })
     
     print(f"✅ Final Results: {len(results)} stocks")
     
@@ -287,19 +456,14 @@ def build_equal_weight_portfolio(candidates: List[Dict], max_positions: int = 10
     if not candidates:
         return {"positions": [], "weight_per_position": 0}
     
-    filtered_candidates = candidates.copy()
+    filtered_candidates = candidates
     
     if strategy == 'undervalued':
         # Strict Value Filter: Must be profitable (PE > 0) and Cheap (PE < 20)
         filtered_candidates = [c for c in filtered_candidates if c.get('pe_ratio') and 0 < c.get('pe_ratio') < 20]
-        # Sort by Sharpe Desc
-        filtered_candidates.sort(key=lambda x: x.get('sharpe', 0), reverse=True)
-    else:
-        # Default Sharpe Sort
-        filtered_candidates.sort(key=lambda x: x.get('sharpe', 0), reverse=True)
     
-    # Take top N
-    selected = filtered_candidates[:max_positions]
+    # Take top N by Sharpe Desc: heap selection, no full sort (ties keep input order like a stable sort)
+    selected = heapq.nlargest(max_positions, filtered_candidates, key=lambda x: x.get('sharpe', 0))
     
     if not selected and strategy == 'undervalued':
          # Fallback to Sharpe if absolutely no value stocks found
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 from starlette.middleware.base import BaseHTTPMiddleware
 import uvicorn
@@ -34,13 +34,62 @@ import alerts
 import asyncio
 import asyncio
 from datetime import datetime
+import secrets
 import socket
+import logging
+import logging.handlers
+import queue
+
+# Loggers of our own modules that should emit INFO; third-party libs stay at WARNING
+APP_LOGGERS = ("price_service", "file_cache", "redis_cache", "trade_journal")
+
+def setup_logging():
+    """
+    Route log records through a queue so formatting/stream I/O happens on a
+    dedicated listener thread instead of the request/worker threads.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+    app_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(app_level)
+    
+    listener.start()
+    return listener
 
 # Define Base Directory for relative paths (Crucial for Cloud Deployment)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 app = FastAPI(title="Momentum Screener API")
 
+# Logging is wired up by the server lifecycle, not at import, so scripts/tests importing main keep their own config
+_log_listener = None
+
+@app.on_event("startup")
+async def start_logging():
+    global _log_listener
+    if _log_listener is None:
+        _log_listener = setup_logging()
+
+@app.on_event("shutdown")
+async def stop_logging():
+    """Flush queued records and detach the queue handler from the root logger."""
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is _log_listener.queue:
+            root.removeHandler(handler)
+    _log_listener = None
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -172,6 +221,24 @@ def serve_root():
 def health_check():
     return {"status": "ok"}
 
+# Bearer token for /metrics (Prometheus `authorization` / `bearer_token`); unset = endpoint disabled
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint (price cache hit/miss + upstream latency)."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    
+    try:
+        from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+    except ImportError:
+        raise HTTPException(status_code=404, detail="prometheus_client not installed")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/api/universe")
 def get_universe():
     return screener.get_sec_tickers()
@@ -229,7 +296,7 @@ async def scheduled_reports_loop():
                 # Update price cache for open positions
                 try:
                     import price_service
-                    price_service.background_price_update()
+                    await price_service.background_price_update_async()
                 except Exception as e:
                     print(f"Error in background price update: {e}")
 
@@ -287,7 +354,7 @@ async def initial_price_warmup():
     print("Running initial price warmup...")
     try:
         import price_service
-        price_service.background_price_update()
+        await price_service.background_price_update_async()
     except Exception as e:
         print(f"Warmup failed: {e}")
 
@@ -455,7 +522,7 @@ def analyze_ticker(req: AnalyzeRequest):
                 result["score"] = score
             
             # Add Elliott Wave analysis
-            elliott_analysis = elliott.analyze_elliott_waves(df_grade)
+            elliott_analysis = elliott.analyze_elliott_waves_cached(df_grade, req.ticker)
             result["elliott_wave"] = elliott_analysis
     except Exception as e:
         print(f"Error in analysis extras for {req.ticker}: {e}")
@@ -924,6 +991,20 @@ async def alert_monitor_loop():
         
         await asyncio.sleep(300)  # 5 minutes
 
+# Shared quote/EMA snapshots for open trades; its own task so a slow refresh
+# never delays the scheduler's price updates or briefings
+TICKER_SNAPSHOT_INTERVAL = int(os.getenv("TICKER_SNAPSHOT_INTERVAL", "60"))
+
+async def ticker_snapshot_loop():
+    """Background task that refreshes open-trade ticker snapshots every minute"""
+    while True:
+        try:
+            await trade_journal.refresh_ticker_snapshots()
+        except Exception as e:
+            print(f"Error refreshing ticker snapshots: {e}")
+        
+        await asyncio.sleep(TICKER_SNAPSHOT_INTERVAL)
+
 async def options_scanner_loop():
     """Background task that refreshes the Swing Options Flow every 30 minutes"""
     import options_scanner
@@ -942,6 +1023,7 @@ async def start_alert_monitor():
     """Start background alert monitoring on server startup"""
     asyncio.create_task(alert_monitor_loop())
     asyncio.create_task(scheduled_reports_loop())
+    asyncio.create_task(ticker_snapshot_loop())
     asyncio.create_task(options_scanner_loop()) # Auto-scan options
     
     # Start scheduled RSI scanner (runs daily at 6pm Argentina / 4pm EST)
@@ -962,7 +1044,6 @@ def run_backtest_api(req: BacktestRequest):
     """Run a strategy backtest simulation"""
     import backtester
     result = backtester.run_backtest(req.ticker, req.strategy)
-    result = backtester.run_backtest(req.ticker, req.strategy)
     return result
 
 @app.get("/api/system/network")
@@ -1022,6 +1103,17 @@ def start_snapshot_scheduler():
     except Exception as e:
         print(f"[Scheduler] Error starting snapshot scheduler: {e}")
 
+# Sync endpoints run on AnyIO's worker threadpool (40 threads by default), which caps
+# how many dashboard requests can wait on the DB or yfinance at once.
+# The DB pool's default capacity follows this size (see database.py).
+from database import THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def configure_threadpool():
+    from anyio import to_thread
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    print(f"[Startup] Worker threadpool size: {THREADPOOL_SIZE}")
+
 # Start scheduler on app startup
 @app.on_event("startup")
 async def startup_event():
@@ -2,6 +2,10 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import pytz
+from datetime import datetime, timedelta
+
+import redis_cache
 
 SECTORS = {
     "Technology": "XLK",
@@ -366,6 +370,93 @@ def get_market_status():
         return {"error": str(e)}
 
 
+def safe_yf_download(tickers, timeout=10, **kwargs):
+    """
+    yf.download wrapper that never raises.
+    Returns an empty DataFrame on failure so callers can just check `.empty`.
+    """
+    kwargs.setdefault("progress", False)
+    try:
+        data = yf.download(tickers, timeout=timeout, **kwargs)
+        return data if data is not None else pd.DataFrame()
+    except Exception as e:
+        print(f"Error downloading {tickers}: {e}")
+        return pd.DataFrame()
+
+
+BENCHMARKS = ("SPY", "QQQ")
+BENCHMARK_PERIOD = "10y"
+_ET = pytz.timezone("US/Eastern")
+_benchmark_local = {}  # ticker -> (day, {date: close}); used when Redis isn't configured
+
+
+def _seconds_until_us_close():
+    """Seconds until shortly after the next 16:00 ET close (when a new daily bar is final)."""
+    now = datetime.now(_ET)
+    close = now.replace(hour=16, minute=5, second=0, microsecond=0)
+    if now >= close:
+        close += timedelta(days=1)
+    return max(60, int((close - now).total_seconds()))
+
+
+def get_benchmark_series(ticker):
+    """
+    Daily closes for a benchmark as a date-indexed Series.
+    Downloaded at most once per trading day and shared via Redis (or in-process).
+    """
+    day = datetime.now(_ET).date().isoformat()
+    key = f"bench:{ticker}:{BENCHMARK_PERIOD}:{day}"
+    
+    closes = redis_cache.get_json(key)
+    if closes is None:
+        local = _benchmark_local.get(ticker)
+        if local and local[0] == day:
+            closes = local[1]
+    
+    if closes is None:
+        data = safe_yf_download(ticker, period=BENCHMARK_PERIOD, interval="1d", auto_adjust=False)
+        closes = {}
+        if not data.empty and 'Close' in data.columns.get_level_values(0):
+            close = data['Close']
+            if isinstance(close, pd.DataFrame):
+                close = close.iloc[:, 0]
+            closes = {d.strftime('%Y-%m-%d'): round(float(v), 4) for d, v in close.dropna().items()}
+        if closes:
+            redis_cache.set_json(key, closes, ex=_seconds_until_us_close())
+            _benchmark_local[ticker] = (day, closes)
+    
+    series = pd.Series(closes, dtype="float64")
+    series.index = pd.to_datetime(series.index)
+    return series.sort_index()
+
+
+def get_benchmark_performance(dates):
+    """
+    % return of each benchmark since the first of `dates`, aligned to `dates`
+    (non-trading days take the previous close). Returns {ticker: [pct or None, ...]}.
+    """
+    result = {t: [] for t in BENCHMARKS}
+    if not dates:
+        return result
+    
+    idx = pd.DatetimeIndex(pd.to_datetime(dates))
+    unique_idx = idx.unique()  # equity curve repeats a date for every trade closed that day
+    
+    for ticker in BENCHMARKS:
+        series = get_benchmark_series(ticker)
+        if series.empty:
+            result[ticker] = [None] * len(idx)
+            continue
+        aligned = series.reindex(series.index.union(unique_idx)).ffill().reindex(unique_idx)
+        valid = aligned.dropna()
+        if valid.empty:
+            result[ticker] = [None] * len(idx)
+            continue
+        pct = ((aligned / valid.iloc[0] - 1) * 100).round(2).reindex(idx)
+        result[ticker] = [None if pd.isna(v) else float(v) for v in pct]
+    return result
+
+
 def get_batch_latest_prices(tickers):
     """
     Fetch latest prices for a list of tickers in one batch request.
@@ -374,7 +465,7 @@ def get_batch_latest_prices(tickers):
     if not tickers:
         return {}
     
-    unique_tickers = list(set([t for t in tickers if t]))
+    unique_tickers = list(dict.fromkeys(t for t in tickers if t))  # dedupe, keep caller order
     if not unique_tickers:
         return {}
         
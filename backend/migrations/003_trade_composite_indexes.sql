@@ -0,0 +1,17 @@
+-- Migration: composite indexes for the trade journal hot paths (PostgreSQL)
+-- CONCURRENTLY avoids locking trades for writes; run each statement outside a transaction.
+
+-- FIFO sell: WHERE user_id, ticker, status ORDER BY entry_date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_trade_user_ticker_open
+    ON trades (user_id, ticker, status, entry_date);
+
+-- Metrics / calendar / equity curve: closed trades ordered by exit_date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_trade_user_closed_exit
+    ON trades (user_id, exit_date)
+    WHERE status = 'CLOSED';
+
+-- Verify
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'trades'
+ORDER BY indexname;
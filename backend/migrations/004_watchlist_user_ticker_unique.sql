@@ -0,0 +1,37 @@
+-- Migration: one watchlist row per (user_id, ticker) (PostgreSQL)
+-- Required by INSERT ... ON CONFLICT (user_id, ticker) DO NOTHING in watchlist.add_watchlist_item.
+-- CONCURRENTLY avoids locking watchlist for writes; run each statement outside a transaction.
+-- Every statement is safe to re-run.
+--
+-- If CREATE UNIQUE INDEX CONCURRENTLY fails (e.g. a duplicate inserted after the DELETE),
+-- it leaves an INVALID index behind that IF NOT EXISTS will silently skip. Check with:
+--   SELECT indisvalid FROM pg_index WHERE indexrelid = 'uq_watchlist_user_ticker'::regclass;
+-- If it returns false: DROP INDEX CONCURRENTLY uq_watchlist_user_ticker;
+-- then re-run this file from the top.
+
+-- Drop duplicates first, keeping the oldest row
+DELETE FROM watchlist w
+USING watchlist d
+WHERE w.user_id = d.user_id
+  AND w.ticker = d.ticker
+  AND w.id > d.id;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_watchlist_user_ticker
+    ON watchlist (user_id, ticker);
+
+-- Promote the index to a constraint; skipped if a previous run already did
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_watchlist_user_ticker'
+    ) THEN
+        ALTER TABLE watchlist
+            ADD CONSTRAINT uq_watchlist_user_ticker UNIQUE USING INDEX uq_watchlist_user_ticker;
+    END IF;
+END
+$$;
+
+-- Verify
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = 'watchlist'::regclass AND contype = 'u';
@@ -0,0 +1,13 @@
+-- Migration: index for the watchlist list query (PostgreSQL)
+-- GET /api/watchlist filters by user_id and orders by created_at DESC.
+-- (user_id, ticker) lookups are already served by uq_watchlist_user_ticker (004).
+-- CONCURRENTLY avoids locking watchlist for writes; run outside a transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_watchlist_user_created
+    ON watchlist (user_id, created_at DESC);
+
+-- Verify
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'watchlist'
+ORDER BY indexname;
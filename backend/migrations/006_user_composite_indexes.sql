@@ -0,0 +1,25 @@
+-- Migration: composite (user_id, status/date) indexes for per-user reads (PostgreSQL)
+-- Open-position and snapshot queries filter on user_id plus status or date;
+-- the single-column user_id indexes left the second predicate to a row filter.
+-- (user_id, ticker) lookups on trades are already served by ix_trade_user_ticker_open (003).
+-- CONCURRENTLY avoids locking the tables for writes; run each statement outside a transaction.
+
+-- Open positions per user: WHERE user_id AND status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_trade_user_status
+    ON trades (user_id, status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_argentina_user_status
+    ON argentina_positions (user_id, status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_crypto_user_status
+    ON crypto_positions (user_id, status);
+
+-- Snapshot history: WHERE user_id AND date (=, >=) / ORDER BY date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_snapshot_user_date
+    ON portfolio_snapshots (user_id, date);
+
+-- Verify
+SELECT tablename, indexname, indexdef
+FROM pg_indexes
+WHERE tablename IN ('trades', 'argentina_positions', 'crypto_positions', 'portfolio_snapshots')
+ORDER BY tablename, indexname;
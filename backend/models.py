@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -52,6 +52,32 @@ class Trade(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User", back_populates="trades")
+    
+    __table_args__ = (
+        # FIFO sell lookup: filter user/ticker/status, walk lots oldest first
+        Index("ix_trade_user_ticker_open", "user_id", "ticker", "status", "entry_date"),
+        # Open positions per user (snapshots, live prices) filter user/status without a ticker
+        Index("ix_trade_user_status", "user_id", "status"),
+        # Metrics / calendar / equity curve only ever read closed trades in exit order
+        Index("ix_trade_user_closed_exit", "user_id", "exit_date",
+              postgresql_where=text("status = 'CLOSED'"),
+              sqlite_where=text("status = 'CLOSED'")),
+    )
+
+class TickerSnapshot(Base):
+    """Latest quote + EMAs per open ticker, refreshed by the scheduler for all users at once."""
+    __tablename__ = "ticker_snapshots"
+    
+    ticker = Column(String, primary_key=True)
+    as_of = Column(DateTime(timezone=True))
+    
+    price = Column(Float)
+    change_pct = Column(Float, default=0)
+    ema_8 = Column(Float, default=0)
+    ema_21 = Column(Float, default=0)
+    ema_200 = Column(Float, default=0)
+    rsi_weekly = Column(Float, nullable=True)
+    source = Column(String, nullable=True)
 
 class PortfolioSnapshot(Base):
     __tablename__ = "portfolio_snapshots"
@@ -83,6 +109,11 @@ class PortfolioSnapshot(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="snapshots")
+    
+    __table_args__ = (
+        # History / chart reads: one user's snapshots by date (exact day, range, or ordered)
+        Index("ix_snapshot_user_date", "user_id", "date"),
+    )
 
 class ArgentinaPosition(Base):
     __tablename__ = "argentina_positions"
@@ -124,6 +155,11 @@ class ArgentinaPosition(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="argentina_positions")
+    
+    __table_args__ = (
+        # Positions are always read per user and usually filtered to OPEN
+        Index("ix_argentina_user_status", "user_id", "status"),
+    )
 
 class CryptoPosition(Base):
     __tablename__ = "crypto_positions"
@@ -152,6 +188,11 @@ class CryptoPosition(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="crypto_positions")
+    
+    __table_args__ = (
+        # Positions are always read per user and usually filtered to OPEN
+        Index("ix_crypto_user_status", "user_id", "status"),
+    )
 
 class BinanceConfig(Base):
     __tablename__ = "binance_config"
@@ -185,3 +226,10 @@ class Watchlist(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="watchlist_items")
+    
+    __table_args__ = (
+        # One row per ticker per user; lets add use INSERT ... ON CONFLICT DO NOTHING
+        UniqueConstraint("user_id", "ticker", name="uq_watchlist_user_ticker"),
+        # List endpoint: one user's items newest first, read straight off the index
+        Index("ix_watchlist_user_created", "user_id", created_at.desc()),
+    )
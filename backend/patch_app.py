@@ -1,5 +1,6 @@
 
 import os
+import mmap
 
 target_file = r"C:\Users\micro\.gemini\antigravity\playground\ancient-glenn\backend\static\app_v2.js"
 
@@ -13,20 +14,24 @@ new_logic = """                            // Aggregation Variables
                             
                             let minEntryDate = null;      // Last Exit - First Entry = Days Held
                             let maxExitDate = null;
+                            let minEntryMs = 0;           // Parsed once per trade; compared as numbers
+                            let maxExitMs = 0;
 
                             let totalPnl = 0;
                             let totalRealized = 0;
 
                             groupTrades.forEach(t => {
-                                const isLong = t.direction === 'LONG';
+                                const sign = t.direction === 'LONG' ? 1 : -1;
                                 
                                 // Track Total History (Open + Closed)
                                 totalHistoryShares += t.shares;
                                 totalHistoryCost += t.entry_price * t.shares;
 
                                 // Date Tracking for "Days Held"
-                                if (!minEntryDate || new Date(t.entry_date) < new Date(minEntryDate)) {
+                                const entryMs = Date.parse(t.entry_date);
+                                if (!minEntryDate || entryMs < minEntryMs) {
                                     minEntryDate = t.entry_date;
+                                    minEntryMs = entryMs;
                                 }
 
                                 if (t.status === 'OPEN') {
@@ -35,7 +40,7 @@ new_logic = """                            // Aggregation Variables
                                     
                                     // Unrealized PnL of open position
                                     const currentPrice = live.current_price || t.entry_price;
-                                    const upnl = (currentPrice - t.entry_price) * t.shares * (isLong ? 1 : -1);
+                                    const upnl = (currentPrice - t.entry_price) * t.shares * sign;
                                     totalPnl += upnl;
                                 } else {
                                     // Realized PnL from closed trades in this group (partials)
@@ -44,8 +49,10 @@ new_logic = """                            // Aggregation Variables
                                     // Exit Values for History Avg
                                     if (t.exit_price) totalExitValue += (t.exit_price * t.shares);
                                     if (t.exit_date) {
-                                        if (!maxExitDate || new Date(t.exit_date) > new Date(maxExitDate)) {
+                                        const exitMs = Date.parse(t.exit_date);
+                                        if (!maxExitDate || exitMs > maxExitMs) {
                                             maxExitDate = t.exit_date;
+                                            maxExitMs = exitMs;
                                         }
                                     }
                                 }
@@ -71,9 +78,8 @@ new_logic = """                            // Aggregation Variables
                             // Days Held
                             let daysHeld = 0;
                             if (minEntryDate) {
-                                const start = new Date(minEntryDate);
-                                const end = isHistory && maxExitDate ? new Date(maxExitDate) : new Date(); // If active, today
-                                const diffTime = Math.abs(end - start);
+                                const end = isHistory && maxExitDate ? maxExitMs : Date.now(); // If active, today
+                                const diffTime = Math.abs(end - minEntryMs);
                                 daysHeld = Math.ceil(diffTime / (1000 * 60 * 60 * 24)); 
                             }
 
@@ -89,24 +95,33 @@ new_logic = """                            // Aggregation Variables
                             const emas = live.emas || {};
 """
 
-with open(target_file, 'r', encoding='utf-8') as f:
-    content = f.read()
-
 # Define start and end markers based on known unique lines
 start_marker = "const live = liveData[ticker] || {};"
 end_marker = "const isExpanded = expandedGroups[ticker];"
 
-start_idx = content.find(start_marker)
-end_idx = content.find(end_marker)
-
-if start_idx == -1 or end_idx == -1:
-    print("Error: Could not find markers")
-    print(f"Start found: {start_idx != -1}")
-    print(f"End found: {end_idx != -1}")
-else:
-    # Keep the start marker line, append new logic
-    new_content = content[:start_idx + len(start_marker)] + "\n\n" + new_logic + "\n" + content[end_idx:]
-    
-    with open(target_file, 'w', encoding='utf-8') as f:
-        f.write(new_content)
-    print("Success: File patched.")
+# Splice in place: everything before the start marker is left untouched on disk,
+# only the replaced region and the tail after it are rewritten
+with open(target_file, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+    # Binary mode skips newline translation: match the file's own line endings (CRLF on a Windows checkout)
+    eol = b'\r\n' if mm.find(b'\r\n') != -1 else b'\n'
+
+    # The end marker follows the start marker: resume the second scan past it
+    start_bytes = start_marker.encode('utf-8')
+    start_idx = mm.find(start_bytes)
+    end_idx = mm.find(end_marker.encode('utf-8'), start_idx + len(start_bytes)) if start_idx != -1 else -1
+
+    if start_idx == -1 or end_idx == -1:
+        print("Error: Could not find markers")
+        print(f"Start found: {start_idx != -1}")
+        print(f"End found: {end_idx != -1}")
+    else:
+        # Keep the start marker line, append new logic
+        splice_at = start_idx + len(start_bytes)
+        suffix = mm[end_idx:]
+        mm.close()
+        
+        f.seek(splice_at)
+        f.write(("\n\n" + new_logic + "\n").encode('utf-8').replace(b'\n', eol))
+        f.write(suffix)
+        f.truncate()
+        print("Success: File patched.")
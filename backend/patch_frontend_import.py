@@ -1,5 +1,6 @@
 
 import os
+import mmap
 
 target_file = r"C:\Users\micro\.gemini\antigravity\playground\ancient-glenn\backend\static\app_v2.js"
 
@@ -69,25 +70,11 @@ header_buttons_logic = """                <div>
                     </button>
                 </div>"""
 
-with open(target_file, 'r', encoding='utf-8') as f:
-    content = f.read()
-
 # Insert handlers at the top of TradeJournal (after existing state defs)
 # We can find `const handleDelete` as an anchor since it's defined before return
 handler_anchor = "const handleDelete = async (id) => {"
-handler_idx = content.find(handler_anchor)
-
-if handler_idx != -1:
-    new_content = content[:handler_idx] + handlers_logic + "\n\n    " + content[handler_idx:]
-else:
-    print("Error: Could not find handler anchor")
-    exit(1)
 
 # Replace the header section
-# We'll target the whole div block to act as replacement
-start_marker = "<div>\n                    <h2 className=\"text-2xl font-bold text-white tracking-tight flex items-center gap-2\">"
-end_marker = "{showForm ? 'Cancel' : '+ Log Trade'}\n                </button>\n            </div>"
-
 # Use looser search or specific unique chunks
 chunk_start = """<div>
                     <h2 className="text-2xl font-bold text-white tracking-tight flex items-center gap-2">"""
@@ -96,20 +83,47 @@ chunk_end = """<button onClick={() => setShowForm(!showForm)} className="bg-blue
                 </button>
             </div>"""
 
-idx_start = new_content.find(chunk_start)
-idx_end = new_content.find(chunk_end)
-
-if idx_start != -1 and idx_end != -1:
-    # We replace from start of headers div to end of "Log Trade" button div
-    # The chunk_end is the END of the content to replace.
-    # So we want to replace everything from idx_start to (idx_end + len(chunk_end))
-    
-    final_content = new_content[:idx_start] + header_buttons_logic + new_content[idx_end + len(chunk_end):]
-    
-    with open(target_file, 'w', encoding='utf-8') as f:
-        f.write(final_content)
-    print("Success: Frontend patched with Import button.")
-else:
-    print("Error: Could not find header markers.")
-    print(f"Start: {idx_start}, End: {idx_end}")
-
+# Both edits are located in one pass over the mapped file and spliced in place:
+# bytes before the first edit are never rewritten
+with open(target_file, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+    # Binary mode skips newline translation: match the file's own line endings (CRLF on a Windows checkout)
+    eol = b'\r\n' if mm.find(b'\r\n') != -1 else b'\n'
+    def encode(text):
+        return text.encode('utf-8').replace(b'\n', eol)
+
+    handler_idx = mm.find(encode(handler_anchor))
+    if handler_idx == -1:
+        print("Error: Could not find handler anchor")
+        exit(1)
+
+    # The header ends after it starts: resume the second scan past the start marker
+    start_bytes = encode(chunk_start)
+    end_bytes = encode(chunk_end)
+    idx_start = mm.find(start_bytes)
+    idx_end = mm.find(end_bytes, idx_start + len(start_bytes)) if idx_start != -1 else -1
+
+    if idx_start == -1 or idx_end == -1:
+        print("Error: Could not find header markers.")
+        print(f"Start: {idx_start}, End: {idx_end}")
+    elif idx_start < handler_idx < idx_end + len(end_bytes):
+        print("Error: Handler anchor is inside the header block being replaced.")
+        print(f"Anchor: {handler_idx}, Header: {idx_start}-{idx_end + len(end_bytes)}")
+    else:
+        # Handlers go before the anchor; the header is replaced from the start of
+        # its div to the end of the "Log Trade" button div. Either may come first in the file.
+        edits = sorted([
+            (handler_idx, handler_idx, encode(handlers_logic + "\n\n    ")),
+            (idx_start, idx_end + len(end_bytes), encode(header_buttons_logic)),
+        ])
+        first = pos = edits[0][0]
+        pieces = []
+        for edit_start, edit_end, text in edits:
+            pieces += [mm[pos:edit_start], text]
+            pos = edit_end
+        pieces.append(mm[pos:])
+        mm.close()
+
+        f.seek(first)
+        f.write(b"".join(pieces))
+        f.truncate()
+        print("Success: Frontend patched with Import button.")
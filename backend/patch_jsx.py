@@ -68,7 +68,8 @@ start_marker = "const isExpanded = expandedGroups[ticker];"
 end_marker = "{/* DETAIL ROWS */}"
 
 start_idx = content.find(start_marker)
-end_idx = content.find(end_marker)
+# Find the end marker AFTER the start marker
+end_idx = content.find(end_marker, start_idx + len(start_marker)) if start_idx != -1 else -1
 
 if start_idx == -1 or end_idx == -1:
     print("Error: Could not find markers")
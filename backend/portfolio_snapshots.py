@@ -6,7 +6,7 @@ Twice-migrated to support Multi-Tenancy and PostgreSQL via SQLAlchemy.
 from datetime import datetime, timedelta
 import threading
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, text
 import models
 from database import SessionLocal
 
@@ -166,10 +166,19 @@ def take_snapshot(user_id: int = None, db: Session = None):
 
 import math
 
+_INF = float('inf')
+
 def clean_nan(val, default=0):
     """Replace NaN/None values with default for JSON serialization"""
     if val is None:
         return default
+    # Fast path: plain floats (incl. np.float64) via IEEE NaN self-inequality
+    if isinstance(val, float):
+        if val != val or val == _INF or val == -_INF:
+            return default
+        return val
+    if isinstance(val, int):
+        return val
     try:
         if math.isnan(val) or math.isinf(val):
             return default
@@ -383,6 +392,64 @@ def get_geographic_distribution(user_id: int, db: Session = None):
     
     return result
 
+def _parse_trade_date(value):
+    """Normalize a trade date (Date or 'YYYY-MM-DD' string) to a date, or None."""
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return value
+
+def _daily_usa_totals_py(trades, start_date, end_date):
+    """Yield (date_str, invested, realized_pnl) per day from in-memory trades."""
+    # Parse dates once up front instead of once per (day, trade) pair
+    parsed = []
+    for t in trades:
+        t_entry = _parse_trade_date(t.entry_date)
+        if t_entry is None:
+            continue  # Skip invalid
+        t_exit = _parse_trade_date(t.exit_date) if t.exit_date else None
+        parsed.append((t_entry, t_exit, t.entry_price * t.shares, t.pnl))
+
+    current = start_date
+    while current <= end_date:
+        daily_invested = 0
+        daily_pnl = 0
+        for t_entry, t_exit, cost, pnl in parsed:
+            # Is active? Entry <= current AND (Exit is None OR Exit > current)
+            # Is closed? Exit <= current
+            if t_entry <= current and (t_exit is None or t_exit > current):
+                daily_invested += cost
+            if t_exit is not None and t_exit <= current and pnl is not None:
+                daily_pnl += pnl
+        yield current.strftime("%Y-%m-%d"), daily_invested, daily_pnl
+        current += timedelta(days=1)
+
+_DAILY_USA_TOTALS_SQL = text("""
+    WITH days AS (
+        SELECT gs::date AS d
+        FROM generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') AS gs
+    )
+    SELECT to_char(days.d, 'YYYY-MM-DD') AS day,
+           COALESCE(SUM(CASE WHEN t.entry_date <= days.d
+                              AND (t.exit_date IS NULL OR t.exit_date > days.d)
+                             THEN t.entry_price * t.shares ELSE 0 END), 0) AS invested,
+           COALESCE(SUM(CASE WHEN t.exit_date IS NOT NULL AND t.exit_date <= days.d
+                             THEN COALESCE(t.pnl, 0) ELSE 0 END), 0) AS pnl
+    FROM days
+    LEFT JOIN trades t ON t.user_id = :user_id AND t.entry_date IS NOT NULL
+    GROUP BY days.d
+    ORDER BY days.d
+""")
+
+def _daily_usa_totals_sql(db: Session, user_id: int, start_date, end_date):
+    """Same as _daily_usa_totals_py, but aggregated by PostgreSQL via generate_series."""
+    rows = db.execute(_DAILY_USA_TOTALS_SQL, {
+        "start": start_date, "end": end_date, "user_id": user_id
+    }).fetchall()
+    return [(r.day, float(r.invested), float(r.pnl)) for r in rows]
+
 def rebuild_history(user_id: int, db: Session):
     """
     Rebuild historical snapshots based on trade history.
@@ -423,48 +490,23 @@ def rebuild_history(user_id: int, db: Session):
         
         print(f"[Snapshots] Rebuilding from {start_date} to {end_date}")
 
-        # 3. Iterate days
-        current = start_date
+        # 3. Per-day USA aggregates (server-side on PostgreSQL, one round-trip)
+        if db.bind is not None and db.bind.dialect.name == "postgresql":
+            daily_rows = _daily_usa_totals_sql(db, user_id, start_date, end_date)
+        else:
+            daily_rows = _daily_usa_totals_py(trades, start_date, end_date)
+
+        # Load existing snapshots for the range once instead of querying per day
+        existing = {
+            s.date: s for s in db.query(models.PortfolioSnapshot).filter(
+                models.PortfolioSnapshot.user_id == user_id,
+                models.PortfolioSnapshot.date >= start_date.strftime("%Y-%m-%d"),
+                models.PortfolioSnapshot.date <= end_date.strftime("%Y-%m-%d")
+            ).all()
+        }
+
         batch_counter = 0
-        while current <= end_date:
-            curr_str = current.strftime("%Y-%m-%d")
-            
-            # Calculate state for this day
-            daily_invested = 0
-            daily_pnl = 0
-            
-            # Filter trades active/closed on this day
-            # Assuming 'entry_date' and 'exit_date' are Date objects or ISO strings
-            
-            for t in trades:
-                # Parse Dates
-                t_entry = t.entry_date
-                if isinstance(t_entry, str):
-                    try: t_entry = datetime.strptime(t_entry, "%Y-%m-%d").date()
-                    except: continue # Skip invalid
-                
-                t_exit = None
-                if t.exit_date:
-                    if isinstance(t.exit_date, str):
-                        try: t_exit = datetime.strptime(t.exit_date, "%Y-%m-%d").date()
-                        except: pass
-                    else:
-                        t_exit = t.exit_date
-                
-                # Logic:
-                # Is active? Entry <= current AND (Exit is None OR Exit > current)
-                # Is closed? Exit <= current
-                
-                is_active = t_entry <= current and (t_exit is None or t_exit > current)
-                is_closed = t_exit is not None and t_exit <= current
-                
-                if is_active:
-                    daily_invested += (t.entry_price * t.shares)
-                
-                if is_closed:
-                    if t.pnl is not None:
-                        daily_pnl += t.pnl
-                        
+        for curr_str, daily_invested, daily_pnl in daily_rows:
             # Calc Totals
             # Value = Invested + Realized PnL (ignoring historical unrealized for simplicity)
             daily_value = daily_invested + daily_pnl 
@@ -472,10 +514,7 @@ def rebuild_history(user_id: int, db: Session):
             # Update/Create Snapshot
             # Ideally we check if it exists or we wipe all first. Wiping is risky if we break running stats.
             # Upsert is safer.
-            snapshot = db.query(models.PortfolioSnapshot).filter(
-                models.PortfolioSnapshot.user_id == user_id,
-                models.PortfolioSnapshot.date == curr_str
-            ).first()
+            snapshot = existing.get(curr_str)
             
             if not snapshot:
                 snapshot = models.PortfolioSnapshot(
@@ -507,8 +546,6 @@ def rebuild_history(user_id: int, db: Session):
                 db.commit()
                 batch_counter = 0
             
-            current += timedelta(days=1)
-            
         db.commit()
         print(f"[Snapshots] Rebuild complete for user {user_id}")
             
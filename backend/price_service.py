@@ -2,25 +2,36 @@
 Unified Price Service with Caching
 - Finnhub as primary source (fast, <500ms)
 - yfinance as fallback (slower but reliable)
-- In-memory cache with TTL to reduce API calls
+- In-memory cache with tiered TTLs (per market session) to reduce API calls
+- Optional on-disk tier so the cache survives restarts / is shared by workers
 - Thread-safe for multi-user/multi-tenant
 """
 
 import os
 import time
+import logging
+import asyncio
 import threading
+import concurrent.futures
+import functools
+import contextlib
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import finnhub
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import pytz
 import pandas as pd
+from file_cache import FileCache
+
+logger = logging.getLogger(__name__)
 
 # Lazy import yfinance to avoid slowing startup
-_yfinance = None
+@functools.cache
 def get_yfinance():
-    global _yfinance
-    if _yfinance is None:
-        import yfinance
-        _yfinance = yfinance
-    return _yfinance
+    import yfinance
+    return yfinance
 
 # ============================================
 # Configuration
@@ -28,78 +39,304 @@ def get_yfinance():
 
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
 if not FINNHUB_API_KEY:
-    print("[WARNING PRICE_SERVICE] FINNHUB_API_KEY not set - using yfinance only mode")
+    logger.warning("FINNHUB_API_KEY not set - using yfinance only mode")
 CACHE_TTL_SECONDS = int(os.getenv("PRICE_CACHE_TTL", "60"))  # 60 seconds for active trading
+FINNHUB_QUOTE_URL = "https://finnhub.io/api/v1/quote"
+FINNHUB_TIMEOUT_SECONDS = float(os.getenv("FINNHUB_TIMEOUT", "5"))
+MAX_FETCH_WORKERS = int(os.getenv("PRICE_FETCH_WORKERS", "16"))  # Parallel upstream fetches (I/O bound)
+YF_HISTORY_TIMEOUT_SECONDS = float(os.getenv("YF_HISTORY_TIMEOUT", "3"))  # Fast-fail single-ticker history
+YF_BATCH_CHUNK = 10  # Symbols per yf.download() request
+OHLC_COLUMNS = ['Close', 'High', 'Low', 'Open']  # Column order for numpy row access
+# Opt-in disk tier (e.g. "data/price_cache"): every set writes one JSON file per ticker on the
+# caller's thread, so it stays off unless warm prices across restarts/processes are worth that
+PRICE_DISK_CACHE_DIR = os.getenv("PRICE_DISK_CACHE_DIR", "")
+
+# Tiered TTLs (seconds) aligned to how often each market actually moves
+TTL_US_REGULAR = int(os.getenv("PRICE_TTL_US_REGULAR", "30"))      # NYSE/NASDAQ regular session
+TTL_US_EXTENDED = int(os.getenv("PRICE_TTL_US_EXTENDED", "300"))   # Pre/post market
+TTL_CRYPTO = int(os.getenv("PRICE_TTL_CRYPTO", "10"))              # 24/7, moves every second
+TTL_BCBA_OPEN = int(os.getenv("PRICE_TTL_BCBA_OPEN", "60"))        # BCBA trading hours
+TTL_MARKET_CLOSED = int(os.getenv("PRICE_TTL_CLOSED", "3600"))     # Nights/weekends
+
+_US_TZ = pytz.timezone("America/New_York")
+_BCBA_TZ = pytz.timezone("America/Argentina/Buenos_Aires")
+
+# ============================================
+# Metrics (Prometheus, optional)
+# ============================================
+
+class _NullMetric:
+    """No-op stand-in when prometheus_client isn't installed."""
+    def labels(self, *args, **kwargs):
+        return self
+    def inc(self, amount=1):
+        pass
+    def time(self):
+        return contextlib.nullcontext()
+
+try:
+    from prometheus_client import Counter, Histogram
+    PRICE_CACHE_HITS = Counter("price_cache_hits_total", "Price lookups served from cache")
+    PRICE_CACHE_MISSES = Counter(
+        "price_cache_misses_total", "Price lookups that missed cache, by serving source", ["source"]
+    )
+    PRICE_FETCH_SECONDS = Histogram("price_fetch_seconds", "Upstream price fetch latency", ["source"])
+except ImportError:
+    PRICE_CACHE_HITS = PRICE_CACHE_MISSES = PRICE_FETCH_SECONDS = _NullMetric()
+
+def _timed(source: str):
+    """Decorator: observe upstream fetch latency under `source`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with PRICE_FETCH_SECONDS.labels(source).time():
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
 
 # ============================================
 # Cache Implementation
 # ============================================
 
 class PriceCache:
-    """Thread-safe in-memory price cache with TTL."""
+    """
+    Thread-safe in-memory price cache with per-entry TTL.
+    Optionally backed by a FileCache tier (read-through / write-through)
+    so warm prices survive restarts and are shared across processes.
+    """
     
-    def __init__(self, ttl: int = 60):
-        self.ttl = ttl
-        self._cache: Dict[str, dict] = {}
+    def __init__(self, ttl: int = 60, backing: Optional[FileCache] = None):
+        self.ttl = ttl  # Default TTL when a caller doesn't pass one
+        self._cache: Dict[str, tuple] = {}  # key -> (data, expires_at monotonic)
         self._lock = threading.Lock()
+        self._backing = backing
     
     def get(self, ticker: str) -> Optional[dict]:
-        """Get cached price if not expired."""
+        """Get cached price if not expired (memory first, then disk)."""
         with self._lock:
-            if ticker in self._cache:
-                entry = self._cache[ticker]
-                if time.time() - entry['timestamp'] < self.ttl:
-                    return entry['data']
-                else:
-                    del self._cache[ticker]
+            entry = self._cache.get(ticker)
+            if entry is not None:
+                data, expires_at = entry
+                if time.monotonic() < expires_at:
+                    return data
+                del self._cache[ticker]
+        
+        if self._backing is not None:
+            disk_entry = self._backing.get_entry(ticker)
+            if disk_entry is not None:
+                data, expires_at_wall = disk_entry
+                # Promote to memory for the remaining lifetime of the disk entry
+                remaining = expires_at_wall - time.time()
+                with self._lock:
+                    self._cache[ticker] = (data, time.monotonic() + remaining)
+                return data
         return None
     
-    def set(self, ticker: str, data: dict):
-        """Cache a price with current timestamp."""
+    def set(self, ticker: str, data: dict, ttl: Optional[int] = None):
+        """Cache a price for `ttl` seconds (defaults to the cache-wide TTL)."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl
         with self._lock:
-            self._cache[ticker] = {
-                'data': data,
-                'timestamp': time.time()
-            }
+            self._cache[ticker] = (data, expires_at)
+        if self._backing is not None:
+            self._backing.set(ticker, data, ttl=ttl)
+    
+    def set_many(self, entries: Dict[str, dict], ttl: Optional[int] = None):
+        """Cache several prices under a single lock acquisition."""
+        if not entries:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._cache.update({key: (data, expires_at) for key, data in entries.items()})
+        if self._backing is not None:
+            for key, data in entries.items():
+                self._backing.set(key, data, ttl=ttl)
     
     def get_many(self, tickers: List[str]) -> Dict[str, dict]:
         """Get multiple cached prices, returns dict of hits."""
         result = {}
-        for ticker in tickers:
-            cached = self.get(ticker)
-            if cached:
-                result[ticker] = cached
+        misses = []
+        now = time.monotonic()
+        # Single lock acquisition + one clock read for the whole batch
+        with self._lock:
+            cache = self._cache
+            for ticker in tickers:
+                entry = cache.get(ticker)
+                if entry is not None and now < entry[1]:
+                    result[ticker] = entry[0]
+                else:
+                    if entry is not None:
+                        del cache[ticker]
+                    misses.append(ticker)
+        
+        # Disk tier lookups happen outside the lock
+        if self._backing is not None:
+            for ticker in misses:
+                cached = self.get(ticker)
+                if cached:
+                    result[ticker] = cached
         return result
     
     def clear(self):
-        """Clear all cached data."""
+        """Clear all cached data (both tiers)."""
         with self._lock:
             self._cache.clear()
+        if self._backing is not None:
+            self._backing.clear()
     
     def stats(self) -> dict:
         """Return cache statistics."""
         with self._lock:
             return {
                 'entries': len(self._cache),
-                'ttl': self.ttl
+                'ttl': self.ttl,
+                'disk_tier': self._backing is not None
             }
 
 # Global cache instance (shared across all requests/users)
-_price_cache = PriceCache(ttl=CACHE_TTL_SECONDS)
+_file_cache = FileCache(PRICE_DISK_CACHE_DIR, default_ttl=CACHE_TTL_SECONDS) if PRICE_DISK_CACHE_DIR else None
+_price_cache = PriceCache(ttl=CACHE_TTL_SECONDS, backing=_file_cache)
 
 # ============================================
-# Finnhub Client
+# Market Hours / TTL Policy
 # ============================================
 
-_finnhub_client = None
+def _us_market_session(now: float) -> str:
+    """Return 'regular', 'extended' or 'closed' for US equities at epoch `now`."""
+    et = datetime.fromtimestamp(now, _US_TZ)
+    if et.weekday() >= 5:
+        return 'closed'
+    minutes = et.hour * 60 + et.minute
+    if 9 * 60 + 30 <= minutes < 16 * 60:
+        return 'regular'
+    if 4 * 60 <= minutes < 20 * 60:
+        return 'extended'
+    return 'closed'
+
+
+def _bcba_is_open(now: float) -> bool:
+    """BCBA trades 11:00-17:00 Buenos Aires time, Monday to Friday."""
+    ar = datetime.fromtimestamp(now, _BCBA_TZ)
+    return ar.weekday() < 5 and 11 <= ar.hour < 17
+
+
+def _bcba_last_close(now: float) -> float:
+    """Epoch of the most recent BCBA session close (17:00 ART on a weekday)."""
+    ar = datetime.fromtimestamp(now, _BCBA_TZ)
+    close = ar.replace(hour=17, minute=0, second=0, microsecond=0)
+    if ar < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.timestamp()
+
+
+def _seconds_until_bcba_open(now: float) -> float:
+    """Seconds until the next BCBA session opens (11:00 ART on a weekday)."""
+    ar = datetime.fromtimestamp(now, _BCBA_TZ)
+    nxt = ar.replace(hour=11, minute=0, second=0, microsecond=0)
+    if ar >= nxt:
+        nxt += timedelta(days=1)
+    while nxt.weekday() >= 5:
+        nxt += timedelta(days=1)
+    return nxt.timestamp() - now
+
+
+@functools.lru_cache(maxsize=1)
+def _market_state_cached(minute_bucket: int) -> tuple:
+    """(us_session, bcba_open) for a given minute; recomputed once per minute."""
+    now = minute_bucket * 60
+    return _us_market_session(now), _bcba_is_open(now)
+
+
+def _market_state(now: Optional[float] = None) -> tuple:
+    if now is None:
+        return _market_state_cached(int(time.time() // 60))
+    return _us_market_session(now), _bcba_is_open(now)
+
+
+def _ttl_for_ticker(ticker: str, now: Optional[float] = None) -> int:
+    """Pick a cache TTL for a US ticker based on the current market session."""
+    session = _market_state(now)[0]
+    if session == 'regular':
+        return TTL_US_REGULAR
+    if session == 'extended':
+        return TTL_US_EXTENDED
+    return TTL_MARKET_CLOSED
+
+
+def _ttl_for_bcba(now: Optional[float] = None) -> int:
+    if _market_state(now)[1]:
+        return TTL_BCBA_OPEN
+    # Closed: a post-close price can't change until the next session opens
+    until_open = _seconds_until_bcba_open(time.time() if now is None else now)
+    return max(TTL_MARKET_CLOSED, int(until_open))
+
+
+@functools.lru_cache(maxsize=4096)
+def _norm_ticker(ticker: str) -> str:
+    """Uppercase/strip a ticker; memoized since the same symbols repeat constantly."""
+    return ticker.upper().strip()
+
+# ============================================
+# Finnhub Client
+# ============================================
 
+@functools.cache
 def get_finnhub_client():
-    global _finnhub_client
+    """Process-wide Finnhub client (call get_finnhub_client.cache_clear() after rotating the key)."""
     if not FINNHUB_API_KEY:
         return None  # No API key, fall back to yfinance
-    if _finnhub_client is None:
-        _finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
-    return _finnhub_client
+    client = finnhub.Client(api_key=FINNHUB_API_KEY)
+    # Bound every request so a hung socket can't pin a worker thread
+    client.DEFAULT_TIMEOUT = FINNHUB_TIMEOUT_SECONDS
+    _configure_finnhub_session(client)
+    return client
+
+
+def _configure_finnhub_session(client):
+    """
+    finnhub.Client keeps one requests.Session internally; give it a keep-alive pool
+    sized for the fetch fan-out (default is 10, so extra sockets were discarded and
+    re-handshaked) plus light retries on transient upstream errors.
+    """
+    session = getattr(client, '_session', None)
+    if session is None:
+        return
+    adapter = HTTPAdapter(
+        pool_connections=MAX_FETCH_WORKERS * 2,
+        pool_maxsize=MAX_FETCH_WORKERS * 2,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+    )
+    session.mount('https://', adapter)
+
+# ============================================
+# Finnhub Circuit Breaker
+# ============================================
+
+# After N consecutive upstream errors, skip Finnhub for a cooldown period and
+# go straight to yfinance instead of paying the timeout on every call.
+FINNHUB_BREAKER_THRESHOLD = int(os.getenv("FINNHUB_BREAKER_THRESHOLD", "5"))
+FINNHUB_BREAKER_COOLDOWN = int(os.getenv("FINNHUB_BREAKER_COOLDOWN", "60"))
+
+_finnhub_breaker = {'failures': 0, 'open_until': 0.0}
+_finnhub_breaker_lock = threading.Lock()
+
+def _finnhub_available() -> bool:
+    """False while the breaker is open."""
+    return time.time() >= _finnhub_breaker['open_until']
+
+def _record_finnhub_result(ok: bool):
+    with _finnhub_breaker_lock:
+        if ok:
+            _finnhub_breaker['failures'] = 0
+            return
+        _finnhub_breaker['failures'] += 1
+        if _finnhub_breaker['failures'] >= FINNHUB_BREAKER_THRESHOLD:
+            _finnhub_breaker['open_until'] = time.time() + FINNHUB_BREAKER_COOLDOWN
+            _finnhub_breaker['failures'] = 0
+            logger.warning("Finnhub circuit open for %ss", FINNHUB_BREAKER_COOLDOWN)
 
 # ============================================
 # Price Fetching Functions
@@ -122,34 +359,38 @@ def get_price(ticker: str, use_cache: bool = True) -> dict:
             'timestamp': float
         }
     """
-    ticker = ticker.upper().strip()
+    ticker = _norm_ticker(ticker)
     
     # 1. Check cache
     if use_cache:
         cached = _price_cache.get(ticker)
         if cached:
-            cached['source'] = 'cache'
-            return cached
+            PRICE_CACHE_HITS.inc()
+            # Copy - never mutate the shared cached dict (other threads read it)
+            return {**cached, 'source': 'cache'}
     
     # 2. Try Finnhub (primary)
     try:
         data = _fetch_finnhub(ticker)
         if data and data.get('price'):
-            _price_cache.set(ticker, data)
+            PRICE_CACHE_MISSES.labels('finnhub').inc()
+            _price_cache.set(ticker, data, ttl=_ttl_for_ticker(ticker))
             return data
     except Exception as e:
-        print(f"[PriceService] Finnhub error for {ticker}: {e}")
+        logger.warning("Finnhub error for %s: %s", ticker, e)
     
     # 3. Fallback to yfinance
     try:
         data = _fetch_yfinance(ticker)
         if data and data.get('price'):
-            _price_cache.set(ticker, data)
+            PRICE_CACHE_MISSES.labels('yfinance').inc()
+            _price_cache.set(ticker, data, ttl=_ttl_for_ticker(ticker))
             return data
     except Exception as e:
-        print(f"[PriceService] yfinance error for {ticker}: {e}")
+        logger.warning("yfinance error for %s: %s", ticker, e)
     
     # 4. Return empty if all fails
+    PRICE_CACHE_MISSES.labels('error').inc()
     return {'price': None, 'source': 'error', 'ticker': ticker}
 
 
@@ -161,15 +402,15 @@ def get_prices(tickers: List[str], use_cache: bool = True) -> Dict[str, dict]:
     Returns:
         {'AAPL': {...}, 'TSLA': {...}, ...}
     """
-    tickers = [t.upper().strip() for t in tickers if t]
+    tickers = [_norm_ticker(t) for t in tickers if t]
     result = {}
     
     # 1. Check cache for all
     if use_cache:
         cached = _price_cache.get_many(tickers)
         for ticker, data in cached.items():
-            data['source'] = 'cache'
-            result[ticker] = data
+            result[ticker] = {**data, 'source': 'cache'}
+        PRICE_CACHE_HITS.inc(len(cached))
     
     # 2. Find missing tickers
     missing = [t for t in tickers if t not in result]
@@ -177,71 +418,77 @@ def get_prices(tickers: List[str], use_cache: bool = True) -> Dict[str, dict]:
     if not missing:
         return result
     
-    # 3. Fetch missing from Finnhub (one by one - no batch API in free tier)
+    ttl = _ttl_for_ticker(missing[0])  # Same session for every US ticker
+    
+    # 3. Fetch missing from Finnhub (no batch API in free tier - fan out in parallel)
     finnhub_failures = []
-    for ticker in missing:
-        try:
-            data = _fetch_finnhub(ticker)
-            if data and data.get('price'):
-                _price_cache.set(ticker, data)
-                result[ticker] = data
-            else:
+    new_entries = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(missing))) as executor:
+        future_to_ticker = {executor.submit(_fetch_finnhub, ticker): ticker for ticker in missing}
+        for future in concurrent.futures.as_completed(future_to_ticker):
+            ticker = future_to_ticker[future]
+            try:
+                data = future.result()
+                if data and data.get('price'):
+                    new_entries[ticker] = data
+                else:
+                    finnhub_failures.append(ticker)
+            except Exception as e:
+                logger.warning("Finnhub error for %s: %s", ticker, e)
                 finnhub_failures.append(ticker)
-        except Exception as e:
-            print(f"[PriceService] Finnhub error for {ticker}: {e}")
-            finnhub_failures.append(ticker)
+    _price_cache.set_many(new_entries, ttl=ttl)
+    result.update(new_entries)
+    PRICE_CACHE_MISSES.labels('finnhub').inc(len(new_entries))
     
     # 4. Fallback to yfinance for failures (batch)
     if finnhub_failures:
         try:
             yf_data = _fetch_yfinance_batch(finnhub_failures)
-            for ticker, data in yf_data.items():
-                if data and data.get('price'):
-                    _price_cache.set(ticker, data)
-                    result[ticker] = data
+            new_entries = {t: d for t, d in yf_data.items() if d and d.get('price')}
+            _price_cache.set_many(new_entries, ttl=ttl)
+            result.update(new_entries)
+            PRICE_CACHE_MISSES.labels('yfinance').inc(len(new_entries))
         except Exception as e:
-            print(f"[PriceService] yfinance batch error: {e}")
+            logger.warning("yfinance batch error: %s", e)
     
+    PRICE_CACHE_MISSES.labels('error').inc(sum(1 for t in missing if t not in result))
     return result
 
 
+# Dedicated pool for time-boxed yfinance calls. A per-call `with ThreadPoolExecutor`
+# would block on exit until a hung request finished, defeating the timeout.
+_history_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS)
+
+def _history_with_timeout(t, period: str):
+    """t.history(period) but raise concurrent.futures.TimeoutError after YF_HISTORY_TIMEOUT_SECONDS."""
+    future = _history_executor.submit(t.history, period=period)
+    return future.result(timeout=YF_HISTORY_TIMEOUT_SECONDS)
+
+
 def get_crypto_price(symbol: str, use_cache: bool = True) -> dict:
     """
     Get cryptocurrency price (uses Finnhub crypto endpoint).
     Symbol format: 'BTC', 'ETH', etc.
     """
-    symbol = symbol.upper().strip()
+    symbol = _norm_ticker(symbol)
     cache_key = f"CRYPTO:{symbol}"
     
     if use_cache:
         cached = _price_cache.get(cache_key)
         if cached:
-            cached['source'] = 'cache'
-            return cached
+            PRICE_CACHE_HITS.inc()
+            # Copy - never mutate the shared cached dict (other threads read it)
+            return {**cached, 'source': 'cache'}
     
-    # Try Finnhub crypto
+    # Try Finnhub crypto (Finnhub uses BINANCE:BTCUSDT format)
     try:
-        client = get_finnhub_client()
-        # Finnhub uses BINANCE:BTCUSDT format
-        finnhub_symbol = f"BINANCE:{symbol}USDT"
-        quote = client.quote(finnhub_symbol)
-        
-        if quote and quote.get('c'):
-            data = {
-                'price': quote['c'],
-                'change': quote.get('d', 0),
-                'change_pct': quote.get('dp', 0),
-                'high': quote.get('h', 0),
-                'low': quote.get('l', 0),
-                'open': quote.get('o', 0),
-                'prev_close': quote.get('pc', 0),
-                'source': 'finnhub',
-                'timestamp': time.time()
-            }
-            _price_cache.set(cache_key, data)
+        data = _fetch_finnhub(f"BINANCE:{symbol}USDT")
+        if data:
+            PRICE_CACHE_MISSES.labels('finnhub').inc()
+            _price_cache.set(cache_key, data, ttl=TTL_CRYPTO)
             return data
     except Exception as e:
-        print(f"[PriceService] Finnhub crypto error for {symbol}: {e}")
+        logger.warning("Finnhub crypto error for %s: %s", symbol, e)
     
     # Fallback to yfinance
     try:
@@ -251,7 +498,7 @@ def get_crypto_price(symbol: str, use_cache: bool = True) -> dict:
         
         # Use history() instead of fast_info to avoid hangs
         t = yf.Ticker(yf_symbol)
-        hist = t.history(period="1d")
+        hist = _history_with_timeout(t, "1d")
         
         if hist.empty:
             return {'price': None, 'source': 'error', 'symbol': symbol}
@@ -265,10 +512,13 @@ def get_crypto_price(symbol: str, use_cache: bool = True) -> dict:
             'source': 'yfinance',
             'timestamp': time.time()
         }
-        _price_cache.set(cache_key, data)
+        PRICE_CACHE_MISSES.labels('yfinance').inc()
+        _price_cache.set(cache_key, data, ttl=TTL_CRYPTO)
         return data
+    except concurrent.futures.TimeoutError:
+        logger.warning("yfinance crypto timeout for %s after %ss", symbol, YF_HISTORY_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"[PriceService] yfinance crypto error for {symbol}: {e}")
+        logger.warning("yfinance crypto error for %s: %s", symbol, e)
     
     return {'price': None, 'source': 'error', 'symbol': symbol}
 
@@ -278,14 +528,15 @@ def get_argentina_price(ticker: str, use_cache: bool = True) -> dict:
     Get price for BCBA (Buenos Aires Stock Exchange) tickers.
     Finnhub doesn't support BCBA, so we use yfinance with .BA suffix.
     """
-    ticker = ticker.upper().strip()
+    ticker = _norm_ticker(ticker)
     cache_key = f"BCBA:{ticker}"
     
     if use_cache:
         cached = _price_cache.get(cache_key)
         if cached:
-            cached['source'] = 'cache'
-            return cached
+            PRICE_CACHE_HITS.inc()
+            # Copy - never mutate the shared cached dict (other threads read it)
+            return {**cached, 'source': 'cache'}
     
     # yfinance is the only reliable source for BCBA
     try:
@@ -295,13 +546,15 @@ def get_argentina_price(ticker: str, use_cache: bool = True) -> dict:
         
         # Use history instead of fast_info
         t = yf.Ticker(yf_ticker)
-        hist = t.history(period="2d") # Get 2 days to calc change
+        hist = _history_with_timeout(t, "2d") # Get 2 days to calc change
         
         if hist.empty:
              return {'price': None, 'source': 'error', 'ticker': ticker}
              
-        last_price = float(hist['Close'].iloc[-1])
-        prev_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else last_price
+        # One pandas->numpy conversion instead of a label lookup per field
+        arr = hist[OHLC_COLUMNS].to_numpy(dtype=float)
+        last_price = float(arr[-1, 0])
+        prev_close = float(arr[-2, 0]) if len(arr) > 1 else last_price
         
         change = last_price - prev_close
         change_pct = (change / prev_close * 100) if prev_close else 0
@@ -310,32 +563,89 @@ def get_argentina_price(ticker: str, use_cache: bool = True) -> dict:
             'price': last_price,
             'change': change,
             'change_pct': change_pct,
-            'high': float(hist['High'].iloc[-1]),
-            'low': float(hist['Low'].iloc[-1]),
-            'open': float(hist['Open'].iloc[-1]),
+            'high': float(arr[-1, 1]),
+            'low': float(arr[-1, 2]),
+            'open': float(arr[-1, 3]),
             'prev_close': prev_close,
             'source': 'yfinance',
             'timestamp': time.time()
         }
-        _price_cache.set(cache_key, data)
+        PRICE_CACHE_MISSES.labels('yfinance').inc()
+        _price_cache.set(cache_key, data, ttl=_ttl_for_bcba())
         return data
+    except concurrent.futures.TimeoutError:
+        logger.warning("BCBA timeout for %s after %ss", ticker, YF_HISTORY_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"[PriceService] BCBA error for {ticker}: {e}")
+        logger.warning("BCBA error for %s: %s", ticker, e)
     
     return {'price': None, 'source': 'error', 'ticker': ticker}
 
 
+# ============================================
+# Request Coalescing (in-flight dedupe)
+# ============================================
+
+# Concurrent callers asking for the same upstream data share one fetch
+# instead of each issuing their own HTTPS call (thundering herd).
+_inflight: Dict[tuple, concurrent.futures.Future] = {}
+_inflight_lock = threading.Lock()
+_inflight_stats = {'deduped': 0}
+
+def _coalesce(source: str):
+    """Decorator: dedupe concurrent calls keyed by (source, ticker(s))."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(arg):
+            key = (source, tuple(sorted(arg)) if isinstance(arg, list) else arg)
+            with _inflight_lock:
+                future = _inflight.get(key)
+                is_owner = future is None
+                if is_owner:
+                    future = concurrent.futures.Future()
+                    _inflight[key] = future
+                else:
+                    _inflight_stats['deduped'] += 1
+
+            if not is_owner:
+                return future.result()
+
+            try:
+                data = fn(arg)
+                future.set_result(data)
+                return data
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+        return wrapper
+    return decorator
+
 # ============================================
 # Internal Fetch Functions
 # ============================================
 
+@_coalesce('finnhub')
+@_timed('finnhub')
 def _fetch_finnhub(ticker: str) -> dict:
     """Fetch single ticker from Finnhub."""
     client = get_finnhub_client()
     if not client:
         return None  # No API key configured
-    quote = client.quote(ticker)
-    
+    if not _finnhub_available():
+        return None  # Circuit open - caller falls back to yfinance
+    try:
+        quote = client.quote(ticker)
+    except Exception:
+        _record_finnhub_result(False)
+        raise
+    _record_finnhub_result(True)
+    return _parse_finnhub_quote(quote)
+
+
+def _parse_finnhub_quote(quote: dict) -> Optional[dict]:
+    """Map a Finnhub /quote payload to our price dict (None if no price)."""
     if not quote or quote.get('c') is None or quote.get('c') == 0:
         return None
     
@@ -352,6 +662,23 @@ def _fetch_finnhub(ticker: str) -> dict:
     }
 
 
+async def _afetch_finnhub(client: httpx.AsyncClient, ticker: str) -> Optional[dict]:
+    """Async Finnhub quote over a shared, pooled HTTP client."""
+    if not _finnhub_available():
+        return None
+    try:
+        resp = await client.get(FINNHUB_QUOTE_URL, params={'symbol': ticker, 'token': FINNHUB_API_KEY})
+        resp.raise_for_status()
+        quote = resp.json()
+    except Exception:
+        _record_finnhub_result(False)
+        raise
+    _record_finnhub_result(True)
+    return _parse_finnhub_quote(quote)
+
+
+@_coalesce('yfinance')
+@_timed('yfinance')
 def _fetch_yfinance(ticker: str) -> dict:
     """Fetch single ticker from yfinance using fast_info for real-time/extended data."""
     try:
@@ -359,8 +686,13 @@ def _fetch_yfinance(ticker: str) -> dict:
         t = yf.Ticker(ticker)
         info = t.fast_info
 
-        last_price = float(info.last_price) if info.last_price else 0.0
-        prev_close = float(info.previous_close) if info.previous_close else last_price
+        # Read each fast_info field exactly once - every attribute is a lazy property
+        # lookup, and dict(info) would eagerly resolve unrelated fields (market cap, etc.)
+        raw_last, raw_prev = info.last_price, info.previous_close
+        raw_high, raw_low, raw_open = info.day_high, info.day_low, info.open
+
+        last_price = float(raw_last) if raw_last else 0.0
+        prev_close = float(raw_prev) if raw_prev else last_price
         
         # Calculate regular change vs previous close
         change = last_price - prev_close
@@ -406,9 +738,9 @@ def _fetch_yfinance(ticker: str) -> dict:
             'price': last_price,
             'change': change,
             'change_pct': change_pct,
-            'high': float(info.day_high) if info.day_high else 0,
-            'low': float(info.day_low) if info.day_low else 0,
-            'open': float(info.open) if info.open else 0,
+            'high': float(raw_high) if raw_high else 0,
+            'low': float(raw_low) if raw_low else 0,
+            'open': float(raw_open) if raw_open else 0,
             'prev_close': prev_close,
             'extended_price': last_price, # Sending same price as extended for now so UI shows it if enabled
             'extended_change_pct': change_pct, # Sending same change
@@ -416,7 +748,7 @@ def _fetch_yfinance(ticker: str) -> dict:
             'timestamp': time.time()
         }
     except Exception as e:
-        print(f"[PriceService] _fetch_yfinance (fast_info) error for {ticker}: {e}")
+        logger.warning("_fetch_yfinance (fast_info) error for %s: %s", ticker, e)
         # Fallback to download if fast_info fails
         try:
              return _fetch_yfinance_download_fallback(ticker)
@@ -431,8 +763,9 @@ def _fetch_yfinance_download_fallback(ticker: str) -> dict:
     
     if isinstance(df.columns, pd.MultiIndex): pass
 
-    last_price = float(df['Close'].iloc[-1])
-    prev_close = float(df['Close'].iloc[-2]) if len(df) > 1 else last_price
+    arr = df[OHLC_COLUMNS].to_numpy(dtype=float)
+    last_price = float(arr[-1, 0])
+    prev_close = float(arr[-2, 0]) if len(arr) > 1 else last_price
     change = last_price - prev_close
     change_pct = (change / prev_close * 100) if prev_close else 0
 
@@ -440,9 +773,9 @@ def _fetch_yfinance_download_fallback(ticker: str) -> dict:
         'price': last_price,
         'change': change,
         'change_pct': change_pct,
-        'high': float(df['High'].iloc[-1]),
-        'low': float(df['Low'].iloc[-1]),
-        'open': float(df['Open'].iloc[-1]),
+        'high': float(arr[-1, 1]),
+        'low': float(arr[-1, 2]),
+        'open': float(arr[-1, 3]),
         'prev_close': prev_close,
         'extended_price': None,
         'extended_change_pct': None,
@@ -451,6 +784,8 @@ def _fetch_yfinance_download_fallback(ticker: str) -> dict:
     }
 
 
+@_coalesce('yfinance_batch')
+@_timed('yfinance_batch')
 def _fetch_yfinance_batch(tickers: List[str]) -> Dict[str, dict]:
     """Fetch multiple tickers from yfinance in one call."""
     yf = get_yfinance()
@@ -504,13 +839,83 @@ def _fetch_yfinance_batch(tickers: List[str]) -> Dict[str, dict]:
                     'timestamp': time.time()
                 }
             except Exception as e:
-                print(f"[PriceService] yfinance parse error for {ticker}: {e}")
+                logger.debug("yfinance parse error for %s: %s", ticker, e)
     except Exception as e:
-        print(f"[PriceService] yfinance batch download error: {e}")
+        logger.warning("yfinance batch download error: %s", e)
+    
+    return result
+
+
+@_timed('yfinance_download')
+def _download_daily_quotes(yf_symbols: List[str]) -> Dict[str, dict]:
+    """
+    Batch-download 2 days of daily bars in chunks of YF_BATCH_CHUNK symbols.
+    Returns quote dicts keyed by the yfinance symbol (e.g. 'GGAL.BA', 'BTC-USD').
+    """
+    yf = get_yfinance()
+    result = {}
+    
+    for i in range(0, len(yf_symbols), YF_BATCH_CHUNK):
+        chunk = yf_symbols[i:i + YF_BATCH_CHUNK]
+        try:
+            data = yf.download(chunk, period="2d", group_by='ticker', threads=True, progress=False)
+        except Exception as e:
+            logger.warning("yfinance chunk download error for %s: %s", chunk, e)
+            continue
+        
+        if data is None or data.empty:
+            continue
+        
+        for symbol in chunk:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    hist = data[symbol]
+                else:
+                    hist = data  # Single-symbol chunk comes back flat
+                
+                hist = hist.dropna(subset=['Close'])
+                if hist.empty:
+                    continue
+                
+                arr = hist[OHLC_COLUMNS].to_numpy(dtype=float)
+                last_price = float(arr[-1, 0])
+                prev_close = float(arr[-2, 0]) if len(arr) > 1 else last_price
+                change = last_price - prev_close
+                change_pct = (change / prev_close * 100) if prev_close else 0
+                
+                result[symbol] = {
+                    'price': last_price,
+                    'change': change,
+                    'change_pct': change_pct,
+                    'high': float(arr[-1, 1]),
+                    'low': float(arr[-1, 2]),
+                    'open': float(arr[-1, 3]),
+                    'prev_close': prev_close,
+                    'source': 'yfinance',
+                    'timestamp': time.time()
+                }
+            except Exception as e:
+                logger.debug("yfinance parse error for %s: %s", symbol, e)
     
     return result
 
 
+def _fetch_yfinance_batch_argentina(tickers: List[str]) -> Dict[str, dict]:
+    """Batch BCBA quotes via the .BA suffix, keyed by the original ticker."""
+    symbol_map = {(t if t.endswith('.BA') else f"{t}.BA"): t for t in tickers}
+    quotes = _download_daily_quotes(list(symbol_map))
+    return {symbol_map[symbol]: data for symbol, data in quotes.items()}
+
+
+def _fetch_yfinance_batch_crypto(symbols: List[str]) -> Dict[str, dict]:
+    """Batch crypto quotes via the -USD suffix, keyed by the bare symbol."""
+    symbol_map = {f"{s}-USD": s for s in symbols}
+    quotes = _download_daily_quotes(list(symbol_map))
+    return {symbol_map[symbol]: data for symbol, data in quotes.items()}
+
+
 # ============================================
 # Utility Functions
 # ============================================
@@ -523,7 +928,9 @@ def clear_cache():
 
 def cache_stats() -> dict:
     """Get cache statistics."""
-    return _price_cache.stats()
+    stats = _price_cache.stats()
+    stats['inflight_deduped'] = _inflight_stats['deduped']
+    return stats
 
 
 # ============================================
@@ -568,80 +975,164 @@ if __name__ == "__main__":
 # Background Price Update (for scheduler)
 # ============================================
 
-def background_price_update():
-    """
-    Background job to pre-populate price cache for all open positions.
-    Called by scheduler every 5 minutes.
-    This makes user requests instant since prices are already cached.
-    """
+def _fetch_parallel(fetch_fn, tickers) -> list:
+    """Run a per-ticker fetch function across a thread pool (I/O bound)."""
+    tickers = list(tickers)
+    if not tickers:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(tickers))) as executor:
+        return list(executor.map(fetch_fn, tickers))
+
+
+def _load_open_tickers():
+    """Unique tickers of open positions across all users: (usa, argentina, crypto)."""
     from database import SessionLocal
+    from sqlalchemy import func
     import models
     
-    print("[PriceService] [INFO] Background price update starting...")
-    
     db = SessionLocal()
     try:
-        # Get all unique tickers from open positions across all users
-        usa_tickers = set()
-        argentina_tickers = set()
-        crypto_tickers = set()
+        # Let the DB uppercase + dedupe and return bare strings instead of
+        # hydrating every open position as a full ORM object
+        def distinct_upper(column, *filters):
+            rows = db.query(func.upper(column)).filter(column.isnot(None), *filters).distinct().all()
+            return {r[0] for r in rows if r[0]}
         
         # USA trades
-        usa_trades = db.query(models.Trade).filter(models.Trade.status == "OPEN").all()
-        for t in usa_trades:
-            if t.ticker:
-                usa_tickers.add(t.ticker.upper())
+        usa_tickers = distinct_upper(models.Trade.ticker, models.Trade.status == "OPEN")
         
         # Argentina positions
-        arg_positions = db.query(models.ArgentinaPosition).filter(models.ArgentinaPosition.status == "OPEN").all()
-        for p in arg_positions:
-            if p.ticker:
-                argentina_tickers.add(p.ticker.upper())
+        argentina_tickers = distinct_upper(
+            models.ArgentinaPosition.ticker, models.ArgentinaPosition.status == "OPEN"
+        )
         
         # Crypto positions
-        crypto_positions = db.query(models.CryptoPosition).all()
-        for p in crypto_positions:
-            if p.ticker:
-                crypto_tickers.add(p.ticker.upper())
+        crypto_tickers = distinct_upper(models.CryptoPosition.ticker)
         
+        return usa_tickers, argentina_tickers, crypto_tickers
+    finally:
         db.close()
+
+
+async def _refresh_usa(usa_tickers: set):
+    """Finnhub quotes for all US tickers concurrently, yfinance batch for failures."""
+    if not usa_tickers:
+        return
+    logger.info("Fetching %s USA tickers...", len(usa_tickers))
+    try:
+        tickers = list(usa_tickers)
+        ttl = _ttl_for_ticker(tickers[0])
+        failures = tickers
         
-        # Fetch and cache USA prices (batch)
-        if usa_tickers:
-            print(f"[PriceService] Fetching {len(usa_tickers)} USA tickers...")
-            try:
-                get_prices(list(usa_tickers))
-                print(f"[PriceService] ✅ USA prices cached")
-            except Exception as e:
-                print(f"[PriceService] ⚠️ USA prices error: {e}")
+        if FINNHUB_API_KEY and _finnhub_available():
+            limits = httpx.Limits(max_connections=MAX_FETCH_WORKERS, max_keepalive_connections=MAX_FETCH_WORKERS)
+            async with httpx.AsyncClient(timeout=FINNHUB_TIMEOUT_SECONDS, limits=limits) as client:
+                results = await asyncio.gather(
+                    *[_afetch_finnhub(client, t) for t in tickers], return_exceptions=True
+                )
+            failures = []
+            new_entries = {}
+            for ticker, data in zip(tickers, results):
+                if isinstance(data, Exception):
+                    logger.debug("Finnhub quote failed for %s: %r", ticker, data)
+                    failures.append(ticker)
+                elif not data or not data.get('price'):
+                    failures.append(ticker)
+                else:
+                    new_entries[ticker] = data
+            _price_cache.set_many(new_entries, ttl=ttl)
+            if failures:
+                errors = [r for r in results if isinstance(r, Exception)]
+                logger.warning(
+                    "Finnhub missed %s/%s USA tickers (%s errors, first: %r), falling back to yfinance: %s",
+                    len(failures), len(tickers), len(errors), errors[0] if errors else None, failures[:20]
+                )
         
-        # Fetch and cache Argentina prices
-        if argentina_tickers:
-            print(f"[PriceService] Fetching {len(argentina_tickers)} Argentina tickers...")
+        if failures:
             try:
-                for ticker in argentina_tickers:
-                    get_argentina_price(ticker)
-                print(f"[PriceService] ✅ Argentina prices cached")
-            except Exception as e:
-                print(f"[PriceService] ⚠️ Argentina prices error: {e}")
+                yf_data = await asyncio.to_thread(_fetch_yfinance_batch, failures)
+            except Exception:
+                logger.exception("yfinance batch failed for %s USA tickers: %s", len(failures), failures[:20])
+                return
+            yf_prices = {t: d for t, d in yf_data.items() if d and d.get('price')}
+            _price_cache.set_many(yf_prices, ttl=ttl)
+            missing = [t for t in failures if t not in yf_prices]
+            if missing:
+                logger.warning("No price for %s/%s USA tickers after yfinance: %s", len(missing), len(tickers), missing[:20])
+        logger.info("✅ USA prices cached")
+    except Exception:
+        logger.exception("⚠️ USA prices error while refreshing %s tickers", len(usa_tickers))
+
+
+def _refresh_argentina(argentina_tickers: set):
+    if not argentina_tickers:
+        return
+    
+    # Market closed: prices cached after the last close are final - skip the network
+    if not _market_state()[1]:
+        last_close = _bcba_last_close(time.time())
+        current = {
+            t for t in argentina_tickers
+            if (_price_cache.get(f"BCBA:{t}") or {}).get('timestamp', 0) >= last_close
+        }
+        argentina_tickers = argentina_tickers - current
+        if not argentina_tickers:
+            logger.info("BCBA closed - %s cached prices already final, skipping", len(current))
+            return
+    
+    logger.info("Fetching %s Argentina tickers...", len(argentina_tickers))
+    try:
+        ttl = _ttl_for_bcba()
+        batch = _fetch_yfinance_batch_argentina(list(argentina_tickers))
+        _price_cache.set_many({f"BCBA:{t}": d for t, d in batch.items()}, ttl=ttl)
+        # Per-ticker fallback for anything the batch download missed
+        _fetch_parallel(get_argentina_price, argentina_tickers - batch.keys())
+        logger.info("✅ Argentina prices cached")
+    except Exception as e:
+        logger.warning("⚠️ Argentina prices error: %s", e)
+
+
+def _refresh_crypto(crypto_tickers: set):
+    if not crypto_tickers:
+        return
+    logger.info("Fetching %s Crypto tickers...", len(crypto_tickers))
+    try:
+        batch = _fetch_yfinance_batch_crypto(list(crypto_tickers))
+        _price_cache.set_many({f"CRYPTO:{sym}": d for sym, d in batch.items()}, ttl=TTL_CRYPTO)
+        # Per-symbol fallback (Finnhub, then yfinance) for batch misses
+        _fetch_parallel(get_crypto_price, crypto_tickers - batch.keys())
+        logger.info("✅ Crypto prices cached")
+    except Exception as e:
+        logger.warning("⚠️ Crypto prices error: %s", e)
+
+
+async def background_price_update_async():
+    """
+    Background job to pre-populate price cache for all open positions.
+    Called by scheduler every 5 minutes.
+    This makes user requests instant since prices are already cached.
+    
+    The three asset classes refresh concurrently; US quotes share one pooled
+    async HTTP client, blocking yfinance/DB work runs in worker threads.
+    """
+    logger.info("Background price update starting...")
+    
+    try:
+        usa_tickers, argentina_tickers, crypto_tickers = await asyncio.to_thread(_load_open_tickers)
         
-        # Fetch and cache Crypto prices
-        if crypto_tickers:
-            print(f"[PriceService] Fetching {len(crypto_tickers)} Crypto tickers...")
-            try:
-                for ticker in crypto_tickers:
-                    get_crypto_price(ticker)
-                print(f"[PriceService] ✅ Crypto prices cached")
-            except Exception as e:
-                print(f"[PriceService] ⚠️ Crypto prices error: {e}")
+        await asyncio.gather(
+            _refresh_usa(usa_tickers),
+            asyncio.to_thread(_refresh_argentina, argentina_tickers),
+            asyncio.to_thread(_refresh_crypto, crypto_tickers),
+        )
         
         stats = cache_stats()
-        print(f"[PriceService] ✅ Background update complete. Cache: {stats['entries']} entries")
+        logger.info("✅ Background update complete. Cache: %s entries", stats['entries'])
         
     except Exception as e:
-        print(f"[PriceService] ❌ Background update error: {e}")
-    finally:
-        try:
-            db.close()
-        except:
-            pass
+        logger.error("❌ Background update error: %s", e)
+
+
+def background_price_update():
+    """Sync entry point for callers without a running event loop (scripts, threads)."""
+    asyncio.run(background_price_update_async())
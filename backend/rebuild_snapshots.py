@@ -49,7 +49,7 @@ def rebuild_snapshots_with_pnl(user_id: int):
             }
 
         # --- 2. Market Data Fetching (USA) ---
-        usa_tickers = list(set([t.ticker for t in usa_trades if t.ticker]))
+        usa_tickers = list(dict.fromkeys(t.ticker for t in usa_trades if t.ticker))  # dedupe, keep trade order
         close_prices = None
         
         if usa_tickers:
@@ -0,0 +1,162 @@
+"""
+Redis Cache-Aside Helper
+Per-user JSON cache for read-heavy dashboard endpoints.
+Disabled (every call falls through to the DB) when REDIS_URL is unset,
+redis-py isn't installed, or the server is unreachable.
+"""
+
+import os
+import json
+import time
+import logging
+import functools
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+LOCK_SECONDS = 5  # Stampede guard: only one request recomputes an expired key
+
+# Trade journal views cached per user; all are dropped together on any trade write
+TRADE_VIEWS = ("metrics", "equity", "calendar", "unified")
+# Views that also read Argentina/crypto positions; their writes only invalidate these
+PORTFOLIO_VIEWS = ("unified",)
+
+
+@functools.cache
+def get_redis():
+    """Shared Redis client, or None if caching is unavailable."""
+    if not REDIS_URL:
+        return None
+    try:
+        import redis
+        client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        client.ping()
+        return client
+    except Exception as e:
+        logger.warning("Redis unavailable, caching disabled: %s", e)
+        return None
+
+
+def user_key(user_id: int, view: str) -> str:
+    return f"trades:v1:{user_id}:{view}"
+
+
+def get_json(key: str) -> Optional[Any]:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(key)
+        return json.loads(raw) if raw is not None else None
+    except Exception as e:
+        logger.warning("Redis GET %s failed: %s", key, e)
+        return None
+
+
+def set_json(key: str, value: Any, ex: int):
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(key, json.dumps(value, default=str), ex=ex)
+    except Exception as e:
+        logger.warning("Redis SET %s failed: %s", key, e)
+
+
+def mget_json(keys: list) -> dict:
+    """{key: value} for the keys present, in one MGET round-trip."""
+    client = get_redis()
+    if client is None or not keys:
+        return {}
+    try:
+        raw = client.mget(keys)
+        return {k: json.loads(v) for k, v in zip(keys, raw) if v is not None}
+    except Exception as e:
+        logger.warning("Redis MGET failed: %s", e)
+        return {}
+
+
+def mset_json(mapping: dict, ex: int):
+    """SETEX every key in one pipelined round-trip."""
+    client = get_redis()
+    if client is None or not mapping:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, json.dumps(value, default=str), ex=ex)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Redis pipelined SET failed: %s", e)
+
+
+def invalidate_user(user_id: int, views=TRADE_VIEWS):
+    """Drop a user's cached views after a write."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(*[user_key(user_id, v) for v in views])
+    except Exception as e:
+        logger.warning("Redis invalidate for user %s failed: %s", user_id, e)
+
+
+def acquire_lock(key: str, ex: int = LOCK_SECONDS) -> bool:
+    """SET NX lock; True if we own it (or Redis is down, so the caller just proceeds)."""
+    client = get_redis()
+    if client is None:
+        return True
+    try:
+        return bool(client.set(f"{key}:lock", 1, nx=True, ex=ex))
+    except Exception:
+        return True
+
+
+def release_lock(key: str):
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(f"{key}:lock")
+    except Exception:
+        pass
+
+
+def cache_aside(view: str, ttl: int = 120):
+    """
+    Decorator for user-scoped endpoints taking a `current_user` kwarg.
+    Serves `trades:v1:{user_id}:{view}` from Redis, recomputing on miss.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            user = kwargs.get("current_user")
+            client = get_redis()
+            if user is None or client is None:
+                return fn(*args, **kwargs)
+
+            key = user_key(user.id, view)
+            cached = get_json(key)
+            if cached is not None:
+                return cached
+
+            have_lock = acquire_lock(key)
+            if not have_lock:
+                # Someone else is recomputing; give them a moment before doing it ourselves
+                for _ in range(10):
+                    time.sleep(0.1)
+                    cached = get_json(key)
+                    if cached is not None:
+                        return cached
+
+            try:
+                value = fn(*args, **kwargs)
+                if value:
+                    set_json(key, value, ex=ttl)
+                return value
+            finally:
+                if have_lock:
+                    release_lock(key)
+        return wrapper
+    return decorator
@@ -151,9 +151,6 @@ def run_market_scan(limit=1000, strategy="rally_3m"):
                 try:
                     res = future.result()
                     if res:
-                        score = scoring.calculate_score(res)
-                        res["score"] = score
-                        res["grade"] = scoring.score_to_grade(score)
                         res["rs_spy"] = round(res["ret_3m_pct"] - spy_ret_3m, 2)
                         results.append(res)
                 except Exception as exc:
@@ -175,6 +172,12 @@ def run_market_scan(limit=1000, strategy="rally_3m"):
         import gc
         gc.collect()
             
+    # Score all qualifying tickers in one vectorized pass
+    scores = scoring.calculate_scores_batch(results)
+    for res, score, grade in zip(results, scores.tolist(), scoring.scores_to_grades(scores)):
+        res["score"] = score
+        res["grade"] = grade
+    
     # Sort by Score
     results.sort(key=lambda x: x.get("score", 0), reverse=True)
     
@@ -8,6 +8,89 @@ Scores each qualifying ticker from 0-100 based on:
 - Breakout proximity (15 pts)
 """
 
+import bisect
+import numpy as np
+
+# Lower score bounds for C, B, A; anything below the first is D
+_GRADE_BOUNDS = [55, 70, 85]
+_GRADES = ("D", "C", "B", "A")
+_GRADES_ARRAY = np.array(_GRADES)
+
+_GRADE_DESCRIPTIONS = {
+    "A": {
+        "label": "Elite Setup",
+        "description": "Strongest momentum + ideal consolidation + high volume",
+        "action": "Prime candidate for aggressive position sizing",
+        "color": "green"
+    },
+    "B": {
+        "label": "Strong Setup", 
+        "description": "Good momentum with solid consolidation pattern",
+        "action": "Excellent risk/reward, standard position size",
+        "color": "blue"
+    },
+    "C": {
+        "label": "Decent Setup",
+        "description": "Meets criteria but less ideal pattern",
+        "action": "Selective - wait for better entry or confirmation",
+        "color": "yellow"
+    },
+    "D": {
+        "label": "Marginal",
+        "description": "Barely qualifies, lower quality setup",
+        "action": "Generally skip unless exceptional circumstances",
+        "color": "gray"
+    }
+}
+
+
+def _column(results: list, key: str) -> np.ndarray:
+    """Stack one field across results; missing/None become 0."""
+    return np.fromiter((r.get(key) or 0 for r in results), dtype=np.float64, count=len(results))
+
+
+def calculate_scores_batch(results: list) -> np.ndarray:
+    """
+    Vectorized calculate_score over many tickers at once.
+    
+    Same components and thresholds as calculate_score, computed as array ops.
+    Returns an array of scores (0-100) aligned with `results`.
+    """
+    if not results:
+        return np.empty(0)
+    
+    ret_3m = _column(results, "ret_3m_pct")
+    ret_1m = _column(results, "ret_1m_pct")
+    avg_vol = _column(results, "avg_vol_60")
+    current_vol = _column(results, "volume")
+    close = _column(results, "close")
+    rally_high = _column(results, "rally_high")
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 1. Momentum Strength (0-40): 90% → 0, 300% → 40
+        momentum = np.where(ret_3m >= 90, np.minimum(40, (ret_3m - 90) / 210 * 40), 0.0)
+        
+        # 2. Consolidation Quality (0-30): closeness to the -12.5% ideal pullback
+        distance = np.minimum(np.abs(ret_1m + 12.5), 12.5)
+        consolidation = np.where((ret_1m >= -25) & (ret_1m <= 0), 30 * (1 - distance / 12.5), 0.0)
+        
+        # 3. Volume Surge (0-15): neutral 7.5 when volume data is missing
+        # fmin, like the scalar min(15, nan), caps a NaN volume ratio at 15 instead of propagating it
+        has_vol = (avg_vol > 0) & (current_vol != 0)
+        volume = np.where(has_vol, np.fmin(15, (current_vol / avg_vol - 1) * 15), 7.5)
+        
+        # 4. Breakout Proximity (0-15): full within 5% of the high, linear decay to 20%
+        distance_pct = (rally_high - close) / rally_high * 100
+        proximity = np.select(
+            [distance_pct <= 5, distance_pct <= 20],
+            [15.0, 15 * (1 - (distance_pct - 5) / 15)],
+            0.0
+        )
+        proximity = np.where((close > 0) & (rally_high > 0), proximity, 0.0)
+    
+    return np.round(momentum + consolidation + volume + proximity, 2)
+
+
 def calculate_score(result: dict) -> float:
     """
     Calculate momentum score (0-100) for a qualifying ticker
@@ -25,59 +108,7 @@ def calculate_score(result: dict) -> float:
     Returns:
         Score from 0-100
     """
-    score = 0.0
-    
-    # 1. Momentum Strength (0-40 points)
-    # Scale: 90% → 0, 300% → 40
-    ret_3m = result.get("ret_3m_pct", 0)
-    if ret_3m >= 90:
-        momentum_score = min(40, (ret_3m - 90) / 210 * 40)
-        score += momentum_score
-    
-    # 2. Consolidation Quality (0-30 points)
-    # Ideal pullback is -12.5% (midpoint of -25% to 0%)
-    # Reward tickers close to this ideal
-    ret_1m = result.get("ret_1m_pct", 0)
-    ideal_pullback = -12.5
-    
-    if -25 <= ret_1m <= 0:
-        # Distance from ideal
-        distance = abs(ret_1m - ideal_pullback)
-        # Max distance is 12.5 (from -25 or 0 to -12.5)
-        consolidation_score = 30 * (1 - min(distance, 12.5) / 12.5)
-        score += consolidation_score
-    
-    # 3. Volume Surge (0-15 points)
-    # If current volume >> average, shows strong interest
-    avg_vol = result.get("avg_vol_60")
-    current_vol = result.get("volume")  # Would need to add this to result
-    
-    if avg_vol and current_vol and avg_vol > 0:
-        vol_ratio = current_vol / avg_vol
-        # 2x average volume = full points, cap at 3x
-        volume_score = min(15, (vol_ratio - 1) * 15)
-        score += volume_score
-    else:
-        # If no volume data, give neutral score
-        score += 7.5
-    
-    # 4. Breakout Proximity (0-15 points)
-    # Reward tickers consolidating near their 3M high
-    close = result.get("close", 0)
-    rally_high = result.get("rally_high", 0)
-    
-    if close > 0 and rally_high > 0:
-        distance_pct = ((rally_high - close) / rally_high) * 100
-        # Within 5% of high = full points, linear decay to 20%
-        if distance_pct <= 5:
-            proximity_score = 15
-        elif distance_pct <= 20:
-            proximity_score = 15 * (1 - (distance_pct - 5) / 15)
-        else:
-            proximity_score = 0
-        score += proximity_score
-    
-    return round(score, 2)
+    return float(calculate_scores_batch([result])[0])
 
 
 def get_score_breakdown(result: dict) -> dict:
@@ -140,43 +171,22 @@ def score_to_grade(score: float) -> str:
     B: 70-84  (Strong setups - good risk/reward)
     C: 55-69  (Decent setups - selective trading)
     D: 0-54   (Marginal - usually skip)
+    
+    A NaN score (unscorable data) is graded D.
     """
-    if score >= 85:
-        return "A"
-    elif score >= 70:
-        return "B"
-    elif score >= 55:
-        return "C"
-    else:
+    if score != score:
         return "D"
+    return _GRADES[bisect.bisect_right(_GRADE_BOUNDS, score)]
+
+
+def scores_to_grades(scores: np.ndarray) -> list:
+    """Vectorized score_to_grade for a batch of scores."""
+    scores = np.asarray(scores, dtype=np.float64)
+    # digitize puts NaN past the last bound (grade A); unscorable data is graded D instead
+    bins = np.where(np.isnan(scores), 0, np.digitize(scores, _GRADE_BOUNDS))
+    return _GRADES_ARRAY[bins].tolist()
 
 
 def get_grade_description(grade: str) -> dict:
-    """Get description and trading recommendation for grade"""
-    descriptions = {
-        "A": {
-            "label": "Elite Setup",
-            "description": "Strongest momentum + ideal consolidation + high volume",
-            "action": "Prime candidate for aggressive position sizing",
-            "color": "green"
-        },
-        "B": {
-            "label": "Strong Setup", 
-            "description": "Good momentum with solid consolidation pattern",
-            "action": "Excellent risk/reward, standard position size",
-            "color": "blue"
-        },
-        "C": {
-            "label": "Decent Setup",
-            "description": "Meets criteria but less ideal pattern",
-            "action": "Selective - wait for better entry or confirmation",
-            "color": "yellow"
-        },
-        "D": {
-            "label": "Marginal",
-            "description": "Barely qualifies, lower quality setup",
-            "action": "Generally skip unless exceptional circumstances",
-            "color": "gray"
-        }
-    }
-    return descriptions.get(grade, descriptions["D"])
+    """Get description and trading recommendation for grade (shared dict; don't mutate)"""
+    return _GRADE_DESCRIPTIONS.get(grade, _GRADE_DESCRIPTIONS["D"])
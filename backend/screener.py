@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import yfinance as yf
 import requests
+import json
 import logging
 import sys
 import os
@@ -34,11 +35,70 @@ MAX_RET_1M      = 0.0     # ...hasta 0% (lateral / corrección suave)
 MIN_PRICE   = 2.0       # precio mínimo
 MIN_AVG_VOL = 300_000   # volumen promedio mínimo (para evitar ilíquidos)
 
+# Local copy of SEC company_tickers.json; revalidated with ETag / Last-Modified so
+# an unchanged file costs one 304 round-trip instead of the full download
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEC_CACHE_FILE = os.path.join("data", "sec_company_tickers.json")
+SEC_CACHE_META = SEC_CACHE_FILE + ".meta.json"
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_cached_sec_tickers() -> dict:
+    with open(SEC_CACHE_FILE, "rb") as f:
+        return json.loads(f.read())
+
+
+def fetch_sec_company_tickers(headers: dict) -> dict:
+    """SEC company_tickers.json as a dict, served from the local copy when unchanged upstream."""
+    meta = {}
+    have_cache = os.path.exists(SEC_CACHE_FILE)
+    if have_cache:
+        try:
+            with open(SEC_CACHE_META, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+    
+    request_headers = dict(headers)
+    if meta.get("etag"):
+        request_headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        request_headers["If-Modified-Since"] = meta["last_modified"]
+    
+    try:
+        resp = requests.get(SEC_TICKERS_URL, headers=request_headers, timeout=10)
+        if resp.status_code == 304 and have_cache:
+            return _read_cached_sec_tickers()
+        resp.raise_for_status()
+    except requests.RequestException:
+        if not have_cache:
+            raise
+        print("DEBUG: SEC fetch failed, using cached company_tickers.json")
+        return _read_cached_sec_tickers()
+    
+    data = json.loads(resp.content)
+    try:
+        os.makedirs(os.path.dirname(SEC_CACHE_FILE), exist_ok=True)
+        _write_atomic(SEC_CACHE_FILE, resp.content)
+        _write_atomic(SEC_CACHE_META, json.dumps({
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified")
+        }).encode("utf-8"))
+    except OSError as e:
+        print(f"DEBUG: Could not cache SEC tickers: {e}")
+    return data
+
+
 def get_sec_tickers():
     """Fetch tickers from SEC JSON."""
     # SEC requires a User-Agent with an email, but the specific format matters.
     # This one was confirmed working:
-    url = "https://www.sec.gov/files/company_tickers.json"
     headers = {
         "User-Agent": "Javier Screener 3M Rally (contacto: test@example.com)"
     }
@@ -60,15 +120,9 @@ def get_sec_tickers():
     # Priority 2: SEC Fetch
     try:
         print("DEBUG: Fetching SEC tickers...")
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        tickers = []
-        for _, v in data.items():
-            t = v.get("ticker")
-            if t:
-                tickers.append(t)
-        unique_tickers = sorted(list(set(tickers)))
+        data = fetch_sec_company_tickers(headers)
+        # Keep only the ticker field (dedup in the same pass)
+        unique_tickers = sorted({v["ticker"] for v in data.values() if v.get("ticker")})
         print(f"DEBUG: SUCCCESS - Fetched {len(unique_tickers)} tickers from SEC")
         return unique_tickers
     except Exception as e:
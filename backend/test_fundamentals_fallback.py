@@ -0,0 +1,78 @@
+"""
+Offline check of fetch_fundamentals_many's fallback paths (no network):
+- async quoteSummary batch fails (no crumb / Yahoo down) -> every ticker via yfinance .info
+- async batch misses some tickers -> only those go through yfinance
+- called from inside a running event loop -> async batch still runs, no un-awaited coroutine
+"""
+import asyncio
+import gc
+import os
+import tempfile
+import types
+import warnings
+
+import cache
+import fundamental_screener as fs
+
+# Isolated cache DB so persisted fundamentals from real scans don't mask the paths under test
+tmp_dir = tempfile.mkdtemp()
+test_cache = cache.DataCache(os.path.join(tmp_dir, "fundamentals_test.db"))
+cache.get_cache = lambda: test_cache
+
+yf_calls = []
+
+
+class FakeTicker:
+    def __init__(self, ticker):
+        yf_calls.append(ticker)
+        self.info = {"trailingPE": 20.0, "marketCap": 5e9, "shortName": f"yf {ticker}"}
+
+
+fs.yf = types.SimpleNamespace(Ticker=FakeTicker)
+
+
+def reset():
+    # Each case uses its own tickers, so only the in-memory cache and call log need clearing
+    fs.FUNDAMENTALS_CACHE.clear()
+    yf_calls.clear()
+
+
+# 1. Async batch fails outright
+async def failing_batch(tickers):
+    raise RuntimeError("crumb endpoint unavailable")
+
+reset()
+fs._afetch_fundamentals_many = failing_batch
+result = fs.fetch_fundamentals_many(["AAA", "BBB"])
+assert sorted(yf_calls) == ["AAA", "BBB"], yf_calls
+assert result["AAA"]["name"] == "yf AAA" and result["BBB"]["pe_ratio"] == 20.0, result
+print("Async failure -> yfinance for every ticker: OK")
+
+
+# 2. Async batch returns only part of the tickers
+async def partial_batch(tickers):
+    return {t: {"pe_ratio": 10.0, "market_cap": 1e10, "name": f"async {t}"} for t in tickers if t != "MISS"}
+
+reset()
+fs._afetch_fundamentals_many = partial_batch
+result = fs.fetch_fundamentals_many(["CCC", "MISS"])
+assert yf_calls == ["MISS"], yf_calls
+assert result["CCC"]["name"] == "async CCC" and result["MISS"]["name"] == "yf MISS", result
+print("Partial async result -> yfinance only for the misses: OK")
+
+
+# 3. Called from async code (running loop in this thread)
+async def from_async_code():
+    return fs.fetch_fundamentals_many(["DDD", "EEE"])
+
+reset()
+with warnings.catch_warnings(record=True) as caught:
+    warnings.simplefilter("always")
+    result = asyncio.run(from_async_code())
+    gc.collect()
+assert yf_calls == [], yf_calls
+assert result["DDD"]["name"] == "async DDD", result
+assert not [w for w in caught if "never awaited" in str(w.message)], [str(w.message) for w in caught]
+print("Inside a running loop -> async batch on a worker thread: OK")
+
+print("OK")
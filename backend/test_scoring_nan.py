@@ -0,0 +1,36 @@
+"""
+Regression check: NaN inputs must score and grade like the original scalar calculate_score.
+- NaN volume with a valid 60d average -> volume component capped at 15 (scalar min(15, nan) == 15)
+- NaN average volume -> neutral 7.5
+- a NaN score is graded D, never A
+"""
+import numpy as np
+import scoring
+
+nan = float("nan")
+base = {"ret_3m_pct": 150, "ret_1m_pct": -12.5, "close": 98, "rally_high": 100}
+
+# momentum 150% -> 11.43, ideal pullback -> 30, within 5% of high -> 15
+expected_without_volume = 56.43
+
+score = scoring.calculate_score({**base, "avg_vol_60": 1_000_000, "volume": nan})
+assert score == expected_without_volume + 15, f"NaN volume should add 15, got {score}"
+print(f"NaN volume -> {score}")
+
+score = scoring.calculate_score({**base, "avg_vol_60": nan, "volume": 2_000_000})
+assert score == expected_without_volume + 7.5, f"NaN average volume should add 7.5, got {score}"
+print(f"NaN average volume -> {score}")
+
+scores = scoring.calculate_scores_batch([
+    {**base, "avg_vol_60": 1_000_000, "volume": nan},
+    {"ret_3m_pct": nan, "ret_1m_pct": nan, "close": nan, "rally_high": nan, "volume": nan},
+])
+assert not np.isnan(scores).any(), f"batch scores should not be NaN: {scores}"
+print(f"Batch scores -> {scores.tolist()}")
+
+grades = scoring.scores_to_grades(np.array([nan, 90.0, 50.0]))
+assert grades == ["D", "A", "D"], grades
+assert scoring.score_to_grade(nan) == "D"
+print(f"Grades for [nan, 90, 50] -> {grades}")
+
+print("OK")
@@ -0,0 +1,31 @@
+"""
+Regression check: a zero close in cached data must not abort the Sharpe scan.
+calculate_sharpe should return None for such a series (the return after the zero is inf),
+exactly as the pandas pct_change version did, with or without numba installed.
+"""
+import numpy as np
+import pandas as pd
+import fundamental_screener
+
+rng = np.random.default_rng(0)
+close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.01, 120)))
+
+print(f"numba kernel: {'on' if fundamental_screener.njit is not None else 'off'}")
+
+baseline = fundamental_screener.calculate_sharpe(pd.DataFrame({"Close": close}))
+assert baseline is not None, "clean series should produce a Sharpe ratio"
+print(f"Clean series Sharpe: {baseline}")
+
+zero_mid = close.copy()
+zero_mid[40] = 0.0
+result = fundamental_screener.calculate_sharpe(pd.DataFrame({"Close": zero_mid}))
+assert result is None, f"zero close should give None, got {result}"
+print("Zero close mid-series -> None")
+
+zero_first = close.copy()
+zero_first[0] = 0.0
+result = fundamental_screener.calculate_sharpe(pd.DataFrame({"Close": zero_first}))
+assert result is None, f"leading zero close should give None, got {result}"
+print("Zero close at the start -> None")
+
+print("OK")
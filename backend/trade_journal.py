@@ -4,16 +4,21 @@ Refactored to support Multi-Tenancy and PostgreSQL via SQLAlchemy.
 """
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc
+from sqlalchemy import func, desc, asc, cast, select, true, update, Float, Numeric
 from typing import List, Optional
-import traceback
-from datetime import datetime, date as date_type
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone, date as date_type
 
 import indicators
 import market_data
-from database import get_db
 import models
 import auth
+import redis_cache
+
+logger = logging.getLogger(__name__)
 
 # Router
 router = APIRouter()
@@ -51,11 +56,10 @@ class TradeUpdate(BaseModel):
 # --- API Endpoints ---
 
 @router.put("/api/trades/{trade_id}")
-def update_trade(trade_id: int, trade_update: TradeUpdate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_trade(trade_id: int, trade_update: TradeUpdate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Update specific fields of a trade (User Scoped)"""
     trade = db.query(models.Trade).filter(
-        models.Trade.id == trade_id,
-        models.Trade.user_id == current_user.id
+        models.Trade.id == trade_id
     ).first()
     
     if not trade:
@@ -74,12 +78,13 @@ def update_trade(trade_id: int, trade_update: TradeUpdate, current_user: models.
     if trade_update.notes is not None: trade.notes = trade_update.notes
 
     db.commit()
+    redis_cache.invalidate_user(current_user.id)
     db.refresh(trade)
     return {"status": "success", "message": "Trade updated", "id": trade_id}
 
 
 @router.post("/api/trades/add")
-def add_trade(trade_in: TradeCreate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def add_trade(trade_in: TradeCreate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Add a new trade to the journal with FIFO Buy/Sell logic (User Scoped)"""
     
     ticker_upper = trade_in.ticker.upper()
@@ -87,14 +92,13 @@ def add_trade(trade_in: TradeCreate, current_user: models.User = Depends(auth.ge
     
     try:
         entry_date_obj = datetime.strptime(trade_in.entry_date, '%Y-%m-%d').date()
-    except:
+    except (TypeError, ValueError):
         entry_date_obj = datetime.now().date()
 
     if action == 'BUY':
         # Check for existing open trades (User Scoped)
         if trade_in.stop_loss is None or trade_in.target is None:
             existing = db.query(models.Trade).filter(
-                models.Trade.user_id == current_user.id,
                 models.Trade.ticker == ticker_upper,
                 models.Trade.status == 'OPEN'
             ).order_by(desc(models.Trade.entry_date), desc(models.Trade.id)).first()
@@ -124,85 +128,99 @@ def add_trade(trade_in: TradeCreate, current_user: models.User = Depends(auth.ge
         )
         db.add(new_trade)
         db.commit()
+        redis_cache.invalidate_user(current_user.id)
         db.refresh(new_trade)
         return {"status": "success", "trade_id": new_trade.id, "message": "Buy order logged"}
 
     elif action == 'SELL':
         # FIFO Logic for Selling (User Scoped)
-        open_trades = db.query(models.Trade).filter(
-            models.Trade.user_id == current_user.id,
-            models.Trade.ticker == ticker_upper,
-            models.Trade.status == 'OPEN',
-            models.Trade.direction == 'LONG'
-        ).order_by(asc(models.Trade.entry_date), asc(models.Trade.id)).all()
-
-        total_shares = sum(t.shares for t in open_trades)
+        T = models.Trade
+        open_lots = (T.ticker == ticker_upper, T.status == 'OPEN', T.direction == 'LONG')
+        
+        # Cheap SUM first so rejected sells never load any lots
+        total_shares = db.execute(select(func.coalesce(func.sum(T.shares), 0)).where(*open_lots)).scalar()
         
         if total_shares < trade_in.shares:
             raise HTTPException(status_code=400, detail=f"Insufficient shares. Owned: {total_shares}, Trying to sell: {trade_in.shares}")
+        
+        # Only the columns a close/split needs, streamed oldest first until the sell is covered
+        open_trades = db.execute(
+            select(
+                T.id, T.ticker, T.entry_date, T.entry_price, T.shares, T.strategy, T.elliott_pattern,
+                T.risk_level, T.notes, T.stop_loss, T.target, T.target2, T.target3
+            ).where(*open_lots).order_by(asc(T.entry_date), asc(T.id))
+            .execution_options(stream_results=True, yield_per=50)
+        )
             
         shares_to_sell = trade_in.shares
         sell_price = trade_in.entry_price
         execution_date = entry_date_obj
         
         processed_ids = []
+        full_close_updates = []
+        partial_rows = []
+        partial_update = None
         
         for t in open_trades:
             if shares_to_sell <= 0:
                 break
                 
             qty_in_trade = t.shares
+            pnl_pct = ((sell_price - t.entry_price) / t.entry_price) * 100
             
             if qty_in_trade <= shares_to_sell:
                 # FULL CLOSE
-                pnl = (sell_price - t.entry_price) * qty_in_trade
-                pnl_pct = ((sell_price - t.entry_price) / t.entry_price) * 100
-                
-                t.status = 'CLOSED'
-                t.exit_price = sell_price
-                t.exit_date = execution_date
-                t.pnl = pnl
-                t.pnl_percent = pnl_pct
-                
+                full_close_updates.append({
+                    "id": t.id,
+                    "status": 'CLOSED',
+                    "exit_price": sell_price,
+                    "exit_date": execution_date,
+                    "pnl": (sell_price - t.entry_price) * qty_in_trade,
+                    "pnl_percent": pnl_pct,
+                })
                 shares_to_sell -= qty_in_trade
                 processed_ids.append(t.id)
-                db.add(t)
                 
             else:
-                # PARTIAL CLOSE
-                remaining_shares = qty_in_trade - shares_to_sell
-                t.shares = remaining_shares
-                db.add(t)
-                
-                pnl = (sell_price - t.entry_price) * shares_to_sell
-                pnl_pct = ((sell_price - t.entry_price) / t.entry_price) * 100
-                
-                closed_part = models.Trade(
-                    user_id=current_user.id, # New part belongs to user
-                    ticker=t.ticker,
-                    entry_date=t.entry_date,
-                    exit_date=execution_date,
-                    entry_price=t.entry_price,
-                    exit_price=sell_price,
-                    shares=shares_to_sell,
-                    direction='LONG',
-                    pnl=pnl,
-                    pnl_percent=pnl_pct,
-                    status='CLOSED',
-                    strategy=t.strategy,
-                    elliott_pattern=t.elliott_pattern,
-                    risk_level=t.risk_level,
-                    notes=t.notes,
-                    stop_loss=t.stop_loss,
-                    target=t.target,
-                    target2=t.target2,
-                    target3=t.target3
-                )
-                db.add(closed_part)
+                # PARTIAL CLOSE: shrink the open lot, log the sold part as its own closed trade
+                partial_update = (t.id, qty_in_trade - shares_to_sell)
+                partial_rows.append({
+                    "user_id": current_user.id, # New part belongs to user
+                    "ticker": t.ticker,
+                    "entry_date": t.entry_date,
+                    "exit_date": execution_date,
+                    "entry_price": t.entry_price,
+                    "exit_price": sell_price,
+                    "shares": shares_to_sell,
+                    "direction": 'LONG',
+                    "pnl": (sell_price - t.entry_price) * shares_to_sell,
+                    "pnl_percent": pnl_pct,
+                    "status": 'CLOSED',
+                    "strategy": t.strategy,
+                    "elliott_pattern": t.elliott_pattern,
+                    "risk_level": t.risk_level,
+                    "notes": t.notes,
+                    "stop_loss": t.stop_loss,
+                    "target": t.target,
+                    "target2": t.target2,
+                    "target3": t.target3,
+                })
                 shares_to_sell = 0
                 processed_ids.append("new_split")
 
+        open_trades.close()
+        
+        # One executemany per statement type instead of a flush per lot
+        if partial_update:
+            lot_id, remaining_shares = partial_update
+            db.execute(update(T).where(T.id == lot_id).values(shares=remaining_shares))
+        if full_close_updates:
+            db.bulk_update_mappings(models.Trade, full_close_updates)
+        if partial_rows:
+            db.bulk_insert_mappings(models.Trade, partial_rows)
+
         db.commit()
+        redis_cache.invalidate_user(current_user.id)
         return {"status": "success", "processed_ids": processed_ids, "message": "Sell order processed via FIFO"}
         
     else:
@@ -215,67 +233,68 @@ def get_trades(
     status: Optional[str] = None,
     limit: int = 100,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(auth.get_tenant_db)
 ):
     """Get list of trades with filters (User Scoped)"""
-    query = db.query(models.Trade).filter(models.Trade.user_id == current_user.id)
+    T = models.Trade
+    # Only the columns the journal table renders; skips ORM hydration entirely.
+    # User scoping comes from the tenant session (see database._apply_tenant_criteria).
+    stmt = select(
+        T.id, T.ticker, T.direction, T.status, T.strategy, T.notes,
+        T.entry_date, T.entry_price, T.shares, T.exit_date, T.exit_price,
+        T.pnl, T.pnl_percent, T.stop_loss, T.target, T.target2, T.target3
+    )
     
     if ticker:
-        query = query.filter(models.Trade.ticker == ticker)
+        stmt = stmt.where(T.ticker == ticker)
     if status:
-        query = query.filter(models.Trade.status == status)
+        stmt = stmt.where(T.status == status)
         
-    trades = query.order_by(desc(models.Trade.entry_date)).limit(limit).all()
-    return {"trades": trades}
+    rows = db.execute(stmt.order_by(desc(T.entry_date)).limit(limit)).mappings().all()
+    return {"trades": [dict(r) for r in rows]}
 
 
 @router.get("/api/trades/metrics")
-def get_metrics(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+@redis_cache.cache_aside("metrics")
+def get_metrics(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Calculate performance metrics (User Scoped)"""
     try:
-        trades = db.query(models.Trade).filter(
-            models.Trade.user_id == current_user.id,
-            models.Trade.status == 'CLOSED'
-        ).all()
+        # Single scan: the ordered pnl column feeds both the totals and the drawdown
+        # (trades without exit date first)
+        # Streamed through a server-side cursor straight into the array, so no row list is built
+        rows = db.execute(
+            select(models.Trade.pnl).where(models.Trade.status == 'CLOSED').order_by(
+                models.Trade.exit_date.asc().nullsfirst(), models.Trade.id
+            ).execution_options(stream_results=True, yield_per=1000)
+        ).scalars()
+        pnls = np.fromiter((p or 0.0 for p in rows), dtype=np.float64)
         
-        if not trades:
+        total_trades = len(pnls)
+        if not total_trades:
             return {
                 "total_trades": 0, "win_rate": 0, "profit_factor": 0, "total_pnl": 0,
                 "avg_win": 0, "avg_loss": 0, "best_trade": 0, "worst_trade": 0, "max_drawdown": 0
             }
         
-        total_trades = len(trades)
-        winning_trades = [t for t in trades if (t.pnl or 0) > 0]
-        losing_trades = [t for t in trades if (t.pnl or 0) < 0]
+        wins = pnls[pnls > 0]
+        losses = pnls[pnls < 0]
         
-        win_rate = len(winning_trades) / total_trades if total_trades > 0 else 0
-        total_wins = sum((t.pnl or 0) for t in winning_trades)
-        total_losses = abs(sum((t.pnl or 0) for t in losing_trades))
-        profit_factor = total_wins / total_losses if total_losses > 0 else (999 if total_wins > 0 else 0)
+        total_pnl = float(pnls.sum())
+        total_wins = float(wins.sum())
+        total_losses = abs(float(losses.sum()))
+        best_trade = float(pnls.max())
+        worst_trade = float(pnls.min())
         
-        total_pnl = sum((t.pnl or 0) for t in trades)
-        avg_win = total_wins / len(winning_trades) if winning_trades else 0
-        avg_loss = -total_losses / len(losing_trades) if losing_trades else 0
+        win_rate = len(wins) / total_trades
+        profit_factor = total_wins / total_losses if total_losses > 0 else (999 if total_wins > 0 else 0)
         
-        best_trade = max(((t.pnl or 0) for t in trades), default=0)
-        worst_trade = min(((t.pnl or 0) for t in trades), default=0)
+        avg_win = total_wins / len(wins) if len(wins) else 0
+        avg_loss = -total_losses / len(losses) if len(losses) else 0
         
         # Max Drawdown
-        equity_curve = []
-        running_total = 0
-        sorted_trades = sorted(trades, key=lambda x: x.exit_date or date_type.min)
-        
-        for trade in sorted_trades:
-            running_total += (trade.pnl or 0)
-            equity_curve.append(running_total)
-            
-        peak = 0
-        if equity_curve: peak = max(0, equity_curve[0])
-        max_dd = 0
-        for equity in equity_curve:
-            peak = max(peak, equity)
-            dd = peak - equity
-            max_dd = max(max_dd, dd)
+        running = np.cumsum(pnls)
+        peaks = np.maximum.accumulate(np.maximum(running, 0))
+        max_dd = float((peaks - running).max(initial=0.0))
             
         return {
             "total_trades": total_trades,
@@ -288,80 +307,74 @@ def get_metrics(current_user: models.User = Depends(auth.get_current_user), db:
             "worst_trade": round(worst_trade, 2),
             "max_drawdown": round(max_dd, 2)
         }
-    except Exception as e:
-        print(f"Error in get_metrics: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("get_metrics failed for user %s", current_user.id)
         return {}
 
 
 @router.get("/api/trades/equity-curve")
-def get_equity_curve(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+@redis_cache.cache_aside("equity")
+def get_equity_curve(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Get cumulative P&L over time (User Scoped)"""
     try:
-        results = db.query(models.Trade.exit_date, models.Trade.pnl).filter(
-            models.Trade.user_id == current_user.id,
-            models.Trade.status == 'CLOSED',
-            models.Trade.exit_date != None
-        ).order_by(models.Trade.exit_date).all()
-        
-        dates = []
-        equity = []
-        running_total = 0
+        results = db.execute(
+            select(models.Trade.exit_date, models.Trade.pnl).where(
+                models.Trade.status == 'CLOSED',
+                models.Trade.exit_date != None
+            ).order_by(models.Trade.exit_date)
+        ).all()
         
-        for date_val, pnl_val in results:
-            if date_val and pnl_val is not None:
-                dates.append(date_val.strftime('%Y-%m-%d') if isinstance(date_val, (date_type, datetime)) else str(date_val))
-                running_total += pnl_val
-                equity.append(round(running_total, 2))
+        results = [(d, p) for d, p in results if d and p is not None]
+        dates = [d.strftime('%Y-%m-%d') if isinstance(d, (date_type, datetime)) else str(d) for d, _ in results]
+        pnls = np.fromiter((p for _, p in results), dtype=np.float64, count=len(results))
+        equity = np.round(np.cumsum(pnls), 2).tolist()
                 
         benchmarks = {"SPY": [], "QQQ": []}
         try:
            benchmarks = market_data.get_benchmark_performance(dates)
-        except:
-           pass
+        except Exception as e:
+           logger.warning("Benchmark performance unavailable: %s", e)
            
         return {"dates": dates, "equity": equity, "benchmarks": benchmarks}
-    except Exception as e:
+    except Exception:
+        logger.exception("get_equity_curve failed for user %s", current_user.id)
         return {"dates": [], "equity": [], "benchmarks": {"SPY": [], "QQQ": []}}
 
 
 @router.get("/api/trades/calendar")
-def get_calendar_data(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+@redis_cache.cache_aside("calendar")
+def get_calendar_data(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Get daily P&L for calendar (User Scoped)"""
-    results = db.query(
-        models.Trade.exit_date, 
-        func.sum(models.Trade.pnl), 
-        func.count(models.Trade.id)
-    ).filter(
-        models.Trade.user_id == current_user.id,
-        models.Trade.status == 'CLOSED',
-        models.Trade.exit_date != None
-    ).group_by(models.Trade.exit_date).order_by(models.Trade.exit_date).all()
-    
-    data = []
-    for date_val, total_pnl, count in results:
-        data.append({
-            "date": date_val.strftime('%Y-%m-%d'),
-            "pnl": round(total_pnl, 2),
-            "count": count
-        })
-    return data
+    T = models.Trade
+    # Format and round per group in the database; rows come back JSON-ready
+    if db.bind.dialect.name == "postgresql":
+        day = func.to_char(T.exit_date, 'YYYY-MM-DD')
+    else:
+        day = func.strftime('%Y-%m-%d', T.exit_date)
+    pnl = cast(func.round(cast(func.sum(T.pnl), Numeric), 2), Float)
+    
+    results = db.execute(
+        select(day.label("date"), pnl.label("pnl"), func.count(T.id).label("count"))
+        .where(T.status == 'CLOSED', T.exit_date != None)
+        .group_by(T.exit_date).order_by(T.exit_date)
+    ).mappings().all()
+    return [dict(r) for r in results]
 
 
 @router.delete("/api/trades/all")
-def delete_all_trades(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def delete_all_trades(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Delete ALL trades for current user."""
-    count = db.query(models.Trade).filter(models.Trade.user_id == current_user.id).delete()
+    count = db.query(models.Trade).delete()
     db.commit()
+    redis_cache.invalidate_user(current_user.id)
     return {"status": "success", "message": f"Deleted {count} trades", "count": count}
 
 
 @router.delete("/api/trades/{trade_id}")
-def delete_trade(trade_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def delete_trade(trade_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Delete a specific trade"""
     trade = db.query(models.Trade).filter(
-        models.Trade.id == trade_id, 
-        models.Trade.user_id == current_user.id
+        models.Trade.id == trade_id
     ).first()
     
     if not trade:
@@ -369,63 +382,243 @@ def delete_trade(trade_id: int, current_user: models.User = Depends(auth.get_cur
         
     db.delete(trade)
     db.commit()
+    redis_cache.invalidate_user(current_user.id)
     return {"status": "deleted", "trade_id": trade_id}
 
 
-@router.get("/api/trades/open-prices")
-def get_open_prices(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    """Fetch live data for open trades (User Scoped)"""
-    trades = db.query(models.Trade).filter(
-        models.Trade.user_id == current_user.id,
-        models.Trade.status == 'OPEN'
-    ).all()
+HISTORY_PERIOD = "2y"
+HISTORY_LOCK_SECONDS = 10
+_history_local = None  # In-process fallback when Redis isn't configured
+
+
+def _history_key(ticker: str) -> str:
+    return f"yf:{ticker}:{HISTORY_PERIOD}:{date_type.today().isoformat()}"
+
+
+def _history_ttl() -> int:
+    import price_service
+    # Daily bars only move while the market is trading; after the close they're final for the day
+    return 300 if price_service._market_state()[0] != 'closed' else 86400
+
+
+def _history_cache_get(key: str):
+    global _history_local
+    if redis_cache.get_redis() is not None:
+        return redis_cache.get_json(key)
+    return _history_local.get(key) if _history_local else None
+
+
+def _history_cache_set(key: str, closes: list, ttl: int):
+    global _history_local
+    if redis_cache.get_redis() is not None:
+        redis_cache.set_json(key, closes, ex=ttl)
+        return
+    if _history_local is None:
+        import price_service
+        _history_local = price_service.PriceCache(ttl=ttl)
+    _history_local.set(key, closes, ttl=ttl)
+
+
+def _download_closes(tickers: List[str]) -> dict:
+    """One batched yfinance download -> {ticker: [daily closes]}."""
+    data = market_data.safe_yf_download(tickers, period=HISTORY_PERIOD, interval="1d", auto_adjust=False, threads=True)
+    if data.empty or 'Close' not in data.columns.get_level_values(0):
+        return {}
+    close = data['Close']
+    if isinstance(close, pd.Series):
+        close = close.to_frame(tickers[0])
+    
+    closes = {}
+    for t in tickers:
+        if t in close.columns:
+            series = close[t].dropna()
+            if not series.empty:
+                closes[t] = series.round(4).tolist()
+    return closes
+
+
+async def _load_close_history(tickers: List[str]) -> dict:
+    """
+    Daily close history shared across users for the day (Redis, else in-process).
+    Only tickers missing from the cache are downloaded, in one batch.
+    """
+    closes = {}
+    missing = []
+    for t in tickers:
+        cached = _history_cache_get(_history_key(t))
+        if cached is not None:
+            closes[t] = cached
+        else:
+            missing.append(t)
+    if not missing:
+        return closes
+    
+    # Stampede guard: download only what no other request is already fetching
+    mine = [t for t in missing if redis_cache.acquire_lock(_history_key(t), ex=HISTORY_LOCK_SECONDS)]
+    try:
+        if mine:
+            fetched = await asyncio.to_thread(_download_closes, mine)
+            ttl = _history_ttl()
+            for t, series in fetched.items():
+                _history_cache_set(_history_key(t), series, ttl)
+                closes[t] = series
+    finally:
+        for t in mine:
+            redis_cache.release_lock(_history_key(t))
+    
+    waiting = [t for t in missing if t not in mine]
+    for _ in range(20):
+        if not waiting:
+            break
+        await asyncio.sleep(0.25)
+        for t in list(waiting):
+            cached = _history_cache_get(_history_key(t))
+            if cached is not None:
+                closes[t] = cached
+                waiting.remove(t)
+    return closes
+
+
+def _latest_emas(closes: dict, spans=(8, 21, 200)) -> dict:
+    """Last EMA value per ticker, computed over one wide (bars x tickers) frame."""
+    if not closes:
+        return {}
+    # Right-align histories of different lengths so the last bar shares one row
+    wide = pd.DataFrame({t: pd.Series(c, index=range(-len(c), 0)) for t, c in closes.items()})
+    last = {span: wide.ewm(span=span, adjust=False).mean().iloc[-1] for span in spans}
+    return {
+        t: {f"ema_{span}": round(float(last[span][t]), 2) for span in spans}
+        for t in wide.columns
+    }
+
+
+async def _live_open_prices(tickers: List[str]) -> dict:
+    """Quote + EMAs for `tickers`: live quotes from price_service, EMAs from the shared daily history cache."""
+    import price_service
     
-    if not trades: return {}
-        
-    ticker_dates = {}
-    for t in trades:
-        if not t.ticker: continue
-        if t.ticker not in ticker_dates:
-            ticker_dates[t.ticker] = set()
-        d_str = t.entry_date.strftime('%Y-%m-%d') if hasattr(t.entry_date, 'strftime') else str(t.entry_date)
-        ticker_dates[t.ticker].add(d_str)
-
-    tickets_list = list(ticker_dates.keys())
-    if not tickets_list: return {}
-        
     results = {}
+    prices_data, closes = await asyncio.gather(
+        asyncio.to_thread(price_service.get_prices, tickers),
+        _load_close_history(tickers)
+    )
+    ema_map = _latest_emas(closes)
+    
+    for ticker, data in prices_data.items():
+        try:
+            if not data or data.get('price') is None: continue
+            
+            last_price = data.get('price', 0)
+            change = data.get('change_pct', 0)
+            
+            emas = ema_map.get(ticker, {"ema_8": 0, "ema_21": 0, "ema_200": 0})
+            
+            results[ticker] = {
+                "price": round(last_price, 2),
+                "change_pct": round(change, 2),
+                **emas,
+                "rsi_weekly": None,
+                "violations_map": {},
+                "source": data.get('source', 'unknown')
+            }
+        except (TypeError, ValueError) as e:
+            logger.debug("Skipping quote for %s: %s", ticker, e)
+    return results
+
+
+SNAPSHOT_MAX_AGE = timedelta(minutes=5)  # Older rows mean the refresh job is behind -> go live
+
+
+async def refresh_ticker_snapshots():
+    """
+    Scheduler job: recompute quote + EMAs once for the union of open tickers across all
+    users and upsert them into ticker_snapshots, so /open-prices is a single SELECT.
+    """
+    from database import SessionLocal
+    
+    db = SessionLocal()
     try:
-        # Optimization: Use centralized price_service (Finnhub + Cache)
-        import price_service
-        prices_data = price_service.get_prices(tickets_list)
+        tickers = [t for (t,) in db.execute(
+            select(models.Trade.ticker).where(
+                models.Trade.status == 'OPEN',
+                models.Trade.ticker != None
+            ).distinct()
+        ).all() if t]
+        if not tickers:
+            return 0
         
-        for ticker, data in prices_data.items():
-            try:
-                if not data or data.get('price') is None: continue
-                
-                last_price = data.get('price', 0)
-                change = data.get('change_pct', 0)
-                
-                # Fetch EMAs and RSI only if needed (optional optimization)
-                # For now, we can omit them or fetch purely technicals via yfinance roughly if expensive
-                # Or verify if frontend NEEDS ema/rsi in this specific view.
-                # Assuming this view focuses on P&L, Price, Change.
-                
-                # If we really need EMAs, we might still need history.
-                # But let's prioritize speed first as requested.
-                
-                results[ticker] = {
-                    "price": round(last_price, 2),
-                    "change_pct": round(change, 2),
-                    "ema_8": 0, # Placeholder for speed
-                    "ema_21": 0, # Placeholder
-                    "ema_200": 0, # Placeholder
-                    "rsi_weekly": None,
-                    "violations_map": {},
-                    "source": data.get('source', 'unknown')
-                }
-            except: continue
-    except: pass
+        live = await _live_open_prices(tickers)
+        if not live:
+            return 0
+        
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"ticker": t, "as_of": now, "price": d["price"], "change_pct": d["change_pct"],
+             "ema_8": d["ema_8"], "ema_21": d["ema_21"], "ema_200": d["ema_200"],
+             "rsi_weekly": d["rsi_weekly"], "source": d["source"]}
+            for t, d in live.items()
+        ]
+        
+        if db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(models.TickerSnapshot).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.TickerSnapshot.ticker],
+            set_={c: stmt.excluded[c] for c in rows[0] if c != "ticker"}
+        )
+        db.execute(stmt)
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
+def _snapshot_open_prices(db: Session) -> tuple:
+    """One SELECT: fresh snapshots for this user's open tickers -> (results, tickers without one)."""
+    S = models.TickerSnapshot
+    open_tickers = select(models.Trade.ticker).where(
+        models.Trade.status == 'OPEN',
+        models.Trade.ticker != None
+    ).distinct().subquery()
+    
+    rows = db.execute(
+        select(open_tickers.c.ticker, S).outerjoin(S, S.ticker == open_tickers.c.ticker)
+    ).all()
+    
+    cutoff = datetime.now(timezone.utc) - SNAPSHOT_MAX_AGE
+    results, stale = {}, []
+    for ticker, snap in rows:
+        as_of = snap.as_of if snap else None
+        if as_of is not None and as_of.tzinfo is None:
+            as_of = as_of.replace(tzinfo=timezone.utc)  # SQLite drops tzinfo
+        if as_of is None or as_of < cutoff:
+            stale.append(ticker)
+            continue
+        results[ticker] = {
+            "price": snap.price,
+            "change_pct": snap.change_pct,
+            "ema_8": snap.ema_8,
+            "ema_21": snap.ema_21,
+            "ema_200": snap.ema_200,
+            "rsi_weekly": snap.rsi_weekly,
+            "violations_map": {},
+            "source": snap.source
+        }
+    return results, stale
+
+
+@router.get("/api/trades/open-prices")
+async def get_open_prices(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
+    """Fetch live data for open trades (User Scoped)"""
+    results, stale = await asyncio.to_thread(_snapshot_open_prices, db)
+    
+    # Tickers the refresh job hasn't covered yet (new position, job behind) are fetched live
+    if stale:
+        try:
+            results.update(await _live_open_prices(stale))
+        except Exception as e:
+            logger.warning("Live open-price fallback failed for %s: %s", stale, e)
     return results
 
 
@@ -437,13 +630,13 @@ def capture_daily_snapshot(user_id: int = None):
     return portfolio_snapshots.take_snapshot(user_id)
 
 @router.get("/api/trades/snapshots")
-def get_snapshots(days: int = 30, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def get_snapshots(days: int = 30, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Serve historical portfolio snapshots"""
     import portfolio_snapshots
     return portfolio_snapshots.get_history(current_user.id, days, db)
 
 @router.get("/api/trades/analytics/open")
-def get_open_trades_analytics(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def get_open_trades_analytics(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """Get aggregate risk/exposure analytics for OPEN trades."""
     # This was a stub in legacy, and remains largely a stub unless we implement logic.
     # But now at least it is authenticated.
@@ -462,7 +655,8 @@ def get_portfolio_performance(current_user: models.User = Depends(auth.get_curre
         }
 
 @router.get("/api/trades/unified/metrics")
-def get_unified_metrics(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+@redis_cache.cache_aside("unified", ttl=60)
+def get_unified_metrics(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """
     Get consolidated metrics for ALL portfolios (USA, Argentina, Crypto).
     Returns values in ARS, USD (CCL/MEP), and aggregate totals.
@@ -474,32 +668,24 @@ def get_unified_metrics(current_user: models.User = Depends(auth.get_current_use
     rates = argentina_data.get_dolar_rates()
     ccl = rates.get("ccl", 1200)
     
-    # 2. USA Metrics (from local Trade table)
-    usa_trades = db.query(models.Trade).filter(
-        models.Trade.user_id == current_user.id,
-        models.Trade.status == "OPEN"
-    ).all()
+    # 2 + 3. USA (Trade table) and Argentina open-position aggregates in one round-trip
+    # For PnL we trust the stored 'pnl' column (updated by the background worker).
+    # Argentina PnL needs live prices, too slow here -> 0 for now.
+    T, A = models.Trade, models.ArgentinaPosition
+    usa_agg = select(
+        func.coalesce(func.sum(T.entry_price * T.shares), 0),
+        func.coalesce(func.sum(T.pnl), 0),
+        func.count(T.id)
+    ).where(T.status == "OPEN").subquery()
+    arg_agg = select(
+        func.coalesce(func.sum(A.entry_price * A.shares), 0),
+        func.count(A.id)
+    ).where(A.user_id == current_user.id, A.status == "OPEN").subquery()
     
-    usa_invested = sum([t.entry_price * t.shares for t in usa_trades])
-    usa_pnl = 0
-    # Ideally we'd have live prices here, but for speed we might trust 'pnl' field if updated,
-    # or just use 0 if live fetch is too slow.
-    # We can briefly try to get a rough PnL if possible or rely on client/snapshot.
-    # For now, let's sum the 'pnl' column if populated, assuming background worker updates it.
-    usa_pnl = sum([t.pnl for t in usa_trades if t.pnl is not None])
-    
-    # 3. Argentina Metrics
-    arg_pos = db.query(models.ArgentinaPosition).filter(
-        models.ArgentinaPosition.user_id == current_user.id,
-        models.ArgentinaPosition.status == "OPEN"
-    ).all()
-    
-    arg_invested_ars = sum([p.entry_price * p.shares for p in arg_pos])
-    # For PnL, we need live prices. Argentina module usually fetches them.
-    # We'll do a quick rough calc using recent prices if possible, or just 0.
-    # In a real app we'd cache these. Let's assume 0 PnL for speed unless we have a stored value.
-    # We can iterate and fetch price? No, too slow.
-    # We'll start with 0 PnL for now or use stored if models were updated.
+    usa_invested, usa_pnl, usa_count, arg_invested_ars, arg_count = db.execute(
+        select(usa_agg, arg_agg).select_from(usa_agg.join(arg_agg, true()))  # 1 row x 1 row
+    ).one()
+    usa_invested, usa_pnl, arg_invested_ars = float(usa_invested), float(usa_pnl), float(arg_invested_ars)
     arg_pnl_ars = 0 
     
     # 4. Crypto Metrics
@@ -551,14 +737,14 @@ def get_unified_metrics(current_user: models.User = Depends(auth.get_current_use
         "usa": {
             "invested_usd": round(usa_invested, 2),
             "pnl_usd": round(usa_pnl, 2),
-            "position_count": len(usa_trades)
+            "position_count": usa_count
         },
         "argentina": {
             "invested_ars": round(arg_invested_ars, 0),
             "invested_usd_ccl": round(arg_invested_usd, 2),
             "pnl_ars": round(arg_pnl_ars, 0),
             "pnl_usd_ccl": round(arg_pnl_usd, 2),
-            "position_count": len(arg_pos)
+            "position_count": arg_count
         },
         "crypto": {
             "invested_usd": round(crypto_invested, 2),
@@ -568,96 +754,183 @@ def get_unified_metrics(current_user: models.User = Depends(auth.get_current_use
         }
     }
 
+
+CSV_IMPORT_COLUMNS = ("user_id", "ticker", "direction", "entry_date", "entry_price", "shares",
+                      "status", "exit_date", "exit_price", "pnl", "notes")
+CSV_IMPORT_CHUNK = 5000
+
+
+CSV_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y")
+
+
+def _csv_date_parser():
+    """
+    Returns parse(str) -> date | None that sniffs the file's date format from the first
+    date it sees and uses it directly afterwards; the full format list is only retried on a miss.
+    """
+    detected = None
+    
+    def parse(value):
+        nonlocal detected
+        if not value:
+            return None
+        if detected == "%Y-%m-%d":
+            try:
+                return date_type.fromisoformat(value)
+            except ValueError:
+                pass
+        elif detected:
+            try:
+                return datetime.strptime(value, detected).date()
+            except ValueError:
+                pass
+        for fmt in CSV_DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+            detected = detected or fmt
+            return parsed
+        return None
+    
+    return parse
+
+
+def _parse_csv_trades(csv_reader, user_id: int):
+    """Yield one insert-ready dict per valid CSV row; bad rows are skipped."""
+    parse_date = _csv_date_parser()
+    for row in csv_reader:
+        try:
+            # Essential fields
+            ticker = row.get("ticker", "").strip().upper()
+            if not ticker: continue
+            
+            # Parse Entry Date
+            entry_date = parse_date(row.get("entry_date", ""))
+            if not entry_date: continue # Skip if no date
+            
+            entry_price = float(row.get("entry_price", 0))
+            shares = float(row.get("shares", 0))
+            status = row.get("status", "OPEN").upper()
+            
+            # Exit info
+            exit_price = None
+            pnl = None
+            
+            exit_date = parse_date(row.get("exit_date", ""))
+                    
+            if row.get("exit_price"):
+                exit_price = float(row.get("exit_price"))
+                
+            # Calculate PnL if closed
+            if status == "CLOSED" or exit_date:
+                status = "CLOSED"
+                if exit_price and entry_price:
+                    # Simple PnL: (Exit - Entry) * Shares
+                    pnl = (exit_price - entry_price) * shares
+                    
+            yield {
+                "user_id": user_id,
+                "ticker": ticker,
+                "direction": "LONG",
+                "entry_date": entry_date,
+                "entry_price": entry_price,
+                "shares": shares,
+                "status": status,
+                "exit_date": exit_date,
+                "exit_price": exit_price,
+                "pnl": pnl,
+                "notes": row.get("notes", "Imported via CSV"),
+            }
+            
+        except Exception as row_err:
+            # Lazy %-formatting: the row is only stringified when debug logging is on
+            logger.debug("Skipping row %s: %s", row, row_err)
+            continue
+
+
+def _copy_trades(db: Session, trades) -> int:
+    """
+    PostgreSQL fast path: stream rows through COPY FROM STDIN in chunks,
+    so only one chunk of CSV text is ever held in memory.
+    Runs on the session's connection, so it commits/rolls back with `db`.
+    """
+    import csv
+    import io
+    
+    cursor = db.connection().connection.cursor()
+    sql = f"COPY trades ({', '.join(CSV_IMPORT_COLUMNS)}) FROM STDIN WITH CSV"
+    count = 0
+    
+    def flush(buffer):
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for t in trades:
+        # COPY won't apply the assignment cast a bound INSERT would, so round shares here
+        t["shares"] = int(round(t["shares"]))
+        writer.writerow([t[c] for c in CSV_IMPORT_COLUMNS])
+        count += 1
+        if count % CSV_IMPORT_CHUNK == 0:
+            flush(buffer)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+    if count % CSV_IMPORT_CHUNK:
+        flush(buffer)
+    return count
+
+
+def _bulk_insert_trades(db: Session, trades) -> int:
+    """Portable path (SQLite): executemany in chunks without building ORM objects."""
+    count = 0
+    batch = []
+    for t in trades:
+        batch.append(t)
+        if len(batch) >= CSV_IMPORT_CHUNK:
+            db.bulk_insert_mappings(models.Trade, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.bulk_insert_mappings(models.Trade, batch)
+        count += len(batch)
+    return count
+
+
 @router.post("/api/trades/upload_csv")
-async def upload_trades_csv(file: UploadFile = File(...), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+async def upload_trades_csv(file: UploadFile = File(...), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(auth.get_tenant_db)):
     """
     Import historical trades from CSV and rebuild portfolio history.
     CSV Format: ticker, entry_date, entry_price, shares, status, exit_date, exit_price
     """
     import csv
     import codecs
-    from datetime import datetime
     import portfolio_snapshots
     
     try:
         csv_reader = csv.DictReader(codecs.iterdecode(file.file, 'utf-8'))
-        count = 0
+        trades = _parse_csv_trades(csv_reader, current_user.id)
         
-        for row in csv_reader:
-            try:
-                # Essential fields
-                ticker = row.get("ticker", "").strip().upper()
-                if not ticker: continue
-                
-                # Parse Entry Date
-                e_date_str = row.get("entry_date", "")
-                entry_date = None
-                for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]:
-                    try:
-                        entry_date = datetime.strptime(e_date_str, fmt).date()
-                        break
-                    except: pass
-                
-                if not entry_date: continue # Skip if no date
-                
-                entry_price = float(row.get("entry_price", 0))
-                shares = float(row.get("shares", 0))
-                status = row.get("status", "OPEN").upper()
-                
-                # Exit info
-                exit_date = None
-                exit_price = None
-                pnl = None
-                
-                ex_date_str = row.get("exit_date", "")
-                if ex_date_str:
-                    for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]:
-                        try:
-                            exit_date = datetime.strptime(ex_date_str, fmt).date()
-                            break
-                        except: pass
-                        
-                if row.get("exit_price"):
-                    exit_price = float(row.get("exit_price"))
-                    
-                # Calculate PnL if closed
-                if status == "CLOSED" or exit_date:
-                    status = "CLOSED"
-                    if exit_price and entry_price:
-                        # Simple PnL: (Exit - Entry) * Shares
-                        pnl = (exit_price - entry_price) * shares
-                        
-                trade = models.Trade(
-                    user_id=current_user.id,
-                    ticker=ticker,
-                    entry_date=entry_date,
-                    entry_price=entry_price,
-                    shares=shares,
-                    status=status,
-                    exit_date=exit_date,
-                    exit_price=exit_price,
-                    pnl=pnl,
-                    notes=row.get("notes", "Imported via CSV")
-                )
-                db.add(trade)
-                count += 1
-                
-            except Exception as row_err:
-                print(f"Skipping row {row}: {row_err}")
-                continue
+        if db.bind.dialect.name == "postgresql":
+            count = _copy_trades(db, trades)
+        else:
+            count = _bulk_insert_trades(db, trades)
                 
         db.commit()
+        redis_cache.invalidate_user(current_user.id)
         
         # TRIGGER HISTORY REBUILD
         try:
             portfolio_snapshots.rebuild_history(current_user.id, db)
-        except Exception as rebuild_err:
-            print(f"Rebuild Error: {rebuild_err}")
+        except Exception:
+            logger.exception("History rebuild failed after CSV import for user %s", current_user.id)
         
         return {"status": "success", "imported": count, "message": "History rebuilt successfully"}
         
     except Exception as e:
-        print(f"Upload error: {e}")
+        db.rollback()
+        logger.exception("CSV upload failed for user %s", current_user.id)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/trades/template")
@@ -2,19 +2,55 @@
 Watchlist Module (ORM Version)
 Refactored to support Multi-Tenancy and PostgreSQL via SQLAlchemy.
 """
+import asyncio
+import numpy as np
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import delete, desc, inspect, select, update
 from pydantic import BaseModel
 from typing import List, Optional
 import models
 from database import get_db
 import auth
 import market_data
+import redis_cache
+from price_service import PriceCache
 from datetime import datetime
 
 router = APIRouter(prefix="/api/watchlist", tags=["watchlist"])
 
+# Latest prices shared across users: overlapping watchlists hit yfinance once per ticker per window.
+# Redis (when configured) shares them across worker processes; otherwise a per-process cache.
+WATCHLIST_PRICE_TTL = 20
+_price_cache = PriceCache(ttl=WATCHLIST_PRICE_TTL)
+
+
+def _price_key(ticker: str) -> str:
+    return f"px:{ticker}"
+
+
+def _cached_latest_prices(tickers: List[str]) -> dict:
+    """{ticker: last price}; only tickers missing from the cache are fetched, in one batch."""
+    unique = list(dict.fromkeys(tickers))
+    shared = redis_cache.get_redis() is not None
+    
+    if shared:
+        hits = redis_cache.mget_json([_price_key(t) for t in unique])
+        prices = {t: hits[_price_key(t)] for t in unique if _price_key(t) in hits}
+    else:
+        prices = _price_cache.get_many(unique)
+    
+    misses = [t for t in unique if t not in prices]
+    if misses:
+        fetched = market_data.get_batch_latest_prices(misses)
+        if fetched:
+            if shared:
+                redis_cache.mset_json({_price_key(t): p for t, p in fetched.items()}, ex=WATCHLIST_PRICE_TTL)
+            else:
+                _price_cache.set_many(fetched)
+            prices.update(fetched)
+    return prices
+
 # Pydantic Model
 class WatchlistItem(BaseModel):
     ticker: str
@@ -25,43 +61,59 @@ class WatchlistItem(BaseModel):
     notes: Optional[str] = None
     hypothesis: Optional[str] = None
 
+def _load_watchlist(db: Session, user_id: int) -> list:
+    """Only the columns the response needs, as plain Rows (no ORM identity map)."""
+    W = models.Watchlist
+    stmt = select(
+        W.ticker, W.entry_price, W.alert_price, W.stop_alert,
+        W.strategy, W.notes, W.hypothesis, W.created_at
+    ).where(W.user_id == user_id).order_by(desc(W.created_at))
+    return db.execute(stmt).all()
+
+
 @router.get("")
-def get_watchlist(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+async def get_watchlist(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     """Get all watchlist items for the current user."""
-    items = db.query(models.Watchlist).filter(
-        models.Watchlist.user_id == current_user.id
-    ).order_by(desc(models.Watchlist.created_at)).all()
+    # Blocking DB and price calls run off the event loop; only the cheap row formatting stays inline
+    items = await asyncio.to_thread(_load_watchlist, db, current_user.id)
     
     if not items:
         return []
         
     tickers = [i.ticker for i in items]
     
-    # Get batch prices
+    # Get batch prices (cache misses only)
     try:
-        prices_map = market_data.get_batch_latest_prices(tickers)
-    except:
+        prices_map = await asyncio.to_thread(_cached_latest_prices, tickers)
+    except Exception:
         prices_map = {}
         
-    result = []
-    for i in items:
-        current_price = prices_map.get(i.ticker, 0.0)
-        
-        # Calculate metrics
-        change_pct = ((current_price - i.entry_price) / i.entry_price * 100) if i.entry_price and i.entry_price > 0 else 0
-        pl = current_price - (i.entry_price or 0)
+    # Price-dependent metrics for all rows at once
+    n = len(items)
+    entry = np.fromiter((i.entry_price or 0 for i in items), dtype=np.float64, count=n)
+    curr = np.fromiter((prices_map.get(i.ticker, 0.0) for i in items), dtype=np.float64, count=n)
+    stops = np.fromiter((i.stop_alert or np.nan for i in items), dtype=np.float64, count=n)
+    
+    pl = curr - entry
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(entry > 0, pl / entry * 100, 0.0)
+    triggered = (curr > 0) & (curr <= stops)  # NaN (no stop) never compares true
         
-        # Check assertions
-        is_triggered = False
-        if i.stop_alert and current_price > 0 and current_price <= i.stop_alert:
-            is_triggered = True
-            
+    # Round whole columns once instead of calling round() three times per row
+    result = []
+    for i, current_price, chg, row_pl, is_triggered in zip(
+        items,
+        np.round(curr, 2).tolist(),
+        np.round(change_pct, 2).tolist(),
+        np.round(pl, 2).tolist(),
+        triggered.tolist()
+    ):
         result.append({
             'ticker': i.ticker,
             'entry_price': i.entry_price,
-            'current_price': round(current_price, 2),
-            'change_pct': round(change_pct, 2),
-            'pl': round(pl, 2),
+            'current_price': current_price,
+            'change_pct': chg,
+            'pl': row_pl,
             'alert_price': i.alert_price,
             'stop_alert': i.stop_alert,
             'is_triggered': is_triggered,
@@ -72,75 +124,117 @@ def get_watchlist(current_user: models.User = Depends(auth.get_current_user), db
         })
     return result
 
+# Per-engine result of the (user_id, ticker) unique-index probe; create_all never adds
+# the constraint to an existing table, so older databases fall back to check-then-insert
+_upsert_supported = {}
+
+
+def _supports_upsert(db: Session) -> bool:
+    """True once the watchlist table has a unique index on (user_id, ticker)."""
+    key = str(db.bind.url)
+    if key not in _upsert_supported:
+        insp = inspect(db.bind)
+        wanted = {"user_id", "ticker"}
+        unique_cols = [uc["column_names"] for uc in insp.get_unique_constraints("watchlist")]
+        unique_cols += [ix["column_names"] for ix in insp.get_indexes("watchlist") if ix.get("unique")]
+        _upsert_supported[key] = any(set(cols) == wanted for cols in unique_cols)
+    return _upsert_supported[key]
+
+
 @router.post("")
 def add_watchlist_item(item: WatchlistItem, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     """Add a new item to watchlist."""
-    # Check if exists
-    existing = db.query(models.Watchlist).filter(
-        models.Watchlist.user_id == current_user.id,
-        models.Watchlist.ticker == item.ticker.upper()
-    ).first()
-    
-    if existing:
-         raise HTTPException(status_code=400, detail=f"Ticker {item.ticker} already in watchlist")
+    ticker = item.ticker.upper()
     
-    # Get Price if missing
-    added_price = item.entry_price
-    if not added_price or added_price <= 0:
-        # Quick fetch
-        import yfinance as yf
-        try:
-            added_price = yf.Ticker(item.ticker).fast_info.last_price
-        except:
-            added_price = 0.0
-            
-    new_item = models.Watchlist(
+    values = dict(
         user_id=current_user.id,
-        ticker=item.ticker.upper(),
-        entry_price=added_price,
+        ticker=ticker,
+        entry_price=item.entry_price,
         alert_price=item.alert_price,
         stop_alert=item.stop_alert,
         strategy=item.strategy,
         notes=item.notes,
         hypothesis=item.hypothesis
     )
-    db.add(new_item)
+    
+    if _supports_upsert(db):
+        # Single round-trip: the (user_id, ticker) unique constraint replaces the existence check
+        if db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(models.Watchlist).values(**values).on_conflict_do_nothing(
+            index_elements=["user_id", "ticker"]
+        ).returning(models.Watchlist.id)
+        new_id = db.execute(stmt).scalar()
+    else:
+        # Unmigrated table: check if exists, then insert
+        exists = db.execute(
+            select(models.Watchlist.id).where(
+                models.Watchlist.user_id == current_user.id,
+                models.Watchlist.ticker == ticker
+            ).limit(1)
+        ).first()
+        new_id = None
+        if not exists:
+            new_item = models.Watchlist(**values)
+            db.add(new_item)
+            db.flush()
+            new_id = new_item.id
     db.commit()
     
-    return {"success": True, "ticker": item.ticker.upper()}
+    if new_id is None:
+         raise HTTPException(status_code=400, detail=f"Ticker {item.ticker} already in watchlist")
+    
+    # Get Price if missing; fetched only once the row exists, so duplicates never pay for it
+    # and the insert's lock isn't held across the network call
+    if not item.entry_price or item.entry_price <= 0:
+        # Quick fetch (shared short-TTL cache, so re-adds and the list view reuse it)
+        try:
+            added_price = _cached_latest_prices([ticker]).get(ticker, 0.0)
+        except Exception:
+            added_price = 0.0
+        db.execute(
+            update(models.Watchlist).where(models.Watchlist.id == new_id).values(entry_price=added_price)
+        )
+        db.commit()
+    
+    return {"success": True, "ticker": ticker}
+
 
 @router.put("/{ticker}")
 def update_watchlist_item(ticker: str, item: WatchlistItem, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    """Update an existing watchlist item."""
-    db_item = db.query(models.Watchlist).filter(
+    """Update an existing watchlist item (only the fields sent in the body)."""
+    values = item.model_dump(exclude_unset=True, exclude={"ticker"})
+    
+    stmt = update(models.Watchlist).where(
         models.Watchlist.user_id == current_user.id,
         models.Watchlist.ticker == ticker.upper()
-    ).first()
-    
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-        
-    db_item.entry_price = item.entry_price
-    db_item.alert_price = item.alert_price
-    db_item.stop_alert = item.stop_alert
-    db_item.strategy = item.strategy
-    db_item.notes = item.notes
-    db_item.hypothesis = item.hypothesis
+    ).returning(models.Watchlist.id)
+    if values:
+        stmt = stmt.values(**values)
+    else:
+        # Nothing to change; still touch the row so a missing item 404s
+        stmt = stmt.values(ticker=models.Watchlist.ticker)
     
+    updated = db.execute(stmt).first()
     db.commit()
+    
+    if not updated:
+        raise HTTPException(status_code=404, detail="Item not found")
     return {"success": True}
 
 @router.delete("/{ticker}")
 def remove_watchlist_item(ticker: str, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     """Remove item from watchlist."""
-    db_item = db.query(models.Watchlist).filter(
-        models.Watchlist.user_id == current_user.id,
-        models.Watchlist.ticker == ticker.upper()
+    deleted = db.execute(
+        delete(models.Watchlist).where(
+            models.Watchlist.user_id == current_user.id,
+            models.Watchlist.ticker == ticker.upper()
+        ).returning(models.Watchlist.id)
     ).first()
+    db.commit()
     
-    if not db_item:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Item not found")
-        
-    db.delete(db_item)
-    db.commit()
     return {"success": True}
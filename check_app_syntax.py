@@ -1,55 +1,58 @@
 #!/usr/bin/env python3
 # Check for syntax issues in app.js
 
+import re
+
+import numpy as np
+
 with open('backend/static/app.js', 'r', encoding='utf-8') as f:
     content = f.read()
 
 # Count opening and closing braces, brackets, and parens
-open_braces = content.count('{')
-close_braces = content.count('}')
-open_parens = content.count('(')
-close_parens = content.count(')')
-open_brackets = content.count('[')
-close_brackets = content.count(']')
+# One byte histogram instead of six content.count() scans (ASCII bytes never occur inside UTF-8 multi-byte chars)
+counts = np.bincount(np.frombuffer(content.encode('utf-8'), dtype=np.uint8), minlength=256)
+open_braces = int(counts[ord('{')])
+close_braces = int(counts[ord('}')])
+open_parens = int(counts[ord('(')])
+close_parens = int(counts[ord(')')])
+open_brackets = int(counts[ord('[')])
+close_brackets = int(counts[ord(']')])
 
 print(f"Braces: {{ {open_braces} vs }} {close_braces} - Diff: {open_braces - close_braces}")
 print(f"Parens: ( {open_parens} vs ) {close_parens} - Diff: {open_parens - close_parens}")
 print(f"Brackets: [ {open_brackets} vs ] {close_brackets} - Diff: {open_brackets - close_brackets}")
 
+# One regex pass for both the definition and the uses (line numbers from the newline count before each match)
+def_lines, use_lines = [], []
+for m in re.finditer(r'function TradeJournal\(\)|<TradeJournal', content):
+    line_no = content.count('\n', 0, m.start()) + 1
+    (def_lines if m.group().startswith('function') else use_lines).append(line_no)
+
 # Check if TradeJournal function exists
-if 'function TradeJournal()' in content:
+if def_lines:
     print("\n✓ TradeJournal function found")
 else:
     print("\n✗ TradeJournal function NOT found")
 
+lines = content.split('\n')
+
 # Find where TradeJournal is called
-if '<TradeJournal' in content:
-    # Find the line number
-    lines = content.split('\n')
-    for i, line in enumerate(lines, 1):
-        if '<TradeJournal' in line:
-            print(f"✓ TradeJournal called at line {i}")
-            # Show surrounding context
-            start = max(0, i-3)
-            end = min(len(lines), i+2)
-            print("\nContext:")
-            for j in range(start, end):
-                marker = ">>> " if j == i-1 else "    "
-                print(f"{marker}{j+1}: {lines[j][:80]}")
-            break
+if use_lines:
+    i = use_lines[0]
+    print(f"✓ TradeJournal called at line {i}")
+    # Show surrounding context
+    start = max(0, i-3)
+    end = min(len(lines), i+2)
+    print("\nContext:")
+    for j in range(start, end):
+        marker = ">>> " if j == i-1 else "    "
+        print(f"{marker}{j+1}: {lines[j][:80]}")
 else:
     print("\n✗ TradeJournal component NOT called")
 
-# Check if function is defined before it's used
-tradej_def_line = None
-tradej_use_line = None
-
-lines = content.split('\n')
-for i, line in enumerate(lines, 1):
-    if 'function TradeJournal()' in line:
-        tradej_def_line = i
-    if '<TradeJournal' in line and tradej_use_line is None:
-        tradej_use_line = i
+# Check if function is defined before it's used (last definition vs first use, as before)
+tradej_def_line = def_lines[-1] if def_lines else None
+tradej_use_line = use_lines[0] if use_lines else None
 
 print(f"\nTradeJournal defined at line: {tradej_def_line}")
 print(f"TradeJournal used at line: {tradej_use_line}")
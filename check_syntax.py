@@ -1,21 +1,26 @@
 # Check for JSX/JavaScript syntax errors
 import re
 
+import numpy as np
+
 with open('backend/static/app_v2.js', 'r', encoding='utf-8') as f:
     content = f.read()
 
 # Look for common issues
 issues = []
 
+# Bracket counts from one byte histogram instead of a content.count() scan per character
+counts = np.bincount(np.frombuffer(content.encode('utf-8'), dtype=np.uint8), minlength=256)
+
 # Check for unmatched braces
-open_braces = content.count('{')
-close_braces = content.count('}')
+open_braces = int(counts[ord('{')])
+close_braces = int(counts[ord('}')])
 if open_braces != close_braces:
     issues.append(f"Unmatched braces: {open_braces} open, {close_braces} close")
 
 # Check for unmatched parentheses
-open_parens = content.count('(')
-close_parens = content.count(')')
+open_parens = int(counts[ord('(')])
+close_parens = int(counts[ord(')')])
 if open_parens != close_parens:
     issues.append(f"Unmatched parentheses: {open_parens} open, {close_parens} close")
 